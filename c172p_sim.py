@@ -5,9 +5,11 @@ from modules.sim.csv_logging import *
 from modules.sim.config import *
 from modules.sim.control_models import *
 from modules.sim.dynamics import *
+from modules.sim.engine import *
 from modules.sim.eqpoint import *
 from modules.sim.scenarios import *
 from modules.sim.setpoint import *
+from modules.sim.standin import *
 from modules.sim.telemetry import *
 from modules.supervisor import *
 
@@ -18,14 +20,14 @@ if __name__ == '__main__':
     ControlModelModule = ControlModel() #control model module
     CSVLoggingModule   = CSVLogging() #CSV logging module (control model, dynamics, setpoint, RX telemetry, TX telemetry)
     DynamicsModule     = Dynamics() #dynamics module
+    EngineModule       = TelemetryEngine() #RX, TX and config links from/to FlightGear in a single asyncio process
     EquilibriumModule  = Equilibrium() #equilibrium point module
+    PropertiesModule   = FGProperties() #FlightGear property tree module (warm resets)
     ScenarioModule     = Scenario() #FlightGear scenario module
     SetpointModule     = Setpoint() #setpoint module
+    StandInModule      = FGStandIn() #FlightGear stand-in module (offline runs)
     TelemetryModule    = Telemetry() #RX and TX telemetry links from/to FlightGear
     #Modules dictionary definition
-    mods_dict = {'act_mod':ActuationModule, 'cfg_mod':ConfigModule, 'cm_mod':ControlModelModule, 'csvlog_mod':CSVLoggingModule, 'dyn_mod':DynamicsModule, 'eq_mod':EquilibriumModule, 'scen_mod':ScenarioModule, 'sp_mod':SetpointModule, 'telem_mod':TelemetryModule}
+    mods_dict = {'act_mod':ActuationModule, 'cfg_mod':ConfigModule, 'cm_mod':ControlModelModule, 'csvlog_mod':CSVLoggingModule, 'dyn_mod':DynamicsModule, 'engine_mod':EngineModule, 'eq_mod':EquilibriumModule, 'props_mod':PropertiesModule, 'scen_mod':ScenarioModule, 'sp_mod':SetpointModule, 'standin_mod':StandInModule, 'telem_mod':TelemetryModule}
     #Supervisor instantiation
-    Supervisor = Supervisor(**mods_dict) #simulations manager
-    #Simulation loop
-    while True:
-        pass
+    Supervisor = Supervisor(**mods_dict) #simulations manager (quits once the simulation is over)
@@ -1,7 +1,9 @@
 ''' PROTOCOLS FILES '''
-CFG_PROTOCOL_FILENAME = 'py2fg_cfg' #DO NOT MODIFY UNLESS PY2FG_CFG.XML IS ALSO RENAMED ACCORDINGLY
-RX_PROTOCOL_FILENAME  = 'fg2py' #DO NOT MODIFY UNLESS FG2PY.XML IS ALSO RENAMED ACCORDINGLY
-TX_PROTOCOL_FILENAME  = 'py2fg_act' #DO NOT MODIFY UNLESS PY2FG_ACT.XML IS ALSO RENAMED ACCORDINGLY
+CFG_PROTOCOL_FILENAME    = 'py2fg_cfg' #DO NOT MODIFY UNLESS PY2FG_CFG.XML IS ALSO RENAMED ACCORDINGLY
+RX_PROTOCOL_FILENAME     = 'fg2py' #DO NOT MODIFY UNLESS FG2PY.XML IS ALSO RENAMED ACCORDINGLY
+RX_BIN_PROTOCOL_FILENAME = 'fg2py_bin' #DO NOT MODIFY UNLESS FG2PY_BIN.XML IS ALSO RENAMED ACCORDINGLY
+TX_PROTOCOL_FILENAME     = 'py2fg_act' #DO NOT MODIFY UNLESS PY2FG_ACT.XML IS ALSO RENAMED ACCORDINGLY
+TX_BIN_PROTOCOL_FILENAME = 'py2fg_act_bin' #DO NOT MODIFY UNLESS PY2FG_ACT_BIN.XML IS ALSO RENAMED ACCORDINGLY
 
 # VARIABLE DEFINITION FORMAT
 #
@@ -26,6 +28,21 @@ TX_PROTOCOL_FILENAME  = 'py2fg_act' #DO NOT MODIFY UNLESS PY2FG_ACT.XML IS ALSO
 ACT_STR = ('deltaa', 'deltae', 'deltaf', 'deltar', 'deltat', 'deltam', 'deltaa_trim', 'deltae_trim', 'deltar_trim')
 ACT_LEN = len(ACT_STR)
 
+''' CAMPAIGN '''
+# 0 | run       | Campaign run                    | -   | -
+# 1 | instance  | Simulation stack (ports block)  | -   | -
+# 2 | exit_code | Worker process exit code        | -   | -
+# 3 | wall_time | Run wall time                   | -   | s
+# 4 | t_sim     | Last simulation time            | -   | s
+# 5 | rms_pd    | Down position RMS error         | -   | m
+# 6 | rms_phi   | Roll angle RMS error            | -   | rad
+# 7 | rms_theta | Pitch angle RMS error           | -   | rad
+# 8 | rms_psi   | Yaw angle RMS error             | -   | rad
+# 9 | rms_u     | Longitudinal velocity RMS error | XYZ | m/s
+CAMPAIGN_STR     = ('run', 'instance', 'exit_code', 'wall_time', 't_sim', 'rms_pd', 'rms_phi', 'rms_theta', 'rms_psi', 'rms_u') #swept settings names follow in the campaign log
+CAMPAIGN_LEN     = len(CAMPAIGN_STR)
+CAMPAIGN_RMS_IND = (2, 3, 4, 5, 6) #control model states of the RMS tracking errors (pd, phi, theta, psi, u)
+
 ''' CONTROL MODEL '''
 # 0 | deltaa | Normalized ailerons position        | - | - 
 # 1 | deltae | Normalized elevators position       | - | - 
@@ -93,6 +110,18 @@ CM_STATE_LEN = len(CM_STATE_STR)
 DYN_STR = ('D', 'C', 'L', 'T', 'gx', 'gy', 'gz', 'l', 'm', 'n', 'CD1', 'CD2', 'CD3', 'CD4', 'CC1', 'CC2', 'CL1', 'CL2', 'CL3', 'CL4', 'CL5', 'Cl1', 'Cl2', 'Cl3', 'Cl4', 'Cl5', 'Cm1', 'Cm2', 'Cm3', 'Cm4', 'Cm5', 'Cm6', 'Cn1', 'Cn2', 'Cn3', 'Cn4', 'Cn5', 'Cn6')
 DYN_LEN = len(DYN_STR)
 
+''' HEALTH '''
+# 0 | beat     | Last heartbeat time         | - | s
+# 1 | iters    | Loop iterations             | - | -
+# 2 | iter_t   | Last loop iteration time    | - | s
+# 3 | iter_max | Longest loop iteration time | - | s
+# 4 | tick     | Last tick ID                | - | -
+# 5 | skipped  | Ticks skipped               | - | -
+HEALTH_STR        = ('beat', 'iters', 'iter_t', 'iter_max', 'tick', 'skipped')
+HEALTH_LEN        = len(HEALTH_STR)
+HEALTH_IND        = {name: i for i, name in enumerate(HEALTH_STR)}
+HEALTH_STAGES_STR = ('rx', 'dyn', 'eq', 'sp', 'cm', 'act') #heartbeats publishers in upstream order (RX link first)
+
 ''' RX TELEMETRY '''
 # 0   | t_sim      | Simulation time from start                                    | -    | s
 # 1   | dt_sim     | Simulation timestep                                           | -    | s
@@ -211,38 +240,41 @@ DYN_LEN = len(DYN_STR)
 # 114 | wc1        | Wheel 1 contact state                                         | -    | -
 # 115 | wc2        | Wheel 2 contact state                                         | -    | -
 # 116 | wc3        | Wheel 3 contact state                                         | -    | -
-# 117 | D1         | Aerodynamic drag contribution 1                               | UVW  | N
-# 118 | D2         | Aerodynamic drag contribution 2                               | UVW  | N
-# 119 | D3         | Aerodynamic drag contribution 3                               | UVW  | N
-# 120 | D4         | Aerodynamic drag contribution 4                               | UVW  | N
-# 121 | C1         | Aerodynamic crosswind contribution 1                          | UVW  | N
-# 122 | C2         | Aerodynamic crosswind contribution 2                          | UVW  | N
-# 123 | L1         | Aerodynamic lift contribution 1                               | UVW  | N
-# 124 | L2         | Aerodynamic lift contribution 2                               | UVW  | N
-# 125 | L3         | Aerodynamic lift contribution 3                               | UVW  | N
-# 126 | L4         | Aerodynamic lift contribution 4                               | UVW  | N
-# 127 | L5         | Aerodynamic lift contribution 5                               | UVW  | N
-# 128 | l1         | Aerodynamic roll contribution 1                               | XYZ  | N
-# 129 | l2         | Aerodynamic roll contribution 2                               | XYZ  | N
-# 130 | l3         | Aerodynamic roll contribution 3                               | XYZ  | N
-# 131 | l4         | Aerodynamic roll contribution 4                               | XYZ  | N
-# 132 | l5         | Aerodynamic roll contribution 5                               | XYZ  | N
-# 133 | m1         | Aerodynamic pitch contribution 1                              | XYZ  | N
-# 134 | m2         | Aerodynamic pitch contribution 2                              | XYZ  | N
-# 135 | m3         | Aerodynamic pitch contribution 3                              | XYZ  | N
-# 136 | m4         | Aerodynamic pitch contribution 4                              | XYZ  | N
-# 137 | m5         | Aerodynamic pitch contribution 5                              | XYZ  | N
-# 138 | m6         | Aerodynamic pitch contribution 6                              | XYZ  | N
-# 139 | n1         | Aerodynamic yaw contribution 1                                | XYZ  | N
-# 140 | n2         | Aerodynamic yaw contribution 2                                | XYZ  | N
-# 141 | n3         | Aerodynamic yaw contribution 3                                | XYZ  | N
-# 142 | n4         | Aerodynamic yaw contribution 4                                | XYZ  | N
-# 143 | n5         | Aerodynamic yaw contribution 5                                | XYZ  | N
-# 144 | n6         | Aerodynamic yaw contribution 6                                | XYZ  | N
+# 117 | D1         | Aerodynamic drag contribution 1                               | UVW  | lbs
+# 118 | D2         | Aerodynamic drag contribution 2                               | UVW  | lbs
+# 119 | D3         | Aerodynamic drag contribution 3                               | UVW  | lbs
+# 120 | D4         | Aerodynamic drag contribution 4                               | UVW  | lbs
+# 121 | C1         | Aerodynamic crosswind contribution 1                          | UVW  | lbs
+# 122 | C2         | Aerodynamic crosswind contribution 2                          | UVW  | lbs
+# 123 | L1         | Aerodynamic lift contribution 1                               | UVW  | lbs
+# 124 | L2         | Aerodynamic lift contribution 2                               | UVW  | lbs
+# 125 | L3         | Aerodynamic lift contribution 3                               | UVW  | lbs
+# 126 | L4         | Aerodynamic lift contribution 4                               | UVW  | lbs
+# 127 | L5         | Aerodynamic lift contribution 5                               | UVW  | lbs
+# 128 | l1         | Aerodynamic roll contribution 1                               | XYZ  | lbs·ft
+# 129 | l2         | Aerodynamic roll contribution 2                               | XYZ  | lbs·ft
+# 130 | l3         | Aerodynamic roll contribution 3                               | XYZ  | lbs·ft
+# 131 | l4         | Aerodynamic roll contribution 4                               | XYZ  | lbs·ft
+# 132 | l5         | Aerodynamic roll contribution 5                               | XYZ  | lbs·ft
+# 133 | m1         | Aerodynamic pitch contribution 1                              | XYZ  | lbs·ft
+# 134 | m2         | Aerodynamic pitch contribution 2                              | XYZ  | lbs·ft
+# 135 | m3         | Aerodynamic pitch contribution 3                              | XYZ  | lbs·ft
+# 136 | m4         | Aerodynamic pitch contribution 4                              | XYZ  | lbs·ft
+# 137 | m5         | Aerodynamic pitch contribution 5                              | XYZ  | lbs·ft
+# 138 | m6         | Aerodynamic pitch contribution 6                              | XYZ  | lbs·ft
+# 139 | n1         | Aerodynamic yaw contribution 1                                | XYZ  | lbs·ft
+# 140 | n2         | Aerodynamic yaw contribution 2                                | XYZ  | lbs·ft
+# 141 | n3         | Aerodynamic yaw contribution 3                                | XYZ  | lbs·ft
+# 142 | n4         | Aerodynamic yaw contribution 4                                | XYZ  | lbs·ft
+# 143 | n5         | Aerodynamic yaw contribution 5                                | XYZ  | lbs·ft
+# 144 | n6         | Aerodynamic yaw contribution 6                                | XYZ  | lbs·ft
 # 145 | Vprop      | Propeller induced velocity                                    | XYZ  | ft/s
 # 146 | Vind       | Velocity including the propulsion induced velocity            | XYZ  | ft/s
-TELEM_RX_STR = ('t_sim', 'dt_sim', 'long_delta', 'lat_delta', 'dist_delta', 'pn_ecef', 'pe_ecef', 'pd_ecef', 'long_gnss', 'lat_gnss', 'h_gnss', 'h_qfe', 'h_qnh', 'h_terr', 'phi', 'theta', 'psi', 'alpha', 'beta', 'gamma', 'vn', 've', 'vd', 'u', 'v', 'w', 'u_aero', 'v_aero', 'w_aero', 'wn', 'we', 'wd', 'phidot', 'thetadot', 'psidot', 'p', 'q', 'r', 'p_aero', 'q_aero', 'r_aero', 'alphadot', 'betadot', 'udot', 'vdot', 'wdot', 'pdot', 'qdot', 'rdot', 'fx_aero', 'fx_ext', 'fx_gear', 'fx_prop', 'fx', 'fy_aero', 'fy_ext', 'fy_gear', 'fy_prop', 'fy', 'fz_aero', 'fz_ext', 'fz_gear', 'fz_prop', 'fz', 'l_aero', 'l_ext', 'l_gear', 'l_prop', 'l', 'm_aero', 'm_ext', 'm_gear', 'm_prop', 'm', 'n_aero', 'n_ext', 'n_gear', 'n_prop', 'n', 'sigmara', 'deltara', 'sigmala', 'deltala', 'sigmae', 'deltae', 'sigmaf', 'deltaf', 'sigmar', 'deltar', 'deltat', 'deltam', 'Bw2Va', 'Cw2Va', 'hmacb', 'qbar', 'qbaruw', 'qbarprop', 'qbarind', 'stall', 'rho', 'J', 'revprop', 'Ixx', 'Ixy', 'Ixz', 'Iyy', 'Iyz', 'Izz', 'mass', 'grav', 'up_down', 'wow1', 'wow2', 'wow3', 'wc1', 'wc2', 'wc3', 'D1', 'D2', 'D3', 'D4', 'C1', 'C2', 'L1', 'L2', 'L3', 'L4', 'L5', 'l1', 'l2', 'l3', 'l4', 'l5', 'm1', 'm2', 'm3', 'm4', 'm5', 'm6', 'n1', 'n2', 'n3', 'n4', 'n5', 'n6', 'Vprop', 'Vind') #RX telemetry str tuple (DO NOT MODIFY UNLESS FG2PY.XML IS ALSO MODIFIED ACCORDINGLY)
-TELEM_RX_LEN = len(TELEM_RX_STR)
+TELEM_RX_STR           = ('t_sim', 'dt_sim', 'long_delta', 'lat_delta', 'dist_delta', 'pn_ecef', 'pe_ecef', 'pd_ecef', 'long_gnss', 'lat_gnss', 'h_gnss', 'h_qfe', 'h_qnh', 'h_terr', 'phi', 'theta', 'psi', 'alpha', 'beta', 'gamma', 'vn', 've', 'vd', 'u', 'v', 'w', 'u_aero', 'v_aero', 'w_aero', 'wn', 'we', 'wd', 'phidot', 'thetadot', 'psidot', 'p', 'q', 'r', 'p_aero', 'q_aero', 'r_aero', 'alphadot', 'betadot', 'udot', 'vdot', 'wdot', 'pdot', 'qdot', 'rdot', 'fx_aero', 'fx_ext', 'fx_gear', 'fx_prop', 'fx', 'fy_aero', 'fy_ext', 'fy_gear', 'fy_prop', 'fy', 'fz_aero', 'fz_ext', 'fz_gear', 'fz_prop', 'fz', 'l_aero', 'l_ext', 'l_gear', 'l_prop', 'l', 'm_aero', 'm_ext', 'm_gear', 'm_prop', 'm', 'n_aero', 'n_ext', 'n_gear', 'n_prop', 'n', 'sigmara', 'deltara', 'sigmala', 'deltala', 'sigmae', 'deltae', 'sigmaf', 'deltaf', 'sigmar', 'deltar', 'deltat', 'deltam', 'Bw2Va', 'Cw2Va', 'hmacb', 'qbar', 'qbaruw', 'qbarprop', 'qbarind', 'stall', 'rho', 'J', 'revprop', 'Ixx', 'Ixy', 'Ixz', 'Iyy', 'Iyz', 'Izz', 'mass', 'grav', 'up_down', 'wow1', 'wow2', 'wow3', 'wc1', 'wc2', 'wc3', 'D1', 'D2', 'D3', 'D4', 'C1', 'C2', 'L1', 'L2', 'L3', 'L4', 'L5', 'l1', 'l2', 'l3', 'l4', 'l5', 'm1', 'm2', 'm3', 'm4', 'm5', 'm6', 'n1', 'n2', 'n3', 'n4', 'n5', 'n6', 'Vprop', 'Vind') #RX telemetry str tuple (DO NOT MODIFY UNLESS FG2PY.XML IS ALSO MODIFIED ACCORDINGLY)
+TELEM_RX_LEN           = len(TELEM_RX_STR)
+TELEM_RX_IND           = {name: i for i, name in enumerate(TELEM_RX_STR)} #RX telemetry variables indexes
+TELEM_RX_UNITS         = ('s', 's', 'm', 'm', 'm', 'ft', 'ft', 'ft', 'rad', 'rad', 'km', 'km', 'm', 'ft', 'rad', 'rad', 'rad', 'rad', 'rad', 'rad', 'ft/s', 'ft/s', 'ft/s', 'ft/s', 'ft/s', 'ft/s', 'ft/s', 'ft/s', 'ft/s', 'ft/s', 'ft/s', 'ft/s', 'rad/s', 'rad/s', 'rad/s', 'rad/s', 'rad/s', 'rad/s', 'rad/s', 'rad/s', 'rad/s', 'rad/s', 'rad/s', 'ft/s^2', 'ft/s^2', 'ft/s^2', 'rad/s^2', 'rad/s^2', 'rad/s^2', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'rad', '-', 'rad', '-', 'rad', '-', 'rad', '-', 'rad', '-', '-', '-', 's', 's', '-', 'psf', 'psf', 'psf', 'psf', '-', 'slug/ft^3', '-', 'rev/min', 'slug/ft^2', 'slug/ft^2', 'slug/ft^2', 'slug/ft^2', 'slug/ft^2', 'slug/ft^2', 'slug', 'ft/s^2', '-', '-', '-', '-', '-', '-', '-', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'lbs·ft', 'ft/s', 'ft/s') #RX telemetry units tuple as received from FlightGear (DO NOT MODIFY UNLESS FG2PY.XML IS ALSO MODIFIED ACCORDINGLY)
+TELEM_RX_BIN_FRAME_LEN = 8 * TELEM_RX_LEN #binary RX telemetry frame length in bytes (one network byte order double per chunk, DO NOT MODIFY UNLESS FG2PY_BIN.XML IS ALSO MODIFIED ACCORDINGLY)
 
 ''' TX TELEMETRY '''
 # 0 | deltaa      | Normalized aileron command         | - | -
@@ -256,6 +288,23 @@ TELEM_RX_LEN = len(TELEM_RX_STR)
 # 8 | deltar_trim | Normalized rudder trim command     | - | -
 TELEM_TX_STR = ('deltaa', 'deltae', 'deltaf', 'deltar', 'deltat', 'deltam', 'deltaa_trim', 'deltae_trim', 'deltar_trim') #TX telemetry str tuple (DO NOT MODIFY UNLESS PY2FG_ACT.XML IS ALSO MODIFIED ACCORDINGLY)
 TELEM_TX_LEN = len(TELEM_TX_STR)
+TELEM_TX_BIN_FRAME_LEN = 8 * TELEM_TX_LEN #binary TX telemetry frame length in bytes (one network byte order double per chunk, DO NOT MODIFY UNLESS PY2FG_ACT_BIN.XML IS ALSO MODIFIED ACCORDINGLY)
+TELEM_TX_TICK_LEN = 8 #actuation tick ID header length in bytes of encoded actuations piped to the TX link (native byte order, stripped before sending to FlightGear)
+
+''' RX TELEMETRY SUBSCRIPTIONS '''
+# RX telemetry variables delivered to each consumer (projected frames keep this order, simulation time first, CSV logging receives full frames)
+ACT_RX_STR = ('t_sim',) #actuation
+ACT_RX_IND = {name: i for i, name in enumerate(ACT_RX_STR)}
+CM_RX_STR  = ('t_sim', 'long_delta', 'lat_delta', 'h_qfe', 'phi', 'theta', 'psi', 'u', 'v', 'w', 'p', 'q', 'r', 'alphadot', 'sigmara', 'deltara', 'sigmala', 'deltala', 'sigmae', 'deltae', 'sigmar', 'deltar', 'deltat', 'qbar', 'revprop', 'Ixx', 'Ixy', 'Ixz', 'Iyy', 'Iyz', 'Izz', 'mass') #control model
+CM_RX_IND  = {name: i for i, name in enumerate(CM_RX_STR)}
+DYN_RX_STR = ('t_sim', 'phi', 'theta', 'psi', 'alpha', 'beta', 'p', 'q', 'r', 'alphadot', 'sigmara', 'sigmala', 'sigmae', 'sigmaf', 'sigmar', 'Bw2Va', 'Cw2Va', 'hmacb', 'qbar', 'qbaruw', 'qbarprop', 'qbarind', 'stall', 'rho', 'J', 'revprop', 'Ixx', 'Ixy', 'Ixz', 'Iyy', 'Iyz', 'Izz', 'mass', 'grav') #dynamics
+DYN_RX_IND = {name: i for i, name in enumerate(DYN_RX_STR)}
+EQ_RX_STR  = CM_RX_STR #equilibrium point
+EQ_RX_IND  = {name: i for i, name in enumerate(EQ_RX_STR)}
+SP_RX_STR  = ('t_sim', 'long_delta', 'lat_delta', 'h_qfe', 'phi', 'theta', 'psi') #setpoint
+SP_RX_IND  = {name: i for i, name in enumerate(SP_RX_STR)}
+SUP_RX_STR = ('t_sim', 'up_down', 'wow1', 'wow2', 'wow3', 'wc1', 'wc2', 'wc3') #supervisor
+SUP_RX_IND = {name: i for i, name in enumerate(SUP_RX_STR)}
 
 ''' PLOT '''
 # 0   | t_sim      | Sim. time                    | -    | s
@@ -1,14 +1,30 @@
+import json
+import os
+
 ''' ACTUATION '''
 # 0 / 'random' | 'AL', 'ANL'
 # 1 / 'fsfb'   | 'AL', 'LANL' (https://en.wikipedia.org/wiki/Full_state_feedback)
 # 2 / 'lqr'    | 'AL', 'LANL' (https://en.wikipedia.org/wiki/Linear%E2%80%93quadratic_regulator)
 # 3 / 'mpc'    | 'AL', 'ANL', 'LANL' (https://en.wikipedia.org/wiki/Model_predictive_control)
-ACT_TYPE     = 'fsfb'
-MPC_HORSTEPS = 2 #>=2
+ACT_TYPE       = 'fsfb'
+FSFB_LAT_POLES = (-1, -2, -3, -4, -5) #desired lateral closed-loop poles (phi, psi, v, p, r)
+FSFB_LON_POLES = (-1, -2, -3, -4, -5) #desired longitudinal closed-loop poles (pd, theta, u, w, q)
+MPC_HORSTEPS   = 2 #>=2
+
+''' CAMPAIGN '''
+CAMPAIGN_CORES_PER_RUN = 4 #available cores per simulation stack (only applicable when CAMPAIGN_WORKERS = 0)
+CAMPAIGN_GRID          = {} #swept settings as {name: values}, every combination is run, e.g. {'WIND': ('0@0', '270@10'), 'FSFB_LAT_POLES': ((-1, -2, -3, -4, -5), (-2, -3, -4, -5, -6)), 'MPC_HORSTEPS': (2, 4)}
+CAMPAIGN_INSTANCE      = int(os.environ.get('CAMPAIGN_INSTANCE', 0)) #simulation stack of a campaign worker (set by the campaign runner, 0 outside campaigns)
+CAMPAIGN_MONTE_CARLO   = {} #sampled settings as {name: ('uniform', low, high) / ('normal', mean, std)}, drawn for every run, e.g. {'TURBULENCE': ('uniform', 0, 0.5), 'U_START': ('normal', 180, 10)}
+CAMPAIGN_PORT_BLOCK    = 10 #ports offset between simultaneous simulation stacks (config, property tree, RX and TX ports)
+CAMPAIGN_RUNS          = 8 #simulation runs per CAMPAIGN_GRID combination (only applicable when SIM_TYPE = 2 / 'campaign')
+CAMPAIGN_SEED          = 0 #CAMPAIGN_MONTE_CARLO draws seed
+CAMPAIGN_WORKERS       = 0 #simultaneous simulation stacks (0: one per CAMPAIGN_CORES_PER_RUN available cores)
 
 ''' CONFIG '''
 CFG_IP_ADDRESS = 'localhost'
-CFG_PORT       = 60000 #config port
+CFG_PORT       = 60000 + CAMPAIGN_PORT_BLOCK * CAMPAIGN_INSTANCE #config port
+CFG_PROPS_PORT = 60003 + CAMPAIGN_PORT_BLOCK * CAMPAIGN_INSTANCE #property tree (telnet) port, used to reposition the aircraft on warm resets
 
 ''' CONTROL MODEL '''
 # 0 / 'AL'   | Analytic linear control model
@@ -21,18 +37,30 @@ LON_STATE_IND = (2, 4, 6, 8, 10) #Indexes of reduced control model state variabl
 LON_INPUT_IND = (1, 4) #Indexes of reduced control model input variables (deltae, deltat)
 
 ''' CSV LOGGING '''
-CM_LOG_FILENAME       = 'control_model_log'
-DYN_LOG_FILENAME      = 'dynamics_log'
-EQ_LOG_FILENAME       = 'eqpoint_log'
-SP_LOG_FILENAME       = 'setpoint_log'
-TELEM_RX_LOG_FILENAME = 'telemetry_rx_log'
-TELEM_TX_LOG_FILENAME = 'telemetry_tx_log'
-CSV_LOG_DIR           = 'sim_logs'
+CAMPAIGN_LOG_FILENAME     = 'campaign_log'
+CM_LOG_FILENAME           = 'control_model_log'
+DYN_LOG_FILENAME          = 'dynamics_log'
+EQ_LOG_FILENAME           = 'eqpoint_log'
+SP_LOG_FILENAME           = 'setpoint_log'
+TELEM_RX_LOG_FILENAME     = 'telemetry_rx_log'
+TELEM_TX_LOG_FILENAME     = 'telemetry_tx_log'
+CSV_LOG_DIR               = 'sim_logs'
+CSV_FLUSH_POLL            = 0.1 #CSV logging pipes poll timeout while waiting for the flush event [s]
+CSV_FLUSH_TIMEOUT         = 2 #time given to CSV logging processes to drain their pipes and flush at the end of a simulation run [s]
+TELEM_RX_CAPTURE_FILENAME = 'telemetry_rx_capture' #raw RX telemetry capture (binary file)
+TRACE_FILENAME            = 'trace' #per-stage loop latency spans (Chrome trace / Perfetto JSON file)
 
 ''' EQUILIBRIUM '''
 EQ_STATE_IND = (3, 4, 6, 7, 8, 9, 10, 11) #Indexes of control model state variables used in order to find the equilibrium point (phi, theta, u, v, w, p, q, r)
 EQ_INPUT_IND = (0, 1, 3, 4) #Indexes of control model input variables used in order to find the equilibrium point (deltaa, deltae, deltar, deltat)
 
+''' HEALTH '''
+# 0 / 'abort'   | Abort the simulation run with a diagnostic
+# 1 / 'restart' | Restart the dead or stalled stage (up to HEALTH_RESTARTS times per simulation run), then abort
+HEALTH_ACTION   = 'abort'
+HEALTH_RESTARTS = 1 #stage restarts per simulation run before aborting
+HEALTH_TIMEOUT  = 10 #time without heartbeat from a running stage before it is considered stalled [s]
+
 ''' PLOTTING '''
 ANGLES_CONVERSION   = False #from radians to degrees
 IMPERIAL_CONVERSION = True #from SI to imperial
@@ -60,6 +88,12 @@ VISIBILITY             = 10000 #[m]
 W_START                = 0.0000 #[ft/s]
 WIND                   = '0@0' #direction [deg] @ speed [knots]
 
+''' SCHEDULING '''
+#Processes keyed by name: FlightGear links ('telemrx', 'telemtx', 'cfg' or 'engine'), stages ('act', 'cm', 'dyn', 'eq', 'sp' or 'ctl' if fused), CSV logging ('cmlog', 'dynlog', 'eqlog', 'splog', 'telemrxlog', 'telemtxlog'), 'scen' (FlightGear or its stand-in) and 'plot' (simulation results plotting)
+SCHED_AFFINITY = {} #CPU cores of each process, e.g. {'telemrx': (2,), 'act': (3,), 'telemtx': (3,)} pins RX, actuation and TX to isolated cores
+SCHED_FIFO     = {} #SCHED_FIFO real-time priority (1-99) of each process (requires CAP_SYS_NICE or RLIMIT_RTPRIO), e.g. {'telemrx': 50, 'act': 50, 'telemtx': 50}
+SCHED_NICE     = {} #nice level (-20-19) of each process (negative levels require CAP_SYS_NICE or RLIMIT_NICE), e.g. {'cmlog': 10, 'dynlog': 10, 'eqlog': 10, 'splog': 10, 'telemrxlog': 10, 'telemtxlog': 10, 'plot': 19}
+
 ''' SETPOINT '''
 # 0 / 'constant'      | Constant setpoint
 # 1 / 'straight_line' | Straight line setpoint
@@ -68,19 +102,65 @@ SP_INIT = (0, 0, -1000, 0, 0, 0, 50, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0) #(pn_sp, p
 
 ''' SIMULATION '''
 ACT_HZ             = 10 #actuation frequency
+CHANNEL_TRANSPORTS = {} #per channel transport overrides, e.g. {'dyn2csv':'shm'}: 0 = 'pipe', 1 = 'shm' (shared memory ring buffer, array channels only), 2 = 'queue' (in-process, fused producer and consumer only)
 CM_HZ              = 10 #control model frequency
+CONFLATED_INPUTS   = ('cm2act', 'eq2cm', 'rx2act', 'rx2cm', 'rx2eq', 'rx2sp', 'sp2cm') #stage inputs reading only the newest batch (stale batches are dropped and counted)
+CTL_CHAIN          = 'processes' #control stages execution: 0 = 'processes' (one process per stage, isolation), 1 = 'fused' (setpoint, equilibrium, control model and actuation called in sequence every tick in a single process, in-process channels)
 FPS                = 100 #frames per real time second
 MAX_TIME_PER_FRAME = 1 / 100 #timestep per video frame
 MODEL_HZ           = 100 #model iterations per simulation second
 SIM_ITER_NUM       = 2 #number of simulation iterations(only applicable when SIM_TYPE = 1 / 'multiple')
+SIM_LOCKSTEP       = False #hold the stand-in after each actuation tick until its actuation is received (deterministic runs as fast as the stages compute, stand-in backends 'anl' and 'log' only)
 SIM_RATE           = 1 #simulation rate with respect to real time (recommended: 0.125, 0.25, 0.5, 1)
-SIM_TYPE           = 'single' #simulation type: 0 = 'single', 1 = 'multiple'
+SIM_RATE_AUTO      = False #halve the simulation rate whenever the control loop misses ticks (down to SIM_RATE_MIN)
+SIM_RATE_MIN       = 0.125 #lowest simulation rate reached by automatic throttling
+SIM_RATE_SCHEDULE  = () #simulation rate changes as (simulation time [s], simulation rate) pairs in time order, e.g. ((10, 8), (30, 1)) trims at 8x and controls at 1x
+SIM_RESET          = 'restart' #reset between simulation iterations (only applicable when SIM_TYPE = 1 / 'multiple'): 0 = 'restart' (FlightGear relaunched), 1 = 'warm' (FlightGear and links kept alive, aircraft repositioned to the scenario initial conditions)
+SIM_TRACE          = False #record per-stage loop latency spans (RX parse, setpoint, equilibrium, control model, actuation, TX send) into the log directory
+SIM_TYPE           = 'single' #simulation type: 0 = 'single', 1 = 'multiple', 2 = 'campaign' (parallel simulation stacks)
+SUP_HZ             = 10 #supervisor watchdog frequency
+
+''' STAND-IN '''
+# 0 / 'flightgear' | FlightGear (fgfs) launched with the scenario options
+# 1 / 'anl'        | FlightGear stand-in integrating the analytic non-linear control model
+# 2 / 'log'        | FlightGear stand-in replaying a RX telemetry CSV log (STANDIN_LOG_DIR)
+# 3 / 'capture'    | FlightGear stand-in replaying a raw RX telemetry capture with its receive timing (STANDIN_CAPTURE_PATH)
+SIM_BACKEND          = 'flightgear'
+STANDIN_CAPTURE_PATH = 'sim_logs/1/telemetry_rx_capture.bin' #raw RX telemetry capture replayed by the stand-in
+STANDIN_LOG_DIR      = 'sim_logs/1' #RX telemetry CSV log directory replayed by the stand-in
+STANDIN_MASS_PROPS   = (1285.3, 0, 0, 1824.9, 0, 2666.9, 1043.3) #stand-in aircraft (Ixx, Ixy, Ixz, Iyy, Iyz, Izz, mass) [kg·m^2, kg]
+STANDIN_RATE         = 0 #stand-in simulation rate with respect to real time (1: real time, N: N times faster, 0: as fast as possible)
 
 ''' TELEMETRY '''
+# 0 / 'text'   | Tab-separated text frames (fg2py.xml)
+# 1 / 'binary' | Binary frames of network byte order doubles (fg2py_bin.xml)
+TELEM_RX_PROTOCOL    = 'text'
+TELEM_RX_CAPTURE     = False #capture the raw RX telemetry byte stream with receive timestamps into the log directory
 TELEM_RX_BUFFER_SIZE = 1024 * 8 #long enough to allocate a complete frame
 TELEM_RX_IP_ADDRESS  = 'localhost'
-TELEM_RX_PORT        = 60001 #receiving link port
+TELEM_RX_PORT        = 60001 + CAMPAIGN_PORT_BLOCK * CAMPAIGN_INSTANCE #receiving link port
+TELEM_RING_SLOTS     = 256 #RX telemetry shared memory ring buffer length in frames batches
+# 0 / 'text'   | Tab-separated text actuation lines (py2fg_act.xml)
+# 1 / 'binary' | Binary actuation frames of network byte order doubles (py2fg_act_bin.xml)
+TELEM_TX_PROTOCOL    = 'text'
 TELEM_TX_IP_ADDRESS  = 'localhost'
-TELEM_TX_PORT        = 60002 #transmitting link port
+TELEM_TX_PORT        = 60002 + CAMPAIGN_PORT_BLOCK * CAMPAIGN_INSTANCE #transmitting link port
 TELEM_WAIT           = 10 #wait in seconds after FlightGear start before trying to establish telemetry communication
+# 0 / 'processes' | RX, TX and config links in separate processes with blocking sockets
+# 1 / 'asyncio'   | RX, TX and config links in a single asyncio process with non-blocking sockets (timeouts and reconnection)
+TELEM_ENGINE         = 'processes'
+TELEM_LINK_RETRY     = 0.5 #wait in seconds between connection attempts to FlightGear (asyncio engine) or to the Python side (stand-in)
+TELEM_LINK_TIMEOUT   = 120 #wait in seconds for a link to be established or for RX telemetry before reporting a stall (asyncio engine, stand-in RX link)
+# 0 / 'tcp' | RX and TX links over TCP streams
+# 1 / 'udp' | RX and TX links over UDP datagrams (one frame per datagram, lost and reordered frames detected from the simulation time)
+TELEM_TRANSPORT      = 'tcp'
 
+''' CAMPAIGN RUN '''
+def _from_json(value):
+    #JSON arrays back to tuples (as every sequence setting above)
+    if isinstance(value, list):
+        return tuple(_from_json(item) for item in value)
+    if isinstance(value, dict):
+        return {key:_from_json(item) for key, item in value.items()}
+    return value
+globals().update(_from_json(json.loads(os.environ.get('CAMPAIGN_SETTINGS', '{}')))) #settings overridden by the campaign runner (swept and sampled settings of a campaign worker)
@@ -1,33 +1,14 @@
+import itertools
 import numpy as np
 from math import asin, atan2, cos, exp, pi, sin, sqrt
 from pyquaternion import Quaternion
 
 from constants import *
-import settings
 
 ''' CONVERSIONS '''
 def angles_deg_conversion(rxdata):
-    #Radians to degrees conversion
-
-    rxdata[:,39] = rad_to_deg(rxdata[:,39]) #Rate of change of roll angle in degrees per second
-    rxdata[:,40] = rad_to_deg(rxdata[:,40]) #Rate of change of pitch angle in degrees per second
-    rxdata[:,41] = rad_to_deg(rxdata[:,41]) #Rate of change of yaw angle in degrees per second
-    rxdata[:,42] = rad_to_deg(rxdata[:,42]) #Roll velocity (body) in degrees per second
-    rxdata[:,43] = rad_to_deg(rxdata[:,43]) #Pitch velocity (body) in degrees per second
-    rxdata[:,44] = rad_to_deg(rxdata[:,44]) #Yaw velocity (body) in degrees per second
-    rxdata[:,52] = rad_to_deg(rxdata[:,52]) #Roll acceleration (body) in degrees per squared second 
-    rxdata[:,53] = rad_to_deg(rxdata[:,53]) #Pitch acceleration (body) in degrees per squared second 
-    rxdata[:,54] = rad_to_deg(rxdata[:,54]) #Yaw acceleration (body) in degrees per squared second 
-
-    TELEM_RX_KEYS = list(settings.TELEM_RX_PLOT.keys())
-    
-    for i in range(len(settings.TELEM_RX_PLOT)):
-        unit = settings.TELEM_RX_PLOT[TELEM_RX_KEYS[i]][0][0] #current unit
-        if 'rad' in unit:
-            settings.TELEM_RX_PLOT[TELEM_RX_KEYS[i]][0][0] = unit.replace('rad', 'º') 
-        else:
-            continue
-
+    #Radians to degrees conversion (in place)
+    rxdata *= TELEM_RX_DEG_SCALE
     return rxdata
 
 def attquat_to_euler(quat):
@@ -51,26 +32,10 @@ def ft_to_m(feet):
     return 0.3048 * feet
 
 def imperial_conversion(rxdata):
-    #SI units to imperical units conversion
-
-    rxdata[:,2]  = m_to_ft(rxdata[:,2]) #Delta longitude from start in meters
-    rxdata[:,3]  = m_to_ft(rxdata[:,3]) #Delta latitude from start in meters
-    rxdata[:,4]  = m_to_ft(rxdata[:,4]) #Distance from start in meters
-    rxdata[:,10] = km_to_ft(rxdata[:,10]) #Altitude (GNSS) in kilometers
-    rxdata[:,12] = km_to_ft(rxdata[:,12]) #Barometric altitude (QFE) in kilometers
-    rxdata[:,14] = m_to_ft(rxdata[:,14]) #Barometric altitude (QNH) in meters
-
-    TELEM_RX_KEYS = list(settings.TELEM_RX_PLOT.keys())
-    
-    for i in range(len(settings.TELEM_RX_PLOT)):
-        unit = settings.TELEM_RX_PLOT[TELEM_RX_KEYS[i]][0][0] #current unit
-        impunit  = settings.TELEM_RX_PLOT[TELEM_RX_KEYS[i]][0][1][1] #imperial unit
-        if unit == impunit:
-            continue
-        else:
-            settings.TELEM_RX_PLOT[TELEM_RX_KEYS[i]][0][0] = unit.replace(unit, impunit) 
-
+    #SI units to imperial units conversion (in place)
+    rxdata *= TELEM_RX_IMP_SCALE
     return rxdata
+
 def in_to_m(inches):
     #Inches to meters conversion
     return 0.0254 * inches
@@ -143,104 +108,8 @@ def rps_to_rpm(rps):
     return 60 * rps
 
 def rxtelem_to_SI(framesarray):
-    #RX telemetry frames array from IS units to SI units
-
-    framesarray[:,5]   = ft_to_m(framesarray[:,5]) #North position [m]
-    framesarray[:,6]   = ft_to_m(framesarray[:,6]) #East position [m]
-    framesarray[:,7]   = ft_to_m(framesarray[:,7]) #Down position [m]
-    framesarray[:,10]  = km_to_m(framesarray[:,10]) #Altitude (GNSS) [m]
-    framesarray[:,11]  = km_to_m(framesarray[:,11]) #Barometric altitude AGL (QFE) [m]
-    framesarray[:,13]  = ft_to_m(framesarray[:,13]) #Terrain elevation ASL [m]
-    framesarray[:,20]  = ft_to_m(framesarray[:,20]) #North velocity (NED) [m/s]
-    framesarray[:,21]  = ft_to_m(framesarray[:,21]) #East velocity (NED) [m/s]
-    framesarray[:,22]  = ft_to_m(framesarray[:,22]) #Down velocity (NED) [m/s]
-    framesarray[:,23]  = ft_to_m(framesarray[:,23]) #Longitudinal velocity (body) [m/s]
-    framesarray[:,24]  = ft_to_m(framesarray[:,24]) #Transversal velocity (body) [m/s]
-    framesarray[:,25]  = ft_to_m(framesarray[:,25]) #Vertical velocity (body) [m/s]
-    framesarray[:,26]  = ft_to_m(framesarray[:,26]) #Aerodynamic longitudinal velocity (body) [m/s]
-    framesarray[:,27]  = ft_to_m(framesarray[:,27]) #Aerodynamic transversal velocity (body) [m/s]
-    framesarray[:,28]  = ft_to_m(framesarray[:,28]) #Aerodynamic vertical velocity (body) [m/s]
-    framesarray[:,29]  = ft_to_m(framesarray[:,29]) #North wind velocity (NED) [m/s]
-    framesarray[:,30]  = ft_to_m(framesarray[:,30]) #East wind velocity (NED) [m/s]
-    framesarray[:,31]  = ft_to_m(framesarray[:,31]) #Down wind velocity (NED) [m/s]
-    framesarray[:,43]  = ft_to_m(framesarray[:,43]) #Longitudinal acceleration (body) [m/s^2]
-    framesarray[:,44]  = ft_to_m(framesarray[:,44]) #Transversal acceleration (body) [m/s^2]
-    framesarray[:,45]  = ft_to_m(framesarray[:,45]) #Vertical acceleration (body) [m/s^2]
-    framesarray[:,49]  = lbs_to_N(framesarray[:,49]) #Longitudinal aerodynamic force (body) [N]
-    framesarray[:,50]  = lbs_to_N(framesarray[:,50]) #Longitudinal external force (body) [N]
-    framesarray[:,51]  = lbs_to_N(framesarray[:,51]) #Longitudinal gear force (body) [N]
-    framesarray[:,52]  = lbs_to_N(framesarray[:,52]) #Longitudinal propeller force (body) [N]
-    framesarray[:,53]  = lbs_to_N(framesarray[:,53]) #Longitudinal total force (body) [N]
-    framesarray[:,54]  = lbs_to_N(framesarray[:,54]) #Transversal aerodynamic force (body) [N]
-    framesarray[:,55]  = lbs_to_N(framesarray[:,55]) #Transversal external force (body) [N]
-    framesarray[:,56]  = lbs_to_N(framesarray[:,56]) #Transversal gear force (body) [N]
-    framesarray[:,57]  = lbs_to_N(framesarray[:,57]) #Transversal propeller force (body) [N]
-    framesarray[:,58]  = lbs_to_N(framesarray[:,58]) #Transversal total force (body) [N]
-    framesarray[:,59]  = lbs_to_N(framesarray[:,59]) #Vertical aerodynamic force (body) [N]
-    framesarray[:,60]  = lbs_to_N(framesarray[:,60]) #Vertical external force (body) [N]
-    framesarray[:,61]  = lbs_to_N(framesarray[:,61]) #Vertical gear force (body) [N]
-    framesarray[:,62]  = lbs_to_N(framesarray[:,62]) #Vertical propeller force (body) [N]
-    framesarray[:,63]  = lbs_to_N(framesarray[:,63]) #Vertical total force (body) [N]
-    framesarray[:,64]  = lbsft_to_Nm(framesarray[:,64]) #Aerodynamic roll moment (body) [N·m]
-    framesarray[:,65]  = lbsft_to_Nm(framesarray[:,65]) #External roll moment (body) [N·m]
-    framesarray[:,66]  = lbsft_to_Nm(framesarray[:,66]) #Gear roll moment (body) [N·m]
-    framesarray[:,67]  = lbsft_to_Nm(framesarray[:,67]) #Propeller roll moment (body) [N·m]
-    framesarray[:,68]  = lbsft_to_Nm(framesarray[:,68]) #Total roll moment (body) [N·m]
-    framesarray[:,69]  = lbsft_to_Nm(framesarray[:,69]) #Aerodynamic pitch moment (body) [N·m]
-    framesarray[:,70]  = lbsft_to_Nm(framesarray[:,70]) #External pitch moment (body) [N·m]
-    framesarray[:,71]  = lbsft_to_Nm(framesarray[:,71]) #Gear pitch moment (body) [N·m]
-    framesarray[:,72]  = lbsft_to_Nm(framesarray[:,72]) #Propeller pitch moment (body) [N·m]
-    framesarray[:,73]  = lbsft_to_Nm(framesarray[:,73]) #Total pitch moment (body) [N·m]
-    framesarray[:,74]  = lbsft_to_Nm(framesarray[:,74]) #Aerodynamic yaw moment (body) [N·m]
-    framesarray[:,75]  = lbsft_to_Nm(framesarray[:,75]) #External yaw moment (body) [N·m]
-    framesarray[:,76]  = lbsft_to_Nm(framesarray[:,76]) #Gear yaw moment (body) [N·m]
-    framesarray[:,77]  = lbsft_to_Nm(framesarray[:,77]) #Propeller yaw moment (body) [N·m]
-    framesarray[:,78]  = lbsft_to_Nm(framesarray[:,78]) #Total yaw moment (body) [N·m]
-    framesarray[:,94]  = psf_to_pa(framesarray[:,94]) #Dynamic pressure [Pa]
-    framesarray[:,95]  = psf_to_pa(framesarray[:,95]) #Dynamic pressure (UW plane of wind frame) [Pa]
-    framesarray[:,96]  = psf_to_pa(framesarray[:,96]) #Dynamic pressure due to propeller induced velocity [Pa]
-    framesarray[:,97]  = psf_to_pa(framesarray[:,97]) #Dynamic pressure including propulsion induced velocity [Pa]
-    framesarray[:,99]  = slugft3_to_kgm3(framesarray[:,99]) #Air density [kg/m^3]
-    framesarray[:,101] = rpm_to_rps(framesarray[:,101]) #Propeller revolutions [rev/s]
-    framesarray[:,102] = slugft2_to_kgm2(framesarray[:,102]) #Moment of inertia Ixx [kg/m^2]
-    framesarray[:,103] = slugft2_to_kgm2(framesarray[:,103]) #Moment of inertia Ixy [kg/m^2]
-    framesarray[:,104] = slugft2_to_kgm2(framesarray[:,104]) #Moment of inertia Ixz [kg/m^2]
-    framesarray[:,105] = slugft2_to_kgm2(framesarray[:,105]) #Moment of inertia Iyy [kg/m^2]
-    framesarray[:,106] = slugft2_to_kgm2(framesarray[:,106]) #Moment of inertia Iyz [kg/m^2]
-    framesarray[:,107] = slugft2_to_kgm2(framesarray[:,107]) #Moment of inertia Izz [kg/m^2]
-    framesarray[:,108] = slug_to_kg(framesarray[:,108]) #Mass [kg]
-    framesarray[:,109] = ft_to_m(framesarray[:,109]) #Gravitational acceleration [m/s^2]
-    framesarray[:,117] = lbs_to_N(framesarray[:,117]) #Aerodynamic drag contribution 1 [N]
-    framesarray[:,118] = lbs_to_N(framesarray[:,118]) #Aerodynamic drag contribution 2 [N]
-    framesarray[:,119] = lbs_to_N(framesarray[:,119]) #Aerodynamic drag contribution 3 [N]
-    framesarray[:,120] = lbs_to_N(framesarray[:,120]) #Aerodynamic drag contribution 4 [N]
-    framesarray[:,121] = lbs_to_N(framesarray[:,121]) #Aerodynamic crosswind contribution 1 [N]
-    framesarray[:,122] = lbs_to_N(framesarray[:,122]) #Aerodynamic crosswind contribution 2 [N]
-    framesarray[:,123] = lbs_to_N(framesarray[:,123]) #Aerodynamic lift contribution 1 [N]
-    framesarray[:,124] = lbs_to_N(framesarray[:,124]) #Aerodynamic lift contribution 2 [N]
-    framesarray[:,125] = lbs_to_N(framesarray[:,125]) #Aerodynamic lift contribution 3 [N]
-    framesarray[:,126] = lbs_to_N(framesarray[:,126]) #Aerodynamic lift contribution 4 [N]
-    framesarray[:,127] = lbs_to_N(framesarray[:,127]) #Aerodynamic lift contribution 5 [N]
-    framesarray[:,128] = lbsft_to_Nm(framesarray[:,128]) #Aerodynamic roll contribution 1 [N·m]
-    framesarray[:,129] = lbsft_to_Nm(framesarray[:,129]) #Aerodynamic roll contribution 2 [N·m]
-    framesarray[:,130] = lbsft_to_Nm(framesarray[:,130]) #Aerodynamic roll contribution 3 [N·m]
-    framesarray[:,131] = lbsft_to_Nm(framesarray[:,131]) #Aerodynamic roll contribution 4 [N·m]
-    framesarray[:,132] = lbsft_to_Nm(framesarray[:,132]) #Aerodynamic roll contribution 5 [N·m]
-    framesarray[:,133] = lbsft_to_Nm(framesarray[:,133]) #Aerodynamic pitch contribution 1 [N·m]
-    framesarray[:,134] = lbsft_to_Nm(framesarray[:,134]) #Aerodynamic pitch contribution 2 [N·m]
-    framesarray[:,135] = lbsft_to_Nm(framesarray[:,135]) #Aerodynamic pitch contribution 3 [N·m]
-    framesarray[:,136] = lbsft_to_Nm(framesarray[:,136]) #Aerodynamic pitch contribution 4 [N·m]
-    framesarray[:,137] = lbsft_to_Nm(framesarray[:,137]) #Aerodynamic pitch contribution 5 [N·m]
-    framesarray[:,138] = lbsft_to_Nm(framesarray[:,138]) #Aerodynamic pitch contribution 6 [N·m]
-    framesarray[:,139] = lbsft_to_Nm(framesarray[:,139]) #Aerodynamic yaw contribution 1 [N·m]
-    framesarray[:,140] = lbsft_to_Nm(framesarray[:,140]) #Aerodynamic yaw contribution 2 [N·m]
-    framesarray[:,141] = lbsft_to_Nm(framesarray[:,141]) #Aerodynamic yaw contribution 3 [N·m]
-    framesarray[:,142] = lbsft_to_Nm(framesarray[:,142]) #Aerodynamic yaw contribution 4 [N·m]
-    framesarray[:,143] = lbsft_to_Nm(framesarray[:,143]) #Aerodynamic yaw contribution 5 [N·m]
-    framesarray[:,144] = lbsft_to_Nm(framesarray[:,144]) #Aerodynamic yaw contribution 6 [N·m]
-    framesarray[:,145] = ft_to_m(framesarray[:,145]) #Velocity including the propulsion induced velocity [m/s]
-    framesarray[:,146] = ft_to_m(framesarray[:,146]) #Propeller induced velocity [m/s]
-
+    #RX telemetry frames array from received units to SI units (in place)
+    framesarray *= TELEM_RX_SI_SCALE
     return framesarray
 
 def slug_to_kg(slugs):
@@ -324,6 +193,66 @@ def wind_to_stability(beta):
     #Wind frame to stability frame rotation quaternion
     return Quaternion(axis=[0, 0, 1], radians=beta)
 
+''' UNITS CONVERSION VECTORS '''
+#Received unit : (SI unit, scale)
+UNITS_TO_SI = {
+               '-' :         ('-', 1),
+               's' :         ('s', 1),
+               'm' :         ('m', 1),
+               'ft' :        ('m', ft_to_m(1)),
+               'km' :        ('m', km_to_m(1)),
+               'ft/s' :      ('m/s', ft_to_m(1)),
+               'ft/s^2' :    ('m/s^2', ft_to_m(1)),
+               'rad' :       ('rad', 1),
+               'rad/s' :     ('rad/s', 1),
+               'rad/s^2' :   ('rad/s^2', 1),
+               'lbs' :       ('N', lbs_to_N(1)),
+               'lbs·ft' :    ('N·m', lbsft_to_Nm(1)),
+               'psf' :       ('Pa', psf_to_pa(1)),
+               'rev/min' :   ('rev/s', rpm_to_rps(1)),
+               'slug' :      ('kg', slug_to_kg(1)),
+               'slug/ft^2' : ('kg/m^2', slugft2_to_kgm2(1)),
+               'slug/ft^3' : ('kg/m^3', slugft3_to_kgm3(1))
+              }
+#SI unit : (imperial unit, scale)
+SI_TO_IMPERIAL = {
+                  'm' :      ('ft', m_to_ft(1)),
+                  'm/s' :    ('ft/s', m_to_ft(1)),
+                  'm/s^2' :  ('ft/s^2', m_to_ft(1)),
+                  'N' :      ('lbs', N_to_lbs(1)),
+                  'N·m' :    ('lbs·ft', 1 / lbsft_to_Nm(1)),
+                  'Pa' :     ('psf', pa_to_psf(1)),
+                  'kg' :     ('slug', kg_to_slug(1)),
+                  'kg/m^2' : ('slug/ft^2', 1 / slugft2_to_kgm2(1)),
+                  'kg/m^3' : ('slug/ft^3', 1 / slugft3_to_kgm3(1))
+                 }
+TELEM_RX_SI_SCALE  = np.array([UNITS_TO_SI[unit][1] for unit in TELEM_RX_UNITS], dtype=float) #received units to SI units scale vector
+TELEM_RX_IMP_SCALE = np.array([SI_TO_IMPERIAL.get(UNITS_TO_SI[unit][0], (unit, 1))[1] for unit in TELEM_RX_UNITS], dtype=float) #SI units to imperial units scale vector
+TELEM_RX_DEG_SCALE = np.array([rad_to_deg(1) if 'rad' in UNITS_TO_SI[unit][0] else 1 for unit in TELEM_RX_UNITS], dtype=float) #radians to degrees scale vector
+
+''' TELEMETRY DECODING '''
+RX_BIN_DTYPE = np.dtype('>f8') #binary RX telemetry chunk type (network byte order double)
+TX_BIN_DTYPE = np.dtype('>f8') #binary TX telemetry chunk type (network byte order double)
+
+def rxtelem_decode_bin(tcpdata):
+    #Binary RX telemetry data to frames array (trailing incomplete frame is discarded)
+    framescount = len(tcpdata) // TELEM_RX_BIN_FRAME_LEN
+    framesarray = np.frombuffer(tcpdata, dtype=RX_BIN_DTYPE, count=framescount*TELEM_RX_LEN)
+    return framesarray.reshape((framescount, TELEM_RX_LEN)).astype(float) #native byte order writable copy
+
+def rxtelem_decode_text(tcpdata):
+    #Text RX telemetry data to frames array (incomplete frames are discarded)
+    tcpframes = tcpdata.split(b'\n')[:-1] #split TCP data into frames and remove last (empty or incomplete) frame
+    tcpframes = [tcpframe for tcpframe in tcpframes if tcpframe.count(b'\t') == (TELEM_RX_LEN - 1)] #keep complete frames
+    if len(tcpframes) == 0:
+        return np.empty((0, TELEM_RX_LEN))
+    framesarray = np.array(b'\t'.join(tcpframes).split(b'\t'), dtype=float)
+    return framesarray.reshape((len(tcpframes), TELEM_RX_LEN))
+
+def rxtelem_columns(rx_str):
+    #RX telemetry frames columns indexes of the given variables names
+    return tuple(TELEM_RX_STR.index(name) for name in rx_str)
+
 ''' OTHER '''
 def sigmaa_avg_acm(sigmala, sigmara):
     #Averaged ailerons position 
@@ -372,6 +301,30 @@ def rxdata_to_dict(rxdata):
         outdict[TELEM_RX_STR[i]] = rxdata[i]
     return outdict
 
+''' CAMPAIGN SWEEP '''
+def sweep_runs(grid, monte_carlo, runs_num, seed=None):
+    #Campaign runs as settings dictionaries: every combination of the grid values repeated runs_num times, with new Monte Carlo draws for every run
+    rng  = np.random.default_rng(seed)
+    runs = []
+    for values in itertools.product(*grid.values()):
+        for _ in range(runs_num):
+            run = dict(zip(grid.keys(), values))
+            for name, (distribution, param1, param2) in monte_carlo.items():
+                if distribution == 'uniform': #param1: low, param2: high
+                    run[name] = float(rng.uniform(param1, param2))
+                elif distribution == 'normal': #param1: mean, param2: standard deviation
+                    run[name] = float(rng.normal(param1, param2))
+            runs.append(run)
+    return runs
+
+def tracking_rms(cmdata, spdata, state_ind):
+    #Root mean square tracking error of control model states with respect to setpoint (simulation time aligned CSV logs)
+    _, cm_ind, sp_ind = np.intersect1d(cmdata[:,0], spdata[:,0], return_indices=True)
+    if len(cm_ind) == 0:
+        return np.full(len(state_ind), np.nan)
+    error = cmdata[np.ix_(cm_ind, [1 + i for i in state_ind])] - spdata[np.ix_(sp_ind, [1 + i for i in state_ind])]
+    return np.sqrt(np.mean(error ** 2, axis=0))
+
 ''' BAROMETRIC ATMOSPHERE '''
 #https://en.wikipedia.org/wiki/Barometric_formula
 Rg_SI = 8.3144598 #Universal gas constant [N·m/(mol·K)]
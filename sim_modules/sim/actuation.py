@@ -1,6 +1,8 @@
 from constants import *
 from settings import *
 from c172p_model import *
+from modules.sim.channels import *
+from modules.sim.tracing import *
 
 import control as ctl
 import control.optimal as ctlopt
@@ -11,13 +13,29 @@ import sys
 class BaseActuation():
 
     def __init__(self):
-        self.t       = TELEM_WAIT
+        self.tick    = -1 #last tick ID processed
         self.dt      = 1 / ACT_HZ
         self.LAT_INPUT_LEN = len(LAT_INPUT_IND)
         self.LON_INPUT_LEN = len(LON_INPUT_IND)
         self.actdata = np.zeros(ACT_LEN) #array for storing actuation
         self.csvdata = np.zeros(ACT_LEN + 1) #array for piping actuation to CSV
-        self.txdata  = str() #string array for piping actuation to FG
+        #Select TX telemetry encoding
+        #Encoded actuations are piped to the TX link after a tick ID header (tracing of the TX send of each actuation tick)
+        if (TELEM_TX_PROTOCOL == 0) or (TELEM_TX_PROTOCOL == 'text'): #tab-separated text line
+            self.txdata  = bytes() #tick ID and encoded line for piping actuation to FG
+            self.txtick  = None
+            self.txarray = None
+        elif (TELEM_TX_PROTOCOL == 1) or (TELEM_TX_PROTOCOL == 'binary'): #binary frame
+            self.txdata  = bytearray(TELEM_TX_TICK_LEN + TELEM_TX_BIN_FRAME_LEN) #preallocated tick ID and frame for piping actuation to FG
+            self.txtick  = np.ndarray((1,), dtype=np.int64, buffer=self.txdata) #tick ID view
+            self.txarray = np.ndarray((TELEM_TX_LEN,), dtype=TX_BIN_DTYPE, buffer=self.txdata, offset=TELEM_TX_TICK_LEN) #network byte order view of the frame
+
+    def _encode_tx(self):
+        if self.txarray is None:
+            self.txdata = self.tick.to_bytes(TELEM_TX_TICK_LEN, sys.byteorder, signed=True) + ('\t'.join(self.actdata.astype(str)) + '\n').encode()
+        else:
+            self.txtick[0]  = self.tick
+            self.txarray[:] = self.actdata #encode into the preallocated frame without intermediate objects
 
 ''' RANDOM ACTUATION '''
 class Random(BaseActuation):
@@ -34,25 +52,33 @@ class Random(BaseActuation):
                     rx2act_out.close()
                     break
                 else:
-                    rxdata = rx2act_out.recv() #receive RX telemetry
-                    if (np.any(rxdata[:,0] >= self.t)):
-                        self._preprocess(rxdata)
-                        self._find_act()
-                        self._build_pipe_data()
-                        self._pipe(act2tx_in, act2csv_in)
-                        self.t = self.t + self.dt
-                    else:
-                        pass
+                    self.step(act2csv_in, act2tx_in, rx2act_out)
+            except EOFError: #RX telemetry ring buffer closed by the RX link at the end of the simulation run
+                if not event_end.is_set():
+                    raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
             except:
                 raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
 
+    def step(self, act2csv_in, act2tx_in, rx2act_out):
+        #Loop iteration (also called by the fused control chain)
+        rxdata = rx2act_out.recv() #receive RX telemetry
+        if rx2act_out.tick > self.tick: #new tick issued by the scheduler
+            self.tick = rx2act_out.tick
+            t0 = TRACER.clock() #tick span start
+            h0 = HEARTBEATS.clock() #loop iteration start
+            self._preprocess(rxdata)
+            self._find_act()
+            self._build_pipe_data()
+            self._pipe(act2tx_in, act2csv_in)
+            TRACER.span('actuation', t0, rxdata[0,0], self.tick)
+            HEARTBEATS.beat('act', h0, self.tick)
+
     def _init(self):
         self.phys_dict = {}
 
     def _preprocess(self, rxdata):
-        i      = np.where(rxdata[:,0] >= self.t)[0][0] #first RX telemetry frame index
-        rxdata = rxdata[i,:] #first RX telemetry frame
-        rxtime = rxdata[0]
+        rxdata = rxdata[0,:] #frame firing the tick
+        rxtime = rxdata[ACT_RX_IND['t_sim']]
         #Update physical variables dictionary
         self.phys_dict.update(rxtime = rxtime)
 
@@ -64,15 +90,12 @@ class Random(BaseActuation):
 
     def _build_pipe_data(self):
         rxtime           = self.phys_dict['rxtime']
-        actdata_str      = self.actdata.astype(str)
-        self.txdata      = '\t'.join(actdata_str)
-        self.txdata     += '\n'
+        self._encode_tx()
         self.csvdata[0]  = rxtime #add timestamp
         self.csvdata[1:] = self.actdata
-        return txdata
 
     def _pipe(self, act2tx_in, act2csv_in):
-        act2tx_in.send(self.txdata)
+        act2tx_in.send_bytes(self.txdata) #raw bytes (no pickling)
         act2csv_in.send(self.csvdata)
 
 ''' FULL-STATE FEEDBACK ACTUATION '''
@@ -91,30 +114,37 @@ class FSFB(BaseActuation):
                         cm2act_out.close()
                         break
                     else:
-                        #Receive ctl.model data
-                        rxdata = rx2act_out.recv() #receive RX telemetry
-                        if (np.any(rxdata[:,0] >= self.t)):
-                            cmdata = cm2act_out.recv()
-                            self._preprocess(rxdata, cmdata)
-                            self._reduce_state_space()
-                            self._find_act()
-                            self._build_pipe_data()
-                            self._pipe(act2tx_in, act2csv_in)
-                            self.t = self.t + self.dt
-                        else:
-                            pass
+                        self.step(act2csv_in, act2tx_in, cm2act_out, rx2act_out)
+                except EOFError: #RX telemetry ring buffer closed by the RX link at the end of the simulation run
+                    if not event_end.is_set():
+                        raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
                 except:
                     raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
 
+    def step(self, act2csv_in, act2tx_in, cm2act_out, rx2act_out):
+        #Loop iteration (also called by the fused control chain)
+        rxdata = rx2act_out.recv() #receive RX telemetry
+        if rx2act_out.tick > self.tick: #new tick issued by the scheduler
+            self.tick = rx2act_out.tick
+            cmdata = cm2act_out.recv() #receive ctl.model data
+            t0 = TRACER.clock() #tick span start
+            h0 = HEARTBEATS.clock() #loop iteration start
+            self._preprocess(rxdata, cmdata)
+            self._reduce_state_space()
+            self._find_act()
+            self._build_pipe_data()
+            self._pipe(act2tx_in, act2csv_in)
+            TRACER.span('actuation', t0, rxdata[0,0], self.tick)
+            HEARTBEATS.beat('act', h0, self.tick)
+
     def _init(self):
         self.act_dict  = {}
         self.phys_dict = {}
         self.actdata[np.ix_([2, 5])] = [0, 1] #deltaf, deltam
 
     def _preprocess(self, rxdata, cmdata):
-        i      = np.where(rxdata[:,0] >= self.t)[0][0] #first RX telemetry frame index
-        rxdata = rxdata[i,:] #first RX telemetry frame
-        rxtime = rxdata[0]
+        rxdata = rxdata[0,:] #frame firing the tick
+        rxtime = rxdata[ACT_RX_IND['t_sim']]
         #Extract control model data
         cm_sys  = cmdata[0]
         x_cm    = cmdata[1]
@@ -226,7 +256,7 @@ class FSFB(BaseActuation):
         print(': '.join(('A', str(cm_sys.A))))
         print(': '.join(('B', str(cm_sys.B))))
         if np.linalg.matrix_rank(ctl.ctrb(lat_sys.A, lat_sys.B)) == len(LAT_STATE_IND):
-            lat_poles = - np.array([1, 2, 3, 4, 5]) #desired closed-loop poles
+            lat_poles = np.array(FSFB_LAT_POLES) #desired closed-loop poles
             K_lat = ctl.place(lat_sys.A, lat_sys.B, lat_poles) #needed gain matrix to move the poles to the desired location
             cllat_sys   = ctl.StateSpace(lat_sys.A - lat_sys.B @ K_lat, np.zeros(lat_sys.B.shape), lat_sys.C, lat_sys.D) #closed-loop lateral state space model
             print(': '.join(('A_lat', str(lat_sys.A))))
@@ -250,7 +280,7 @@ class FSFB(BaseActuation):
             print(' '.join(('actdata_lat:', str(self.actdata[np.ix_(LAT_INPUT_IND)]))))
             self.actdata[np.ix_(LAT_INPUT_IND)] = u_er_cllat
         if np.linalg.matrix_rank(ctl.ctrb(lon_sys.A, lon_sys.B)) == len(LON_STATE_IND):
-            lon_poles = - np.array([1, 2, 3, 4, 5]) #desired closed-loop poles
+            lon_poles = np.array(FSFB_LON_POLES) #desired closed-loop poles
             K_lon = ctl.place(lon_sys.A, lon_sys.B, lon_poles) #needed gain matrix to move the poles to the desired location
             cllon_sys   = ctl.StateSpace(lon_sys.A - lon_sys.B @ K_lon, np.zeros(lon_sys.B.shape), lon_sys.C, lon_sys.D) #closed-loop loneral state space model
             print(': '.join(('A_lon', str(lon_sys.A))))
@@ -281,14 +311,12 @@ class FSFB(BaseActuation):
 
     def _build_pipe_data(self):
         rxtime           = self.phys_dict['rxtime']
-        actdata_str      = self.actdata.astype(str)
-        self.txdata      = '\t'.join(actdata_str)
-        self.txdata     += '\n'
+        self._encode_tx()
         self.csvdata[0]  = rxtime #add timestamp
         self.csvdata[1:] = self.actdata
 
     def _pipe(self, act2tx_in, act2csv_in):
-        act2tx_in.send(self.txdata)
+        act2tx_in.send_bytes(self.txdata) #raw bytes (no pickling)
         act2csv_in.send(self.csvdata)
 
 ''' LINER-QUADRATIC REGULATOR '''
@@ -0,0 +1,31 @@
+from constants import *
+from settings import *
+
+import sys
+
+''' FUSED CONTROL CHAIN '''
+class ControlChain():
+    #Control stages fused in a single process, every tick each stage loop iteration is called in sequence (upstream first)
+    #Channels between fused stages are in-process queues: no pickling, no process boundaries, no wake-up latency
+
+    def run(self, steps, event_start, event_end):
+        #Steps: (stage, channels ends) in call order
+        for stage, ends in steps:
+            stage._init()
+        event_start.wait() #wait for simulation start event
+        while True:
+            try:
+                if event_end.is_set():
+                    #Close pipes
+                    for stage, ends in steps:
+                        for end in ends:
+                            end.close()
+                    break
+                else:
+                    for stage, ends in steps:
+                        stage.step(*ends)
+            except EOFError: #RX telemetry ring buffer closed by the RX link at the end of the simulation run
+                if not event_end.is_set():
+                    raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
+            except:
+                raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
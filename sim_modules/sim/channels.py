@@ -0,0 +1,389 @@
+from constants import *
+from settings import *
+
+from multiprocessing import connection, shared_memory
+import collections
+import multiprocessing as mp
+import numpy as np
+import os
+import time
+
+''' TICK SCHEDULER '''
+class TickScheduler():
+    #Integer tick IDs issued from the telemetry clock at each stage rate (MODEL_HZ, CM_HZ, ACT_HZ, SUP_HZ), tick 0 starts at TELEM_WAIT
+    #Tick IDs are computed from the received simulation time (no accumulated periods), a tick fires at the first frame at or after its start
+
+    def __init__(self):
+        self.eps = 1e-6 #simulation time resolution of RX telemetry text frames [s]
+
+    def tick(self, t_sim, rate):
+        #Tick ID in progress at simulation time t_sim (array of tick IDs for an array of times)
+        return np.floor((np.asarray(t_sim) - TELEM_WAIT + self.eps) * rate).astype(np.int64)
+
+    def time(self, tick, rate):
+        #Simulation time at the start of tick
+        return TELEM_WAIT + tick / rate
+
+    def fired(self, times, rate, last_tick):
+        #Index and tick ID of every frame firing a tick after last_tick (ticks without frames are skipped, never fired twice)
+        ticks   = self.tick(times, rate)
+        indexes = np.flatnonzero((np.diff(ticks, prepend=last_tick) > 0) & (ticks >= 0))
+        return indexes, ticks[indexes]
+
+SCHEDULER = TickScheduler() #process-wide tick scheduler
+
+''' SHARED MEMORY RING BUFFER '''
+class RingBuffer():
+    #Single-producer multi-consumer ring buffer of frames batches in shared memory (fork start method)
+    #Header layout: [write sequence, closed flag, reader 0 cursor, ..., reader N-1 cursor, reader 0 drops, ..., reader N-1 drops, reader 0 overruns, ..., reader N-1 overruns]
+    #Slot layout: [slot sequence, frames count, tick ID] + frames batch
+    #Columns: optional frame columns indexes to be projected into the ring (contiguous, in the given order)
+    #Rate: optional decimation rate, only the first frame of each new tick is published (one slot per tick, tagged with its tick ID)
+
+    def __init__(self, readers_count, frames_len, batch_len=MODEL_HZ, slots_count=TELEM_RING_SLOTS, columns=None, rate=None):
+        self.readers_count = readers_count
+        self.rate          = rate
+        self.last_tick     = -1 #last published tick ID
+        self.columns       = None if columns is None else np.array(columns, dtype=np.intp)
+        self.frames_len    = frames_len if columns is None else len(columns)
+        self.batch_len     = batch_len
+        self.slots_count   = slots_count
+        header_len = 2 + 3 * readers_count
+        meta_len   = 3 * slots_count
+        data_len   = slots_count * batch_len * self.frames_len
+        self.shm   = shared_memory.SharedMemory(create=True, size=8*(header_len+meta_len+data_len))
+        self.header = np.ndarray((header_len,), dtype=np.int64, buffer=self.shm.buf)
+        self.meta   = np.ndarray((slots_count, 3), dtype=np.int64, buffer=self.shm.buf, offset=8*header_len)
+        self.data   = np.ndarray((slots_count, batch_len, self.frames_len), dtype=float, buffer=self.shm.buf, offset=8*(header_len+meta_len))
+        self.header[:] = 0
+        self.meta[:]   = -1
+        #Doorbells for waking up waiting readers (non-blocking so that a slow reader never stalls the producer)
+        self.doorbells = [os.pipe() for _ in range(readers_count)]
+        for bell_r, bell_w in self.doorbells:
+            os.set_blocking(bell_r, False)
+            os.set_blocking(bell_w, False)
+
+    def reader(self, index, conflate=False):
+        return RingReader(self, index, conflate)
+
+    def rearm(self):
+        #Restart decimation ticks for a new simulation run (producer process)
+        self.last_tick = -1
+
+    def send(self, framesarray):
+        if self.rate is None:
+            #Write frames batch once (batches longer than a slot are split across consecutive slots, tagged with the model tick ID of their last frame)
+            for k in range(0, framesarray.shape[0], self.batch_len):
+                batch = framesarray[k:k+self.batch_len]
+                self._write(batch, SCHEDULER.tick(batch[-1,0], MODEL_HZ))
+            self._ring()
+        else:
+            #Write one frame per new tick (readers are only woken up when a tick fires)
+            indexes, ticks = SCHEDULER.fired(framesarray[:,0], self.rate, self.last_tick)
+            for i, tick in zip(indexes, ticks):
+                self._write(framesarray[i:i+1], tick)
+            if len(indexes) > 0:
+                self.last_tick = int(ticks[-1])
+                self._ring()
+
+    def close(self):
+        #Producer end of stream
+        self.header[1] = 1
+        self._ring()
+
+    def dropped(self, index):
+        #Stale batches skipped by a conflating reader
+        return int(self.header[2+self.readers_count+index])
+
+    def overruns(self, index):
+        #Batches overwritten by the producer before being read
+        return int(self.header[2+2*self.readers_count+index])
+
+    def lag(self, index):
+        #Batches published but not yet read by reader
+        return int(self.header[0] - self.header[2+index])
+
+    def unlink(self):
+        #Release shared memory and doorbells (owner process only)
+        for bell_r, bell_w in self.doorbells:
+            for fd in (bell_r, bell_w):
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        del self.header, self.meta, self.data
+        try:
+            self.shm.close()
+        except BufferError: #views still referenced by readers in this process
+            pass
+        self.shm.unlink()
+
+    def _write(self, batch, tick):
+        seq  = int(self.header[0])
+        slot = seq % self.slots_count
+        self.meta[slot,0] = -1 #slot being written
+        if self.columns is None:
+            self.data[slot,:batch.shape[0]] = batch
+        else:
+            np.take(batch, self.columns, axis=1, out=self.data[slot,:batch.shape[0]], mode='clip') #project columns straight into the slot
+        self.meta[slot,1] = batch.shape[0]
+        self.meta[slot,2] = tick
+        self.meta[slot,0] = seq
+        self.header[0]    = seq + 1 #publish slot
+
+    def _ring(self):
+        for _, bell_w in self.doorbells:
+            try:
+                os.write(bell_w, b'\x00')
+            except BlockingIOError: #doorbell pipe full (reader has pending wake-ups anyway)
+                pass
+
+''' SHARED MEMORY RING BUFFER READER '''
+class RingReader():
+    #Consumer end of a ring buffer with its own read cursor (pipe-like recv/poll/close interface)
+    #Conflate: only the newest published batch is read, stale batches are skipped and counted as drops
+
+    def __init__(self, ring, index, conflate=False):
+        self.index         = index
+        self.conflate      = conflate
+        self.drops_ind     = 2 + ring.readers_count + index #drops counter header index
+        self.overruns_ind  = 2 + 2 * ring.readers_count + index #overruns counter header index
+        self.header        = ring.header
+        self.meta          = ring.meta
+        self.data          = ring.data
+        self.slots_count   = ring.slots_count
+        self.bell          = ring.doorbells[index][0]
+        self.buffer        = np.empty(ring.data.shape[1:]) #reader-local copy of the last batch read
+        self.seq           = 0 #next sequence to read
+        self.tick          = -1 #tick ID of the last batch read
+
+    @property
+    def dropped_count(self):
+        return int(self.header[self.drops_ind])
+
+    @property
+    def overrun_count(self):
+        return int(self.header[self.overruns_ind])
+
+    def fileno(self):
+        return self.bell
+
+    def skip(self):
+        #Skip every batch published so far (reader handed over to a new simulation run)
+        self.seq = int(self.header[0])
+        self.header[2+self.index] = self.seq #publish cursor
+        self.header[self.drops_ind] = 0 #restart drops counter
+        self.header[self.overruns_ind] = 0 #restart overruns counter
+
+    def poll(self, timeout=0):
+        #Check if a batch is available, waiting up to timeout seconds (None waits forever)
+        if (self.seq < self.header[0]) or (self.header[1] == 1):
+            return True
+        connection.wait([self.bell], timeout)
+        self._drain()
+        return (self.seq < self.header[0]) or (self.header[1] == 1)
+
+    def recv(self):
+        #Next frames batch as a read-only view of the reader-local copy (valid until the next recv)
+        #Seqlock: the slot sequence is checked again after copying, a slot overwritten meanwhile is counted as an overrun and skipped
+        while True:
+            write_seq = int(self.header[0])
+            if self.seq < write_seq:
+                if self.conflate and ((write_seq - self.seq) > 1): #skip stale batches
+                    self.header[self.drops_ind] += write_seq - 1 - self.seq
+                    self.seq = write_seq - 1
+                if (write_seq - self.seq) >= self.slots_count: #reader lapped by producer (oldest slot is the next one to be overwritten)
+                    self.header[self.overruns_ind] += write_seq - self.slots_count + 1 - self.seq
+                    self.seq = write_seq - self.slots_count + 1
+                slot = self.seq % self.slots_count
+                if self.meta[slot,0] != self.seq: #slot being overwritten
+                    self.header[self.overruns_ind] += 1
+                    self.seq += 1
+                    continue
+                count = min(int(self.meta[slot,1]), self.buffer.shape[0])
+                tick  = int(self.meta[slot,2])
+                self.buffer[:count] = self.data[slot,:count] #copy slot before the producer laps it
+                if self.meta[slot,0] != self.seq: #slot overwritten while copying
+                    self.header[self.overruns_ind] += 1
+                    self.seq += 1
+                    continue
+                framesarray = self.buffer[:count]
+                framesarray.flags.writeable = False
+                self.tick   = tick
+                self.seq += 1
+                self.header[2+self.index] = self.seq #publish cursor
+                return framesarray
+            elif self.header[1] == 1:
+                raise EOFError
+            else:
+                connection.wait([self.bell]) #wait for doorbell
+                self._drain()
+
+    def close(self):
+        try:
+            os.close(self.bell)
+        except OSError:
+            pass
+
+    def _drain(self):
+        try:
+            while os.read(self.bell, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+''' LATEST VALUE READER '''
+class LatestReader():
+    #Conflating consumer end of a pipe, every receive returns the newest pending message (stale messages are dropped and counted)
+
+    def __init__(self, conn):
+        self.conn    = conn
+        self.dropped = mp.RawValue('q', 0) #drops counter shared with the supervisor
+
+    @property
+    def dropped_count(self):
+        return self.dropped.value
+
+    def fileno(self):
+        return self.conn.fileno()
+
+    def poll(self, timeout=0):
+        return self.conn.poll(timeout)
+
+    def recv(self):
+        data = self.conn.recv() #wait for a message
+        while self.conn.poll(): #keep the newest pending message
+            data = self.conn.recv()
+            self.dropped.value += 1
+        return data
+
+    def close(self):
+        self.conn.close()
+
+''' SHARED MEMORY CHANNEL ENDS '''
+class RingWriter():
+    #Producer end of a ring buffer carrying stage data (pipe-like send of rows or rows batches)
+
+    def __init__(self, ring):
+        self.ring = ring
+
+    def send(self, data):
+        self.ring.send(np.atleast_2d(data))
+
+    def close(self):
+        pass #end of stream is only published by the RX link (stages are terminated)
+
+class RowReader():
+    #Consumer end of a ring buffer carrying single rows (pipe-like recv of the row sent by the producer)
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    @property
+    def dropped_count(self):
+        return self.reader.dropped_count
+
+    @property
+    def overrun_count(self):
+        return self.reader.overrun_count
+
+    def fileno(self):
+        return self.reader.fileno()
+
+    def skip(self):
+        self.reader.skip()
+
+    def poll(self, timeout=0):
+        return self.reader.poll(timeout)
+
+    def recv(self):
+        return self.reader.recv()[0]
+
+    def close(self):
+        self.reader.close()
+
+''' IN-PROCESS QUEUE '''
+class LocalQueue():
+    #Both ends of a channel between stages fused in the same process (no copy, no pickling, producer runs before consumer)
+    #Conflate: only the newest pending message is received, stale messages are dropped and counted
+
+    def __init__(self, conflate=False):
+        self.conflate = conflate
+        self.dropped  = mp.RawValue('q', 0) #drops counter shared with the supervisor
+        self.items    = collections.deque()
+
+    @property
+    def dropped_count(self):
+        return self.dropped.value
+
+    def poll(self, timeout=0):
+        return len(self.items) > 0 #nothing else can send while waiting
+
+    def send(self, data):
+        self.items.append(data)
+
+    def recv(self):
+        if self.conflate:
+            self.dropped.value += len(self.items) - 1
+            data = self.items.pop()
+            self.items.clear()
+            return data
+        return self.items.popleft()
+
+    send_bytes = send
+    recv_bytes = recv
+
+    def close(self):
+        pass
+
+''' STAGES HEARTBEATS '''
+class Heartbeats():
+    #Heartbeat and loop iteration timing of every stage in shared memory (written by each stage, read by the supervisor, fork start method)
+    #Row layout per stage: HEALTH_STR (tick ID not a number for stages not driven by the tick scheduler)
+
+    def __init__(self, names):
+        self.names = names
+        self.index = {name:k for k, name in enumerate(names)}
+        self.array = np.frombuffer(mp.RawArray('d', len(names) * HEALTH_LEN), dtype=float).reshape(len(names), HEALTH_LEN)
+        self.reset()
+
+    def clock(self):
+        #Loop iteration start timestamp (monotonic clock shared by all processes)
+        return time.monotonic()
+
+    def beat(self, name, t0, tick=None):
+        #Loop iteration of stage completed (started at t0, for tick ID tick if scheduled)
+        row = self.array[self.index[name]]
+        t1  = time.monotonic()
+        if tick is not None:
+            if not np.isnan(row[HEALTH_IND['tick']]):
+                row[HEALTH_IND['skipped']] += max(tick - row[HEALTH_IND['tick']] - 1, 0) #ticks missed since the previous iteration
+            row[HEALTH_IND['tick']] = tick
+        row[HEALTH_IND['iter_t']]   = t1 - t0
+        row[HEALTH_IND['iter_max']] = max(row[HEALTH_IND['iter_max']], t1 - t0)
+        row[HEALTH_IND['iters']]   += 1
+        row[HEALTH_IND['beat']]     = t1
+
+    def reset(self, name=None):
+        #Clear heartbeats of a stage (every stage if no name is given)
+        rows = slice(None) if name is None else self.index[name]
+        self.array[rows]                    = 0
+        self.array[rows,HEALTH_IND['tick']] = np.nan
+
+    def stalled(self, since, timeout):
+        #Stages without heartbeat for longer than timeout from since on (in upstream order)
+        now = time.monotonic()
+        return [name for name in self.names if (now - max(self.array[self.index[name],HEALTH_IND['beat']], since)) > timeout]
+
+    def report(self, name):
+        #Heartbeat age and loop iteration timing of a stage
+        row = self.array[self.index[name]]
+        age = time.monotonic() - row[HEALTH_IND['beat']] if row[HEALTH_IND['iters']] > 0 else np.inf
+        report = '{}: last beat {:.1f} s ago, {:d} iterations, last {:.1f} ms, max {:.1f} ms'.format(name, age, int(row[HEALTH_IND['iters']]), 1000*row[HEALTH_IND['iter_t']], 1000*row[HEALTH_IND['iter_max']])
+        if not np.isnan(row[HEALTH_IND['tick']]): #stage driven by the tick scheduler
+            report += ', tick {:d}, {:d} ticks skipped'.format(int(row[HEALTH_IND['tick']]), int(row[HEALTH_IND['skipped']]))
+        return report
+
+HEARTBEATS = Heartbeats(HEALTH_STAGES_STR) #process-wide heartbeats (allocated before forking the simulation processes)
+
+SIM_RATE_SENT = mp.RawValue('d', SIM_RATE) #simulation rate last sent to FlightGear (written by the supervisor, read by the RX link, allocated before forking the simulation processes)
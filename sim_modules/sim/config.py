@@ -1,4 +1,5 @@
 import socket
+import sys
 
 from settings import *
 
@@ -9,14 +10,57 @@ class FGConfig():
         self.IP_ADDRESS = CFG_IP_ADDRESS
         self.PORT       = CFG_PORT
 
-    def transmit(self, event_rxtcp):
+    def cfgdata(self, sim_rate=SIM_RATE):
+        #Configuration line (py2fg_cfg.xml)
+        return str(sim_rate) + '\t' + str(FPS) + '\t' + str(MAX_TIME_PER_FRAME) + '\n'
+
+    def transmit(self, sup2cfg_out, event_rxtcp, event_end):
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP) #TCP socket
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) #set socket reusability
-        cfgdata = str(SIM_RATE) + '\t' + str(FPS) + '\t' + str(MAX_TIME_PER_FRAME) + '\n'
+        cfgdata = self.cfgdata()
         event_rxtcp.wait() #wait for RX TCP connection event
         print('Configuring FlightGear...')
         sock.connect((self.IP_ADDRESS, self.PORT)) #outgoing TCP connection socket
         sock.sendall(cfgdata.encode()) #send configuration data
         print('FlightGear configured!')
-        sock.shutdown(socket.SHUT_RDWR) #shutdown socket
-        sock.close() #close socket
+        #Persistent config link (runtime simulation rate changes requested by the supervisor)
+        while True:
+            try:
+                if event_end.is_set():
+                    #Close pipe
+                    sup2cfg_out.close()
+                    #Close socket
+                    sock.shutdown(socket.SHUT_RDWR) #shutdown socket
+                    sock.close() #close socket
+                    break
+                elif sup2cfg_out.poll(1): #wait for a simulation rate change (checking simulation end event every second)
+                    sim_rate = sup2cfg_out.recv()
+                    sock.sendall(self.cfgdata(sim_rate).encode()) #send configuration data with the new simulation rate
+            except:
+                raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
+
+''' FLIGHTGEAR PROPERTY TREE MODULE '''
+class FGProperties():
+    #FlightGear property tree (telnet) client repositioning the aircraft between simulation runs (warm reset)
+
+    def __init__(self):
+        self.IP_ADDRESS = CFG_IP_ADDRESS
+        self.PORT       = CFG_PROPS_PORT
+        self.sock       = None
+
+    def reset(self, presets):
+        #Set initial conditions presets and reposition the aircraft (FDM reinitialization restarts the simulation time)
+        try:
+            if self.sock is None:
+                self.sock = socket.create_connection((self.IP_ADDRESS, self.PORT), TELEM_LINK_TIMEOUT) #outgoing TCP connection
+                self.sock.sendall(b'data\r\n') #raw mode (no prompts)
+            for prop, value in presets:
+                self.sock.sendall(' '.join(('set', prop, str(value))).encode() + b'\r\n')
+            self.sock.sendall(b'run reposition\r\n')
+        except:
+            raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
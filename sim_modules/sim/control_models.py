@@ -1,6 +1,8 @@
 from constants import *
 from settings import *
 from modules.func.utils import *
+from modules.sim.channels import *
+from modules.sim.tracing import *
 
 from c172p_model import *
 
@@ -675,7 +677,7 @@ class BaseControlModel():
     #Control model base class
 
     def __init__(self):
-        self.t          = TELEM_WAIT
+        self.tick       = -1 #last tick ID processed
         self.dt         = 1 / CM_HZ
         self.inputs_str = CM_INPUT_STR
         self.states_str = CM_STATE_STR
@@ -739,54 +741,64 @@ class ALCM(BaseControlModel):
                     sp2cm_out.close()
                     break
                 else:
-                    rxdata = rx2cm_out.recv() #receive RX telemetry
-                    if (np.any(rxdata[:,0] >= self.t)):
-                        spdata = sp2cm_out.recv() #receive setpoint
-                        eqdata = eq2cm_out.recv() #receive equilibrium point 
-                        self._preprocess(rxdata, eqdata, spdata) #preprocess piped-in data
-                        self._build() #build ALCM model
-                        actdata = self._build_pipe_data() #build pipe data
-                        self._pipe(cm2act_in, cm2csv_in, actdata) #pipe out to actuation and CSV logging
-                        self.t += self.dt
+                    self.step(cm2act_in, cm2csv_in, eq2cm_out, rx2cm_out, sp2cm_out)
+            except EOFError: #RX telemetry ring buffer closed by the RX link at the end of the simulation run
+                if not event_end.is_set():
+                    raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
             except:
                 raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
 
+    def step(self, cm2act_in, cm2csv_in, eq2cm_out, rx2cm_out, sp2cm_out):
+        #Loop iteration (also called by the fused control chain)
+        rxdata = rx2cm_out.recv() #receive RX telemetry
+        if rx2cm_out.tick > self.tick: #new tick issued by the scheduler
+            self.tick = rx2cm_out.tick
+            spdata = sp2cm_out.recv() #receive setpoint
+            eqdata = eq2cm_out.recv() #receive equilibrium point
+            t0 = TRACER.clock() #tick span start
+            h0 = HEARTBEATS.clock() #loop iteration start
+            self._preprocess(rxdata, eqdata, spdata) #preprocess piped-in data
+            self._build() #build ALCM model
+            actdata = self._build_pipe_data() #build pipe data
+            self._pipe(cm2act_in, cm2csv_in, actdata) #pipe out to actuation and CSV logging
+            TRACER.span('control_model', t0, rxdata[0,0], self.tick)
+            HEARTBEATS.beat('cm', h0, self.tick)
+
     def _preprocess(self, rxdata, eqdata, spdata):
-        i      = np.where(rxdata[:,0] >= self.t)[0][0] #first RX telemetry frame index
-        rxdata = rxdata[i,:] #first RX telemetry frame
-        rxtime = rxdata[0]
+        rxdata = rxdata[0,:] #frame firing the tick
+        rxtime = rxdata[CM_RX_IND['t_sim']]
         #RX telemetry
-        long_delta = rxdata[2]
-        lat_delta  = rxdata[3]
-        h_qfe      = rxdata[11]
-        phi        = rxdata[14]
-        theta      = rxdata[15]
-        psi        = rxdata[16]
-        u          = rxdata[23]
-        v          = rxdata[24]
-        w          = rxdata[25]
-        p          = rxdata[35]
-        q          = rxdata[36]
-        r          = rxdata[37]
-        alphadot   = rxdata[41]
-        sigmara    = rxdata[79] 
-        deltara    = rxdata[80]
-        sigmala    = rxdata[81]
-        deltala    = rxdata[82]
-        sigmae     = rxdata[83]
-        deltae     = rxdata[84]
-        sigmar     = rxdata[87]
-        deltar     = rxdata[88]
-        deltat     = rxdata[89]
-        qbar       = rxdata[94]
-        revprop    = rxdata[101]
-        Ixx        = rxdata[102]
-        Ixy        = rxdata[103]
-        Ixz        = rxdata[104]
-        Iyy        = rxdata[105]
-        Iyz        = rxdata[106]
-        Izz        = rxdata[107]
-        mass       = rxdata[108]
+        long_delta = rxdata[CM_RX_IND['long_delta']]
+        lat_delta  = rxdata[CM_RX_IND['lat_delta']]
+        h_qfe      = rxdata[CM_RX_IND['h_qfe']]
+        phi        = rxdata[CM_RX_IND['phi']]
+        theta      = rxdata[CM_RX_IND['theta']]
+        psi        = rxdata[CM_RX_IND['psi']]
+        u          = rxdata[CM_RX_IND['u']]
+        v          = rxdata[CM_RX_IND['v']]
+        w          = rxdata[CM_RX_IND['w']]
+        p          = rxdata[CM_RX_IND['p']]
+        q          = rxdata[CM_RX_IND['q']]
+        r          = rxdata[CM_RX_IND['r']]
+        alphadot   = rxdata[CM_RX_IND['alphadot']]
+        sigmara    = rxdata[CM_RX_IND['sigmara']] 
+        deltara    = rxdata[CM_RX_IND['deltara']]
+        sigmala    = rxdata[CM_RX_IND['sigmala']]
+        deltala    = rxdata[CM_RX_IND['deltala']]
+        sigmae     = rxdata[CM_RX_IND['sigmae']]
+        deltae     = rxdata[CM_RX_IND['deltae']]
+        sigmar     = rxdata[CM_RX_IND['sigmar']]
+        deltar     = rxdata[CM_RX_IND['deltar']]
+        deltat     = rxdata[CM_RX_IND['deltat']]
+        qbar       = rxdata[CM_RX_IND['qbar']]
+        revprop    = rxdata[CM_RX_IND['revprop']]
+        Ixx        = rxdata[CM_RX_IND['Ixx']]
+        Ixy        = rxdata[CM_RX_IND['Ixy']]
+        Ixz        = rxdata[CM_RX_IND['Ixz']]
+        Iyy        = rxdata[CM_RX_IND['Iyy']]
+        Iyz        = rxdata[CM_RX_IND['Iyz']]
+        Izz        = rxdata[CM_RX_IND['Izz']]
+        mass       = rxdata[CM_RX_IND['mass']]
         #Equilibrium point
         pn_eq     = eqdata[0]
         pe_eq     = eqdata[1]
@@ -1879,53 +1891,63 @@ class ANLCM(BaseControlModel):
                     sp2cm_out.close()
                     break
                 else:
-                    rxdata = rx2cm_out.recv() #receive RX telemetry
-                    if (np.any(rxdata[:,0] >= self.t)):
-                        spdata = sp2cm_out.recv() #receive setpoint
-                        self._preprocess(rxdata, spdata) #preprocess piped-in data
-                        self._build() #build ANLCM model
-                        actdata = self._build_pipe_data() #build pipe data
-                        self._pipe(cm2act_in, cm2csv_in, actdata) #pipe out to actuation and CSV logging
-                        self.t += self.dt
+                    self.step(cm2act_in, cm2csv_in, eq2cm_out, rx2cm_out, sp2cm_out)
+            except EOFError: #RX telemetry ring buffer closed by the RX link at the end of the simulation run
+                if not event_end.is_set():
+                    raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
             except:
                 raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
 
+    def step(self, cm2act_in, cm2csv_in, eq2cm_out, rx2cm_out, sp2cm_out):
+        #Loop iteration (also called by the fused control chain)
+        rxdata = rx2cm_out.recv() #receive RX telemetry
+        if rx2cm_out.tick > self.tick: #new tick issued by the scheduler
+            self.tick = rx2cm_out.tick
+            spdata = sp2cm_out.recv() #receive setpoint
+            t0 = TRACER.clock() #tick span start
+            h0 = HEARTBEATS.clock() #loop iteration start
+            self._preprocess(rxdata, spdata) #preprocess piped-in data
+            self._build() #build ANLCM model
+            actdata = self._build_pipe_data() #build pipe data
+            self._pipe(cm2act_in, cm2csv_in, actdata) #pipe out to actuation and CSV logging
+            TRACER.span('control_model', t0, rxdata[0,0], self.tick)
+            HEARTBEATS.beat('cm', h0, self.tick)
+
     def _preprocess(self, rxdata, spdata):
-        i      = np.where(rxdata[:,0] >= self.t)[0][0] #first RX telemetry frame index
-        rxdata = rxdata[i,:] #first RX telemetry frame
-        rxtime = rxdata[0]
+        rxdata = rxdata[0,:] #frame firing the tick
+        rxtime = rxdata[CM_RX_IND['t_sim']]
         #RX telemetry
-        long_delta = rxdata[2]
-        lat_delta  = rxdata[3]
-        h_qfe      = rxdata[11]
-        phi        = rxdata[14]
-        theta      = rxdata[15]
-        psi        = rxdata[16]
-        u          = rxdata[23]
-        v          = rxdata[24]
-        w          = rxdata[25]
-        p          = rxdata[35]
-        q          = rxdata[36]
-        r          = rxdata[37]
-        alphadot   = rxdata[41]
-        sigmara    = rxdata[79] 
-        deltara    = rxdata[80]
-        sigmala    = rxdata[81]
-        deltala    = rxdata[82]
-        sigmae     = rxdata[83]
-        deltae     = rxdata[84]
-        sigmar     = rxdata[87]
-        deltar     = rxdata[88]
-        deltat     = rxdata[89]
-        qbar       = rxdata[94]
-        revprop    = rxdata[101]
-        Ixx        = rxdata[102]
-        Ixy        = rxdata[103]
-        Ixz        = rxdata[104]
-        Iyy        = rxdata[105]
-        Iyz        = rxdata[106]
-        Izz        = rxdata[107]
-        mass       = rxdata[108]
+        long_delta = rxdata[CM_RX_IND['long_delta']]
+        lat_delta  = rxdata[CM_RX_IND['lat_delta']]
+        h_qfe      = rxdata[CM_RX_IND['h_qfe']]
+        phi        = rxdata[CM_RX_IND['phi']]
+        theta      = rxdata[CM_RX_IND['theta']]
+        psi        = rxdata[CM_RX_IND['psi']]
+        u          = rxdata[CM_RX_IND['u']]
+        v          = rxdata[CM_RX_IND['v']]
+        w          = rxdata[CM_RX_IND['w']]
+        p          = rxdata[CM_RX_IND['p']]
+        q          = rxdata[CM_RX_IND['q']]
+        r          = rxdata[CM_RX_IND['r']]
+        alphadot   = rxdata[CM_RX_IND['alphadot']]
+        sigmara    = rxdata[CM_RX_IND['sigmara']] 
+        deltara    = rxdata[CM_RX_IND['deltara']]
+        sigmala    = rxdata[CM_RX_IND['sigmala']]
+        deltala    = rxdata[CM_RX_IND['deltala']]
+        sigmae     = rxdata[CM_RX_IND['sigmae']]
+        deltae     = rxdata[CM_RX_IND['deltae']]
+        sigmar     = rxdata[CM_RX_IND['sigmar']]
+        deltar     = rxdata[CM_RX_IND['deltar']]
+        deltat     = rxdata[CM_RX_IND['deltat']]
+        qbar       = rxdata[CM_RX_IND['qbar']]
+        revprop    = rxdata[CM_RX_IND['revprop']]
+        Ixx        = rxdata[CM_RX_IND['Ixx']]
+        Ixy        = rxdata[CM_RX_IND['Ixy']]
+        Ixz        = rxdata[CM_RX_IND['Ixz']]
+        Iyy        = rxdata[CM_RX_IND['Iyy']]
+        Iyz        = rxdata[CM_RX_IND['Iyz']]
+        Izz        = rxdata[CM_RX_IND['Izz']]
+        mass       = rxdata[CM_RX_IND['mass']]
         #Conversions
         pn             = lat_delta
         pe             = long_delta
@@ -2145,7 +2167,7 @@ class ANLCM(BaseControlModel):
         TT_out     = TT_interp(J)
         CT         = TT_out
         TP_out     = TP_interp(J)
-        CP         = TP_eq
+        CP         = TP_out
         T          = thrust_eng(CT, rho, revprop)
         P          = power_eng(CP, rho, revprop)
         Va         = Va_acm(u, v, w)
@@ -2264,40 +2286,39 @@ class LANLCM(ANLCM):
         self.cm_dict.update(u_er_cm = u_er_cm)
 
     def _preprocess(self, rxdata, spdata):
-        i      = np.where(rxdata[:,0] >= self.t)[0][0] #first RX telemetry frame index
-        rxdata = rxdata[i,:] #first RX telemetry frame
-        rxtime = rxdata[0]
+        rxdata = rxdata[0,:] #frame firing the tick
+        rxtime = rxdata[CM_RX_IND['t_sim']]
         #RX telemetry
-        long_delta = rxdata[2]
-        lat_delta  = rxdata[3]
-        h_qfe      = rxdata[11]
-        phi        = rxdata[14]
-        theta      = rxdata[15]
-        psi        = rxdata[16]
-        u          = rxdata[23]
-        v          = rxdata[24]
-        w          = rxdata[25]
-        p          = rxdata[35]
-        q          = rxdata[36]
-        r          = rxdata[37]
-        alphadot   = rxdata[41]
-        sigmara    = rxdata[79] 
-        deltara    = rxdata[80]
-        sigmala    = rxdata[81]
-        deltala    = rxdata[82]
-        sigmae     = rxdata[83]
-        deltae     = rxdata[84]
-        sigmar     = rxdata[87]
-        deltar     = rxdata[88]
-        deltat     = rxdata[89]
-        qbar       = rxdata[94]
-        Ixx        = rxdata[102]
-        Ixy        = rxdata[103]
-        Ixz        = rxdata[104]
-        Iyy        = rxdata[105]
-        Iyz        = rxdata[106]
-        Izz        = rxdata[107]
-        mass       = rxdata[108]
+        long_delta = rxdata[CM_RX_IND['long_delta']]
+        lat_delta  = rxdata[CM_RX_IND['lat_delta']]
+        h_qfe      = rxdata[CM_RX_IND['h_qfe']]
+        phi        = rxdata[CM_RX_IND['phi']]
+        theta      = rxdata[CM_RX_IND['theta']]
+        psi        = rxdata[CM_RX_IND['psi']]
+        u          = rxdata[CM_RX_IND['u']]
+        v          = rxdata[CM_RX_IND['v']]
+        w          = rxdata[CM_RX_IND['w']]
+        p          = rxdata[CM_RX_IND['p']]
+        q          = rxdata[CM_RX_IND['q']]
+        r          = rxdata[CM_RX_IND['r']]
+        alphadot   = rxdata[CM_RX_IND['alphadot']]
+        sigmara    = rxdata[CM_RX_IND['sigmara']] 
+        deltara    = rxdata[CM_RX_IND['deltara']]
+        sigmala    = rxdata[CM_RX_IND['sigmala']]
+        deltala    = rxdata[CM_RX_IND['deltala']]
+        sigmae     = rxdata[CM_RX_IND['sigmae']]
+        deltae     = rxdata[CM_RX_IND['deltae']]
+        sigmar     = rxdata[CM_RX_IND['sigmar']]
+        deltar     = rxdata[CM_RX_IND['deltar']]
+        deltat     = rxdata[CM_RX_IND['deltat']]
+        qbar       = rxdata[CM_RX_IND['qbar']]
+        Ixx        = rxdata[CM_RX_IND['Ixx']]
+        Ixy        = rxdata[CM_RX_IND['Ixy']]
+        Ixz        = rxdata[CM_RX_IND['Ixz']]
+        Iyy        = rxdata[CM_RX_IND['Iyy']]
+        Iyz        = rxdata[CM_RX_IND['Iyz']]
+        Izz        = rxdata[CM_RX_IND['Izz']]
+        mass       = rxdata[CM_RX_IND['mass']]
         #Conversions
         pn             = lat_delta
         pe             = long_delta
@@ -12,6 +12,7 @@ class CSVLogging():
 
     def __init__(self):
         #CSV filenames
+        self.campfn    = CAMPAIGN_LOG_FILENAME + '.csv'
         self.cmfn      = CM_LOG_FILENAME + '.csv'
         self.dynfn     = DYN_LOG_FILENAME + '.csv'
         self.eqfn      = EQ_LOG_FILENAME + '.csv'
@@ -19,6 +20,17 @@ class CSVLogging():
         self.telemrxfn = TELEM_RX_LOG_FILENAME + '.csv'
         self.telemtxfn = TELEM_TX_LOG_FILENAME + '.csv'
         
+    def header_camplog(self, log_dir, fieldnames):
+        camppath = os.path.join(log_dir, self.campfn)
+        with open(camppath, 'w', newline='') as csvfile:
+            camplog = csv.writer(csvfile, delimiter=' ') #CSV writer object
+            timestamp = time.strftime('%Y|%b|%d|%H:%M:%S(UTC)', time.gmtime())
+            camplog.writerow(timestamp) #write timestamp into CSV 
+            camplog.writerow('actuation={}|control_model={}|setpoint={}'.format(ACT_TYPE, CM_TYPE, SP_TYPE)) #write simulation information into CSV 
+            del camplog
+            camplog = csv.DictWriter(csvfile, fieldnames=fieldnames) #CSV dictionary writer object
+            camplog.writeheader()
+
     def header_cmlog(self, log_dir):
         cmpath = os.path.join(log_dir, self.cmfn)
         with open(cmpath, 'w', newline='') as csvfile:
@@ -154,17 +166,8 @@ class CSVLogging():
     def read_telemrxlog(self, log_dir):
         TELEM_RX_HEADER_COUNT = 3
         telemrxpath = os.path.join(log_dir, self.telemrxfn)
-        with open(telemrxpath, 'r', newline='') as csvfile:
-            telemrxlog     = csv.reader(csvfile, delimiter=' ') #CSV reader object
-            rowscount = len(list(telemrxlog)) - TELEM_RX_HEADER_COUNT #CSV file rows minus header rows count
-            csvfile.seek(0) #go to first row
-            telemrxdata = np.zeros((rowscount, TELEM_RX_LEN))
-            i = 0
-            for row in telemrxlog:
-                if i >= TELEM_RX_HEADER_COUNT: #avoid reading CSV log header
-                    telemrxdata[i-TELEM_RX_HEADER_COUNT,:] = row[0].split(',')
-                i += 1
-            return telemrxdata
+        telemrxdata = np.loadtxt(telemrxpath, delimiter=',', skiprows=TELEM_RX_HEADER_COUNT, ndmin=2) #parse all rows at once avoiding CSV log header
+        return telemrxdata
 
     def read_telemtxlog(self, log_dir):
         TELEM_TX_HEADER_COUNT = 3
@@ -181,7 +184,13 @@ class CSVLogging():
                 i += 1
             return telemtxdata
 
-    def write_cmlog(self, log_dir, cm2csv_out, event_start, event_end):
+    def write_camplog(self, log_dir, fieldnames, campdata):
+        camppath = os.path.join(log_dir, self.campfn)
+        with open(camppath, 'a+', newline='') as csvfile:
+            camplog = csv.DictWriter(csvfile, fieldnames=fieldnames) #CSV writer object
+            camplog.writerow(dict(zip(fieldnames, campdata))) #write finished run into CSV 
+
+    def write_cmlog(self, log_dir, cm2csv_out, event_start, event_flush):
         cmpath = os.path.join(log_dir, self.cmfn)
         fieldnames = ('time', *CM_STATE_STR)
         csvdata = np.zeros((CM_HZ, CM_STATE_LEN + 1)) #array for storing data frames
@@ -189,11 +198,12 @@ class CSVLogging():
         event_start.wait() #wait for simulation start
         while True:
             try:
-                if event_end.is_set():
+                if event_flush.is_set() and (not cm2csv_out.poll()): #producers stopped and pipe drained
+                    self._write_partial(cmpath, fieldnames, csvdata[:i]) #write partial array into CSV
                     #Close pipe
                     cm2csv_out.close()
                     break
-                else:
+                elif cm2csv_out.poll(CSV_FLUSH_POLL):
                     cmdata       = cm2csv_out.recv()
                     csvdata[i,:] = cmdata
                     i += 1
@@ -205,7 +215,7 @@ class CSVLogging():
             except:
                 raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
 
-    def write_dynlog(self, log_dir, dyn2csv_out, event_start, event_end):
+    def write_dynlog(self, log_dir, dyn2csv_out, event_start, event_flush):
         dynpath = os.path.join(log_dir, self.dynfn)
         fieldnames = ('time', *DYN_STR)
         csvdata1 = np.zeros((MODEL_HZ, DYN_LEN + 1)) #array for storing data frames
@@ -214,11 +224,12 @@ class CSVLogging():
         event_start.wait() #wait for simulation start
         while True:
             try:
-                if event_end.is_set():
+                if event_flush.is_set() and (not dyn2csv_out.poll()): #producers stopped and pipe drained
+                    self._write_partial(dynpath, fieldnames, csvdata1[:i]) #write partial array into CSV
                     #Close pipe
                     dyn2csv_out.close()
                     break
-                else:
+                elif dyn2csv_out.poll(CSV_FLUSH_POLL):
                     dyndata = dyn2csv_out.recv() #receive RX telemetry
                     framescount = dyndata.shape[0]
                     for j in range(framescount):                
@@ -237,7 +248,7 @@ class CSVLogging():
             except:
                 raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
 
-    def write_eqlog(self, log_dir, eq2csv_out, event_start, event_end):
+    def write_eqlog(self, log_dir, eq2csv_out, event_start, event_flush):
         eqpath = os.path.join(log_dir, self.eqfn)
         fieldnames = ('time', *CM_STATE_STR, *CM_INPUT_STR)
         csvdata = np.zeros((CM_HZ, CM_STATE_LEN + CM_INPUT_LEN + 1)) #array for storing data frames
@@ -245,11 +256,12 @@ class CSVLogging():
         event_start.wait() #wait for simulation start
         while True:
             try:
-                if event_end.is_set():
+                if event_flush.is_set() and (not eq2csv_out.poll()): #producers stopped and pipe drained
+                    self._write_partial(eqpath, fieldnames, csvdata[:i]) #write partial array into CSV
                     #Close pipe
                     eq2csv_out.close()
                     break
-                else:
+                elif eq2csv_out.poll(CSV_FLUSH_POLL):
                     eqdata = eq2csv_out.recv()
                     csvdata[i,:] = eqdata
                     i += 1
@@ -261,7 +273,7 @@ class CSVLogging():
             except:
                 raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
 
-    def write_splog(self, log_dir, sp2csv_out, event_start, event_end):
+    def write_splog(self, log_dir, sp2csv_out, event_start, event_flush):
         sppath = os.path.join(log_dir, self.spfn)
         fieldnames = ('time', *CM_STATE_STR, *CM_INPUT_STR)
         csvdata = np.zeros((CM_HZ, CM_STATE_LEN + CM_INPUT_LEN + 1)) #array for storing data frames
@@ -269,11 +281,12 @@ class CSVLogging():
         event_start.wait() #wait for simulation start
         while True:
             try:
-                if event_end.is_set():
+                if event_flush.is_set() and (not sp2csv_out.poll()): #producers stopped and pipe drained
+                    self._write_partial(sppath, fieldnames, csvdata[:i]) #write partial array into CSV
                     #Close pipe
                     sp2csv_out.close()
                     break
-                else:
+                elif sp2csv_out.poll(CSV_FLUSH_POLL):
                     spdata = sp2csv_out.recv()
                     csvdata[i,:] = spdata
                     i += 1
@@ -285,7 +298,7 @@ class CSVLogging():
             except:
                 raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
 
-    def write_telemrxlog(self, log_dir, rx2csv_out, event_start, event_end):
+    def write_telemrxlog(self, log_dir, rx2csv_out, event_start, event_flush):
         telemrxpath = os.path.join(log_dir, self.telemrxfn)
         fieldnames = TELEM_RX_STR
         csvdata1 = np.zeros((MODEL_HZ, TELEM_RX_LEN)) #array for storing data frames
@@ -294,11 +307,12 @@ class CSVLogging():
         event_start.wait() #wait for simulation start
         while True:
             try:
-                if event_end.is_set():
+                if event_flush.is_set() and (not rx2csv_out.poll()): #producers stopped and pipe drained
+                    self._write_partial(telemrxpath, fieldnames, csvdata1[:i]) #write partial array into CSV
                     #Close pipe
                     rx2csv_out.close()
                     break
-                else:
+                elif rx2csv_out.poll(CSV_FLUSH_POLL):
                     rxdata = rx2csv_out.recv() #receive RX telemetry
                     framescount = rxdata.shape[0]
                     for j in range(framescount):                
@@ -314,10 +328,13 @@ class CSVLogging():
                         i = (i - MODEL_HZ) if (i - MODEL_HZ) > 0 else 0
                         csvdata1 = csvdata2
                         csvdata2 = np.empty((MODEL_HZ, TELEM_RX_LEN)) #empty backup array 
+            except EOFError: #RX telemetry ring buffer closed by the RX link (drained)
+                self._write_partial(telemrxpath, fieldnames, csvdata1[:i]) #write partial array into CSV
+                break
             except:
                 raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
 
-    def write_telemtxlog(self, log_dir, act2csv_out, event_start, event_end):
+    def write_telemtxlog(self, log_dir, act2csv_out, event_start, event_flush):
         telemtxpath = os.path.join(log_dir, self.telemtxfn)
         fieldnames = ('time', *TELEM_TX_STR)
         csvdata = np.zeros((ACT_HZ, TELEM_TX_LEN + 1)) #array for storing data frames
@@ -325,11 +342,12 @@ class CSVLogging():
         event_start.wait() #wait for simulation start
         while True:
             try:
-                if event_end.is_set():
+                if event_flush.is_set() and (not act2csv_out.poll()): #producers stopped and pipe drained
+                    self._write_partial(telemtxpath, fieldnames, csvdata[:i]) #write partial array into CSV
                     #Close pipe
                     act2csv_out.close()
                     break
-                else:
+                elif act2csv_out.poll(CSV_FLUSH_POLL):
                     actdata = act2csv_out.recv()
                     csvdata[i,:] = actdata
                     i += 1
@@ -340,3 +358,9 @@ class CSVLogging():
                         i = 0
             except:
                 raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
+
+    def _write_partial(self, path, fieldnames, csvdata):
+        #Write the rows buffered when the simulation run ends
+        with open(path, 'a+', newline='') as csvfile:
+            csvlog = csv.DictWriter(csvfile, fieldnames=fieldnames) #CSV writer object
+            csvlog.writerows((dict(zip(fieldnames, csvdata[k,:])) for k in range(csvdata.shape[0]))) #write array into CSV
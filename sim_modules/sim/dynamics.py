@@ -1,6 +1,7 @@
 from constants import *
 from settings import *
 from c172p_model import *
+from modules.sim.channels import *
 
 import numpy as np
 
@@ -20,44 +21,50 @@ class Dynamics():
                 rx2dyn_out.close()
                 break
             else:
-                rxdata      = rx2dyn_out.recv() #receive RX telemetry
+                try:
+                    rxdata = rx2dyn_out.recv() #receive RX telemetry
+                except EOFError: #RX telemetry ring buffer closed by the RX link at the end of the simulation run
+                    if not event_end.is_set():
+                        raise
+                    continue
+                h0          = HEARTBEATS.clock() #loop iteration start
                 framescount = rxdata.shape[0]
                 for i in range(framescount):                
                     #RX telemetry
-                    t_sim    = rxdata[i,0]
-                    phi      = rxdata[i,14]
-                    theta    = rxdata[i,15]
-                    psi      = rxdata[i,16]
-                    alpha    = rxdata[i,17]
-                    beta     = rxdata[i,18]
-                    p        = rxdata[i,35]
-                    q        = rxdata[i,36]
-                    r        = rxdata[i,37]
-                    alphadot = rxdata[i,41]
-                    sigmara  = rxdata[i,79] 
-                    sigmala  = rxdata[i,81]
-                    sigmae   = rxdata[i,83]
-                    sigmaf   = rxdata[i,85]
-                    sigmar   = rxdata[i,87]
-                    Bw2Va    = rxdata[i,91]
-                    Cw2Va    = rxdata[i,92]
-                    hmacb    = rxdata[i,93]
-                    qbar     = rxdata[i,94]
-                    qbaruw   = rxdata[i,95]
-                    qbarprop = rxdata[i,96]
-                    qbarind  = rxdata[i,97]
-                    stall    = rxdata[i,98]
-                    rho      = rxdata[i,99]
-                    J        = rxdata[i,100]
-                    revprop  = rxdata[i,101]
-                    Ixx      = rxdata[i,102]
-                    Ixy      = rxdata[i,103]
-                    Ixz      = rxdata[i,104]
-                    Iyy      = rxdata[i,105]
-                    Iyz      = rxdata[i,106]
-                    Izz      = rxdata[i,107]
-                    mass     = rxdata[i,108]
-                    grav     = rxdata[i,109]
+                    t_sim    = rxdata[i,DYN_RX_IND['t_sim']]
+                    phi      = rxdata[i,DYN_RX_IND['phi']]
+                    theta    = rxdata[i,DYN_RX_IND['theta']]
+                    psi      = rxdata[i,DYN_RX_IND['psi']]
+                    alpha    = rxdata[i,DYN_RX_IND['alpha']]
+                    beta     = rxdata[i,DYN_RX_IND['beta']]
+                    p        = rxdata[i,DYN_RX_IND['p']]
+                    q        = rxdata[i,DYN_RX_IND['q']]
+                    r        = rxdata[i,DYN_RX_IND['r']]
+                    alphadot = rxdata[i,DYN_RX_IND['alphadot']]
+                    sigmara  = rxdata[i,DYN_RX_IND['sigmara']] 
+                    sigmala  = rxdata[i,DYN_RX_IND['sigmala']]
+                    sigmae   = rxdata[i,DYN_RX_IND['sigmae']]
+                    sigmaf   = rxdata[i,DYN_RX_IND['sigmaf']]
+                    sigmar   = rxdata[i,DYN_RX_IND['sigmar']]
+                    Bw2Va    = rxdata[i,DYN_RX_IND['Bw2Va']]
+                    Cw2Va    = rxdata[i,DYN_RX_IND['Cw2Va']]
+                    hmacb    = rxdata[i,DYN_RX_IND['hmacb']]
+                    qbar     = rxdata[i,DYN_RX_IND['qbar']]
+                    qbaruw   = rxdata[i,DYN_RX_IND['qbaruw']]
+                    qbarprop = rxdata[i,DYN_RX_IND['qbarprop']]
+                    qbarind  = rxdata[i,DYN_RX_IND['qbarind']]
+                    stall    = rxdata[i,DYN_RX_IND['stall']]
+                    rho      = rxdata[i,DYN_RX_IND['rho']]
+                    J        = rxdata[i,DYN_RX_IND['J']]
+                    revprop  = rxdata[i,DYN_RX_IND['revprop']]
+                    Ixx      = rxdata[i,DYN_RX_IND['Ixx']]
+                    Ixy      = rxdata[i,DYN_RX_IND['Ixy']]
+                    Ixz      = rxdata[i,DYN_RX_IND['Ixz']]
+                    Iyy      = rxdata[i,DYN_RX_IND['Iyy']]
+                    Iyz      = rxdata[i,DYN_RX_IND['Iyz']]
+                    Izz      = rxdata[i,DYN_RX_IND['Izz']]
+                    mass     = rxdata[i,DYN_RX_IND['mass']]
+                    grav     = rxdata[i,DYN_RX_IND['grav']]
                     #Conversions
                     sigmaa_avg = sigmaa_avg_acm(sigmala, sigmara)
                     euler      = np.array([phi, theta, psi], dtype=float)
@@ -125,4 +132,5 @@ class Dynamics():
                     self.csvdyn[i,:] = [t_sim, D, C, L, T, gx, gy, gz, l, m, n, CD1, CD2, CD3, CD4, CC1, CC2, CL1, CL2, CL3, CL4, CL5, Cl1, Cl2, Cl3, Cl4, Cl5, Cm1, Cm2, Cm3, Cm4, Cm5, Cm6, Cn1, Cn2, Cn3, Cn4, Cn5, Cn6]
 
                 dyn2csv_in.send(self.csvdyn[:framescount,:]) #send dynamics to CSV
+                HEARTBEATS.beat('dyn', h0)
                 self.csvdyn = np.empty((MODEL_HZ, DYN_LEN + 1)) #empty array 
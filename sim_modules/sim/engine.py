@@ -0,0 +1,216 @@
+from constants import *
+from settings import *
+from modules.func.utils import *
+from modules.sim.config import *
+from modules.sim.telemetry import *
+from modules.sim.tracing import *
+
+import asyncio
+import numpy as np
+import os
+import socket
+import sys
+
+''' TELEMETRY ENGINE MODULE '''
+class TelemetryEngine():
+    #Single asyncio process owning the RX, TX and config links with FlightGear (non-blocking sockets, timeouts and reconnection)
+
+    def __init__(self):
+        self.CFG_IP_ADDRESS = CFG_IP_ADDRESS
+        self.CFG_PORT       = CFG_PORT
+        self.RX_IP_ADDRESS  = TELEM_RX_IP_ADDRESS
+        self.RX_PORT        = TELEM_RX_PORT
+        self.TX_IP_ADDRESS  = TELEM_TX_IP_ADDRESS
+        self.TX_PORT        = TELEM_TX_PORT
+        self.cfg            = FGConfig() #configuration data
+        self.telem          = Telemetry() #RX telemetry decoder
+
+    def run(self, log_dir, act2tx_out, rx_rings, sup2cfg_out, event_rxtcp, event_txtcp, event_start, event_end):
+        try:
+            asyncio.run(self._main(log_dir, act2tx_out, rx_rings, sup2cfg_out, event_rxtcp, event_txtcp, event_start, event_end))
+        except:
+            raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
+
+    async def _main(self, log_dir, act2tx_out, rx_rings, sup2cfg_out, event_rxtcp, event_txtcp, event_start, event_end):
+        loop = asyncio.get_running_loop()
+        #RX link
+        if self.telem._udp:
+            rx_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP) #UDP RX socket
+            rx_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) #set RX socket reusability
+            rx_sock.bind((self.RX_IP_ADDRESS, self.RX_PORT)) #bind UDP RX socket to ip and port
+            rx_sock.setblocking(False)
+            print('Waiting for RX link with FlightGear...')
+            await self._readable(loop, rx_sock) #wait for the first datagram without consuming it
+            self.rx_conn = rx_sock
+        else:
+            rx_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP) #TCP RX socket
+            rx_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) #set RX socket reusability
+            rx_sock.bind((self.RX_IP_ADDRESS, self.RX_PORT)) #bind TCP RX socket to ip and port
+            rx_sock.listen(1) #listen to flighgear TCP request
+            rx_sock.setblocking(False)
+            print('Waiting for RX link with FlightGear...')
+            self.rx_conn = await self._accept(loop, rx_sock)
+        print('RX link established!')
+        event_rxtcp.set() #set RX TCP connection event
+        if TELEM_RX_CAPTURE: #raw RX telemetry capture into the log directory
+            capture = RXCapture(os.path.join(log_dir, TELEM_RX_CAPTURE_FILENAME + '.bin'), self.telem._binary)
+        else:
+            capture = None
+        rxbuffer = self.telem._rxbuffer(self.telem._decode, self.telem._binary, capture) #RX telemetry frames reassembler or datagrams decoder
+        rxgate   = RXGate(rx_rings, event_start) #RX telemetry publishing from TELEM_WAIT on (re-armed on warm resets)
+        rx_task  = asyncio.create_task(self._receive(loop, rx_sock, rxbuffer, rxgate, event_rxtcp)) #keep receiving while the other links are established
+        #Config link
+        print('Configuring FlightGear...')
+        self.cfg_sock = await self._connect(loop, self.CFG_IP_ADDRESS, self.CFG_PORT)
+        await loop.sock_sendall(self.cfg_sock, self.cfg.cfgdata().encode()) #send configuration data
+        print('FlightGear configured!')
+        cfgqueue = asyncio.Queue() #simulation rate changes pending to be sent
+        loop.add_reader(sup2cfg_out.fileno(), self._on_sim_rate, sup2cfg_out, cfgqueue, loop) #simulation rate pipe readiness callback
+        cfg_task = asyncio.create_task(self._configure(loop, cfgqueue))
+        #TX link
+        print('Waiting for TX link with FlightGear...')
+        self.tx_sock = await self._connect(loop, self.TX_IP_ADDRESS, self.TX_PORT, self.telem._udp)
+        print('TX link established!')
+        event_txtcp.set() #set TX TCP connection event
+        txqueue = asyncio.Queue() #actuation lines pending to be sent
+        loop.add_reader(act2tx_out.fileno(), self._on_actuation, act2tx_out, txqueue, loop) #actuation pipe readiness callback
+        tx_task = asyncio.create_task(self._transmit(loop, txqueue))
+        #Wait for simulation end event or a link failure (links tasks only complete by raising)
+        end_task   = asyncio.create_task(self._wait_event(loop, event_end))
+        link_tasks = (cfg_task, rx_task, tx_task)
+        await asyncio.wait((end_task,) + link_tasks, return_when=asyncio.FIRST_COMPLETED)
+        failed = [task for task in link_tasks if task.done() and (not task.cancelled())]
+        loop.remove_reader(act2tx_out.fileno())
+        loop.remove_reader(sup2cfg_out.fileno())
+        for task in (end_task,) + link_tasks:
+            task.cancel()
+        await asyncio.gather(end_task, *link_tasks, return_exceptions=True)
+        #Close pipes and ring buffers (end of RX telemetry stream only published at the simulation end)
+        act2tx_out.close()
+        sup2cfg_out.close()
+        if not failed:
+            for rx_ring in rx_rings:
+                rx_ring.close()
+        print(' '.join(('RX link counters:', str(rxbuffer.counters()))))
+        #Close capture
+        if capture is not None:
+            capture.close()
+        #Close sockets
+        self.cfg_sock.close()
+        self.tx_sock.close()
+        self.rx_conn.close()
+        if self.rx_conn is not rx_sock:
+            rx_sock.close()
+        if failed: #links process exits with an error (the supervisor is notified through its sentinel)
+            raise failed[0].exception()
+
+    async def _accept(self, loop, sock):
+        #Incoming TCP connection within the link timeout
+        conn, _ = await asyncio.wait_for(loop.sock_accept(sock), TELEM_LINK_TIMEOUT)
+        conn.setblocking(False)
+        return conn
+
+    async def _connect(self, loop, ip_address, port, udp=False):
+        #Outgoing TCP connection retried until FlightGear listens or the link timeout expires (UDP only sets the datagrams destination)
+        if udp:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+            sock.setblocking(False)
+            await loop.sock_connect(sock, (ip_address, port))
+            return sock
+        deadline = loop.time() + TELEM_LINK_TIMEOUT
+        while True:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) #send short lines without Nagle delay
+            sock.setblocking(False)
+            try:
+                await loop.sock_connect(sock, (ip_address, port))
+                return sock
+            except OSError:
+                sock.close()
+                if loop.time() > deadline:
+                    raise
+                await asyncio.sleep(TELEM_LINK_RETRY)
+
+    async def _wait_event(self, loop, event):
+        #Wait for a multiprocessing event without blocking the event loop (executor thread released every link retry period so that cancelling never leaves it blocked)
+        while not await loop.run_in_executor(None, event.wait, TELEM_LINK_RETRY):
+            pass
+
+    async def _readable(self, loop, sock):
+        #Wait within the link timeout until data can be received from a socket
+        readable = loop.create_future()
+        loop.add_reader(sock.fileno(), lambda: readable.done() or readable.set_result(None))
+        try:
+            await asyncio.wait_for(readable, TELEM_LINK_TIMEOUT)
+        finally:
+            loop.remove_reader(sock.fileno())
+
+    def _on_actuation(self, act2tx_out, txqueue, loop):
+        #Move every pending actuation line from the pipe into the TX queue
+        try:
+            while act2tx_out.poll():
+                txqueue.put_nowait(act2tx_out.recv_bytes())
+        except EOFError: #actuation pipe closed
+            loop.remove_reader(act2tx_out.fileno())
+
+    def _on_sim_rate(self, sup2cfg_out, cfgqueue, loop):
+        #Move every pending simulation rate change from the pipe into the config queue
+        try:
+            while sup2cfg_out.poll():
+                cfgqueue.put_nowait(sup2cfg_out.recv())
+        except EOFError: #simulation rate pipe closed
+            loop.remove_reader(sup2cfg_out.fileno())
+
+    async def _configure(self, loop, cfgqueue):
+        while True:
+            sim_rate = await cfgqueue.get()
+            try:
+                await loop.sock_sendall(self.cfg_sock, self.cfg.cfgdata(sim_rate).encode()) #send configuration data with the new simulation rate
+            except (BrokenPipeError, ConnectionResetError): #config link closed by FlightGear
+                print('Config link lost, reconnecting to FlightGear...')
+                self.cfg_sock.close()
+                self.cfg_sock = await self._connect(loop, self.CFG_IP_ADDRESS, self.CFG_PORT)
+                await loop.sock_sendall(self.cfg_sock, self.cfg.cfgdata(sim_rate).encode()) #send configuration data with the new simulation rate again
+                print('Config link established!')
+
+    async def _receive(self, loop, rx_sock, rxbuffer, rxgate, event_rxtcp):
+        while True:
+            try:
+                nbytes = await asyncio.wait_for(loop.sock_recv_into(self.rx_conn, rxbuffer.recv_view()), TELEM_LINK_TIMEOUT)
+            except asyncio.TimeoutError: #no RX telemetry within the link timeout (FlightGear gone without closing the connection)
+                print('RX link stalled!')
+                if self.telem._udp: #no connection to drop, the engine fails
+                    raise
+                nbytes = 0 #drop the half-open connection as if FlightGear closed it
+            t0 = TRACER.clock() #RX span start
+            h0 = HEARTBEATS.clock() #loop iteration start
+            framesarray = rxbuffer.feed(nbytes) #decode complete frames
+            if rxbuffer.closed: #RX link closed by FlightGear
+                print('RX link lost, waiting for FlightGear...')
+                event_rxtcp.clear() #RX link drained (the supervisor ends the run once the scenario exited)
+                self.rx_conn.close()
+                self.rx_conn    = await self._accept(loop, rx_sock)
+                rxbuffer.closed = False
+                print('RX link established!')
+                event_rxtcp.set() #set RX TCP connection event
+                continue
+            framesarray = rxtelem_to_SI(framesarray)
+            if rxgate.send(framesarray): #if at least one frame was published
+                TRACER.span('rx_parse', t0, framesarray[-1,0], rxgate.ticks)
+                HEARTBEATS.beat('rx', h0)
+
+    async def _transmit(self, loop, txqueue):
+        while True:
+            txdata = await txqueue.get() #tick ID and encoded actuation
+            tick   = int.from_bytes(txdata[:TELEM_TX_TICK_LEN], sys.byteorder, signed=True)
+            try:
+                t0 = TRACER.clock() #TX span start
+                await loop.sock_sendall(self.tx_sock, memoryview(txdata)[TELEM_TX_TICK_LEN:]) #sending TX telemetry data (one datagram per actuation line over UDP)
+                TRACER.span('tx_send', t0, tick=tick)
+            except ConnectionRefusedError: #UDP datagram not delivered (FlightGear not listening yet)
+                continue
+            except (BrokenPipeError, ConnectionResetError): #TX link closed by FlightGear
+                print('TX link lost, reconnecting to FlightGear...')
+                self.tx_sock.close()
+                self.tx_sock = await self._connect(loop, self.TX_IP_ADDRESS, self.TX_PORT, self.telem._udp)
+                print('TX link established!')
@@ -3,6 +3,8 @@ from constants import *
 from settings import *
 from modules.func.utils import *
 from modules.sim.control_models import *
+from modules.sim.channels import *
+from modules.sim.tracing import *
 
 import numpy as np
 from pyquaternion import Quaternion
@@ -13,7 +15,7 @@ import sys
 class Equilibrium():
 
     def __init__(self):
-        self.t           = TELEM_WAIT
+        self.tick        = -1 #last tick ID processed
         self.dt          = 1 / CM_HZ
         self.csvdata     = np.zeros(CM_STATE_LEN + CM_INPUT_LEN + 1) #array for storing csv equilibrium
         self.Z_STATE_LEN = len(EQ_STATE_IND)
@@ -32,18 +34,27 @@ class Equilibrium():
                         rx2eq_out.close()
                         break
                     else:
-                        rxdata = rx2eq_out.recv() #receive RX telemetry
-                        if (np.any(rxdata[:,0] >= self.t)):
-                            self._preprocess(rxdata)
-                            self._find_eq()
-                            eqdata = self._build_pipe_data()
-                            self._pipe(eq2cm_in, eq2csv_in, eqdata)
-                            self.t = self.t + self.dt
-                        else:
-                            pass
+                        self.step(eq2cm_in, eq2csv_in, rx2eq_out)
+                except EOFError: #RX telemetry ring buffer closed by the RX link at the end of the simulation run
+                    if not event_end.is_set():
+                        raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
                 except:
                     raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
 
+    def step(self, eq2cm_in, eq2csv_in, rx2eq_out):
+        #Loop iteration (also called by the fused control chain)
+        rxdata = rx2eq_out.recv() #receive RX telemetry
+        if rx2eq_out.tick > self.tick: #new tick issued by the scheduler
+            self.tick = rx2eq_out.tick
+            t0 = TRACER.clock() #tick span start
+            h0 = HEARTBEATS.clock() #loop iteration start
+            self._preprocess(rxdata)
+            self._find_eq()
+            eqdata = self._build_pipe_data()
+            self._pipe(eq2cm_in, eq2csv_in, eqdata)
+            TRACER.span('equilibrium', t0, rxdata[0,0], self.tick)
+            HEARTBEATS.beat('eq', h0, self.tick)
+
     def _init(self):
         #Initialize dictionaries
         self.eq_dict   = {} #equilibrium point dictionary
@@ -66,42 +77,41 @@ class Equilibrium():
         self.eq_dict.update(prev_u_eq_cm = prev_u_eq_cm)
 
     def _preprocess(self, rxdata):
-        i      = np.where(rxdata[:,0] >= self.t)[0][0] #find first frame index
-        rxdata = rxdata[i,:] #get first frame
-        rxtime = rxdata[0]
+        rxdata = rxdata[0,:] #frame firing the tick
+        rxtime = rxdata[EQ_RX_IND['t_sim']]
         self.phys_dict.update(rxtime = rxtime)
         #RX telemetry
-        long_delta = rxdata[2]
-        lat_delta  = rxdata[3]
-        h_qfe      = rxdata[11]
-        phi        = rxdata[14]
-        theta      = rxdata[15]
-        psi        = rxdata[16]
-        u          = rxdata[23]
-        v          = rxdata[24]
-        w          = rxdata[25]
-        p          = rxdata[35]
-        q          = rxdata[36]
-        r          = rxdata[37]
-        alphadot   = rxdata[41]
-        sigmara    = rxdata[79] 
-        deltara    = rxdata[80]
-        sigmala    = rxdata[81]
-        deltala    = rxdata[82]
-        sigmae     = rxdata[83]
-        deltae     = rxdata[84]
-        sigmar     = rxdata[87]
-        deltar     = rxdata[88]
-        deltat     = rxdata[89]
-        qbar       = rxdata[94]
-        revprop    = rxdata[101]
-        Ixx        = rxdata[102]
-        Ixy        = rxdata[103]
-        Ixz        = rxdata[104]
-        Iyy        = rxdata[105]
-        Iyz        = rxdata[106]
-        Izz        = rxdata[107]
-        mass       = rxdata[108]
+        long_delta = rxdata[EQ_RX_IND['long_delta']]
+        lat_delta  = rxdata[EQ_RX_IND['lat_delta']]
+        h_qfe      = rxdata[EQ_RX_IND['h_qfe']]
+        phi        = rxdata[EQ_RX_IND['phi']]
+        theta      = rxdata[EQ_RX_IND['theta']]
+        psi        = rxdata[EQ_RX_IND['psi']]
+        u          = rxdata[EQ_RX_IND['u']]
+        v          = rxdata[EQ_RX_IND['v']]
+        w          = rxdata[EQ_RX_IND['w']]
+        p          = rxdata[EQ_RX_IND['p']]
+        q          = rxdata[EQ_RX_IND['q']]
+        r          = rxdata[EQ_RX_IND['r']]
+        alphadot   = rxdata[EQ_RX_IND['alphadot']]
+        sigmara    = rxdata[EQ_RX_IND['sigmara']] 
+        deltara    = rxdata[EQ_RX_IND['deltara']]
+        sigmala    = rxdata[EQ_RX_IND['sigmala']]
+        deltala    = rxdata[EQ_RX_IND['deltala']]
+        sigmae     = rxdata[EQ_RX_IND['sigmae']]
+        deltae     = rxdata[EQ_RX_IND['deltae']]
+        sigmar     = rxdata[EQ_RX_IND['sigmar']]
+        deltar     = rxdata[EQ_RX_IND['deltar']]
+        deltat     = rxdata[EQ_RX_IND['deltat']]
+        qbar       = rxdata[EQ_RX_IND['qbar']]
+        revprop    = rxdata[EQ_RX_IND['revprop']]
+        Ixx        = rxdata[EQ_RX_IND['Ixx']]
+        Ixy        = rxdata[EQ_RX_IND['Ixy']]
+        Ixz        = rxdata[EQ_RX_IND['Ixz']]
+        Iyy        = rxdata[EQ_RX_IND['Iyy']]
+        Iyz        = rxdata[EQ_RX_IND['Iyz']]
+        Izz        = rxdata[EQ_RX_IND['Izz']]
+        mass       = rxdata[EQ_RX_IND['mass']]
         #Conversions
         pn             = lat_delta
         pe             = long_delta
@@ -0,0 +1,212 @@
+from constants import *
+from settings import *
+from modules.func.utils import *
+from modules.sim.chain import *
+from modules.sim.channels import *
+
+import functools
+import multiprocessing as mp
+
+''' STAGE GRAPH '''
+class StageGraph():
+    #Simulation pipeline described as stages connected by typed channels (processes and channels ends are built from the description)
+    #Stage:   name: (kind, module, target, arguments), arguments are global dictionary keys (channels ends, events, log directory) in call order
+    #Channel: name: (producer, consumer, type, options), ends are named <name>_in (producer end) and <name>_out (consumer end)
+    #Kinds:   'link' (FlightGear links, kept alive on warm resets), 'stage' (restartable), 'log' (CSV logging), 'fused' (called by a control chain stage)
+    #Chain:   stage with target 'chain' whose arguments are the fused stages names in call order (single process, one loop iteration of each fused stage per tick)
+    #Types:   'frames' (RX telemetry), 'array' (rows of floats), 'bytes' (raw lines), 'object' (pickled data)
+
+    def __init__(self):
+        self.fused    = self._fused()
+        self.stages   = self._stages()
+        self.channels = self._channels()
+        self.rings    = [] #shared memory ring buffers of the current channels ends
+        self._check()
+
+    def names(self, kind):
+        #Stages names of a kind (in start order)
+        return [name for name, stage in self.stages.items() if stage[0] == kind]
+
+    def transport(self, name):
+        #Channel transport: 'pipe', 'shm' (shared memory ring buffer) or 'queue' (in-process)
+        if self.channels[name][2] == 'frames': #RX telemetry is always projected and decimated per consumer in shared memory
+            return 'shm'
+        transport = CHANNEL_TRANSPORTS.get(name, 'queue' if self._in_process(name) else 'pipe') #in-process queue between fused stages by default
+        if (transport == 0) or (transport == 'pipe'):
+            return 'pipe'
+        elif (transport == 1) or (transport == 'shm'):
+            return 'shm'
+        elif (transport == 2) or (transport == 'queue'):
+            return 'queue'
+        raise ValueError(' '.join(('Unknown channel transport:', name, str(transport))))
+
+    def process_name(self, name):
+        #Process running a stage (or channel endpoint)
+        return 'ctl' if name in self.fused else name
+
+    def build(self, old_ends=None):
+        #Channels ends of a new simulation run (ends touching the links are kept if the old ends are given, warm reset)
+        ends  = {}
+        rings = [] #shared memory ring buffers of the new ends
+        for name, (producer, consumer, chan_type, options) in self.channels.items():
+            transport = self.transport(name)
+            conflate  = name in CONFLATED_INPUTS
+            if (old_ends is not None) and ('link' in (producer, consumer)): #links processes keep their ends
+                if chan_type == 'frames':
+                    ring = old_ends[name + '_ring']
+                    ends[name + '_ring'] = ring
+                    ends[name + '_out']  = ring.reader(0, conflate)
+                    ends[name + '_out'].skip() #skip frames of the previous simulation run
+                    rings.append(ring)
+                else:
+                    ends[name + '_in']  = old_ends[name + '_in']
+                    ends[name + '_out'] = old_ends[name + '_out']
+            elif transport == 'pipe':
+                pipe_out, ends[name + '_in'] = mp.Pipe()
+                ends[name + '_out'] = LatestReader(pipe_out) if conflate else pipe_out
+            elif transport == 'shm':
+                if chan_type == 'frames': #projected and decimated RX telemetry
+                    columns = None if options['columns'] is None else rxtelem_columns(options['columns'])
+                    ring    = RingBuffer(1, TELEM_RX_LEN, batch_len=options['batch_len'], columns=columns, rate=options['rate'])
+                    ends[name + '_out'] = ring.reader(0, conflate)
+                else:
+                    ring = RingBuffer(1, options['frames_len'], batch_len=options['batch_len'])
+                    ends[name + '_in']  = RingWriter(ring)
+                    ends[name + '_out'] = ring.reader(0, conflate) if options['batch_len'] > 1 else RowReader(ring.reader(0, conflate))
+                ends[name + '_ring'] = ring
+                rings.append(ring)
+            elif transport == 'queue':
+                ends[name + '_in'] = ends[name + '_out'] = LocalQueue(conflate)
+        #Release ring buffers of the previous simulation run not kept
+        for ring in self.rings:
+            if all(ring is not new_ring for new_ring in rings):
+                ring.unlink()
+        self.rings = rings
+        ends['rx_rings'] = tuple(ends[name + '_ring'] for name, channel in self.channels.items() if channel[2] == 'frames') #RX telemetry ring buffers published by the RX link
+        return ends
+
+    def inputs(self, name):
+        #Consumer ends names of a stage process
+        return [chan_name + '_out' for chan_name, channel in self.channels.items() if self.process_name(channel[1]) == name]
+
+    def process(self, name, global_dict):
+        #Stage process with its target and arguments taken from the global dictionary
+        kind, module, target, args = self.stages[name]
+        if target == 'chain': #fused stages loop iterations called in sequence
+            steps = tuple(self._step(fused_name, global_dict) for fused_name in args)
+            return mp.Process(target=ControlChain().run, args=(steps, global_dict['event_start'], global_dict['event_end']), daemon=True)
+        target = functools.reduce(getattr, target.split('.'), global_dict[module])
+        return mp.Process(target=target, args=tuple(global_dict[arg] for arg in args), daemon=True)
+
+    def unlink(self):
+        #Release shared memory ring buffers (owner process only)
+        for ring in self.rings:
+            ring.unlink()
+        self.rings = []
+
+    def _check(self):
+        #Transports supported by each channel type, in-process queues only between stages fused in the same process
+        if self.fused and (ACT_HZ != CM_HZ): #fused stages are called once per tick
+            raise ValueError(' '.join(('Fused control chain requires the same actuation and control model frequencies:', str(ACT_HZ), str(CM_HZ))))
+        supported = {'frames':('shm',), 'array':('pipe', 'shm', 'queue'), 'bytes':('pipe', 'queue'), 'object':('pipe', 'queue')}
+        for name, (producer, consumer, chan_type, options) in self.channels.items():
+            transport = self.transport(name)
+            if transport not in supported[chan_type]:
+                raise ValueError(' '.join(('Channel', name, 'of type', chan_type, 'does not support transport', transport)))
+            if (transport == 'queue') and (not self._in_process(name)):
+                raise ValueError(' '.join(('Channel', name, 'can only be an in-process queue if', producer, 'and', consumer, 'run in the same process')))
+            if (transport == 'pipe') and self._in_process(name): #a blocking send on a full pipe would never be received
+                raise ValueError(' '.join(('Channel', name, 'can not be a pipe between', producer, 'and', consumer, 'running in the same process')))
+
+    def _fused(self):
+        #Control stages fused in a single process (stages idle with the selected control model keep their own process)
+        if (CTL_CHAIN == 0) or (CTL_CHAIN == 'processes'): #one process per control stage (isolation)
+            return ()
+        elif (CTL_CHAIN == 1) or (CTL_CHAIN == 'fused'): #setpoint, equilibrium, control model and actuation in call order
+            anl       = (CM_TYPE == 1) or (CM_TYPE == 'ANL') #analytic non-linear control model (no equilibrium point, no state space model for feedback actuation)
+            eq_fused  = not anl
+            act_fused = (ACT_TYPE == 0) or (ACT_TYPE == 'random') or (not anl)
+            return tuple(name for name, fused in (('sp', True), ('eq', eq_fused), ('cm', True), ('act', act_fused)) if fused)
+        raise ValueError(' '.join(('Unknown control chain:', str(CTL_CHAIN))))
+
+    def _in_process(self, name):
+        #Channel between two stages running in the same process
+        producer, consumer = self.channels[name][:2]
+        return (producer != consumer) and (self.process_name(producer) == self.process_name(consumer))
+
+    def _step(self, name, global_dict):
+        #Fused stage object and its channels ends (loop iteration arguments, without events)
+        kind, module, target, args = self.stages[name]
+        stage = functools.reduce(getattr, target.split('.')[:-1], global_dict[module])
+        return (stage, tuple(global_dict[arg] for arg in args if not arg.startswith('event_')))
+
+    def _stages(self):
+        stages = {}
+        #FlightGear links (in start order)
+        if (TELEM_ENGINE == 0) or (TELEM_ENGINE == 'processes'): #one blocking process per link
+            stages['telemrx'] = ('link', 'telem_mod', 'receive', ('csvlog_dir', 'rx_rings', 'event_rxtcp', 'event_start', 'event_close'))
+            stages['telemtx'] = ('link', 'telem_mod', 'transmit', ('act2tx_out', 'event_rxtcp', 'event_txtcp', 'event_start', 'event_close'))
+            stages['cfg']     = ('link', 'cfg_mod', 'transmit', ('sup2cfg_out', 'event_rxtcp', 'event_close'))
+        elif (TELEM_ENGINE == 1) or (TELEM_ENGINE == 'asyncio'): #single asyncio process owning all links
+            stages['engine'] = ('link', 'engine_mod', 'run', ('csvlog_dir', 'act2tx_out', 'rx_rings', 'sup2cfg_out', 'event_rxtcp', 'event_txtcp', 'event_start', 'event_close'))
+        #Actuation
+        if (ACT_TYPE == 0) or (ACT_TYPE == 'random'): #random control
+            stages['act'] = ('stage', 'act_mod', 'Random.run', ('act2csv_in', 'act2tx_in', 'rx2act_out', 'event_start', 'event_end'))
+        elif (ACT_TYPE == 1) or (ACT_TYPE == 'fsfb'): #full-state feedback control
+            stages['act'] = ('stage', 'act_mod', 'FSFB.run', ('act2csv_in', 'act2tx_in', 'cm2act_out', 'rx2act_out', 'event_start', 'event_end'))
+        elif (ACT_TYPE == 2) or (ACT_TYPE == 'lqr'): #linear-quadratic regulator
+            stages['act'] = ('stage', 'act_mod', 'LQR.run', ('act2csv_in', 'act2tx_in', 'cm2act_out', 'rx2act_out', 'event_start', 'event_end'))
+        elif (ACT_TYPE == 3) or (ACT_TYPE == 'mpc'): #model predictive control
+            stages['act'] = ('stage', 'act_mod', 'MPC.run', ('act2csv_in', 'act2tx_in', 'cm2act_out', 'rx2act_out', 'event_start', 'event_end'))
+        #Control model
+        if (CM_TYPE == 0) or (CM_TYPE == 'AL'): #analytic linear control model
+            stages['cm'] = ('stage', 'cm_mod', 'ALCM.run', ('cm2act_in', 'cm2csv_in', 'eq2cm_out', 'rx2cm_out', 'sp2cm_out', 'event_start', 'event_end'))
+        elif (CM_TYPE == 1) or (CM_TYPE == 'ANL'): #analytic non-linear control model
+            stages['cm'] = ('stage', 'cm_mod', 'ANLCM.run', ('cm2act_in', 'cm2csv_in', 'eq2cm_out', 'rx2cm_out', 'sp2cm_out', 'event_start', 'event_end'))
+        elif (CM_TYPE == 2) or (CM_TYPE == 'LANL'): #linearized analytic non-linear control model
+            stages['cm'] = ('stage', 'cm_mod', 'LANLCM.run', ('cm2act_in', 'cm2csv_in', 'eq2cm_out', 'rx2cm_out', 'sp2cm_out', 'event_start', 'event_end'))
+        #Dynamics and equilibrium
+        stages['dyn'] = ('stage', 'dyn_mod', 'run', ('dyn2csv_in', 'rx2dyn_out', 'event_start', 'event_end'))
+        stages['eq']  = ('stage', 'eq_mod', 'run', ('eq2cm_in', 'eq2csv_in', 'rx2eq_out', 'event_start', 'event_end'))
+        #Setpoint
+        if (SP_TYPE == 0) or (SP_TYPE == 'constant'): #constant setpoint
+            stages['sp'] = ('stage', 'sp_mod', 'Constant.run', ('rx2sp_out', 'sp2cm_in', 'sp2csv_in', 'event_start', 'event_end'))
+        elif (SP_TYPE == 1) or (SP_TYPE == 'straight_line'): #straight line setpoint
+            stages['sp'] = ('stage', 'sp_mod', 'StraightLine.run', ('rx2sp_out', 'sp2cm_in', 'sp2csv_in', 'event_start', 'event_end'))
+        #Fused control chain
+        if self.fused:
+            for name in self.fused:
+                stages[name] = ('fused', *stages[name][1:])
+            stages['ctl'] = ('stage', None, 'chain', self.fused)
+        #CSV logging
+        stages['cmlog']      = ('log', 'csvlog_mod', 'write_cmlog', ('csvlog_dir', 'cm2csv_out', 'event_start', 'event_flush')) #logging control model
+        stages['dynlog']     = ('log', 'csvlog_mod', 'write_dynlog', ('csvlog_dir', 'dyn2csv_out', 'event_start', 'event_flush')) #logging dynamics
+        stages['eqlog']      = ('log', 'csvlog_mod', 'write_eqlog', ('csvlog_dir', 'eq2csv_out', 'event_start', 'event_flush')) #logging equilibrium point
+        stages['splog']      = ('log', 'csvlog_mod', 'write_splog', ('csvlog_dir', 'sp2csv_out', 'event_start', 'event_flush')) #logging setpoint
+        stages['telemrxlog'] = ('log', 'csvlog_mod', 'write_telemrxlog', ('csvlog_dir', 'rx2csv_out', 'event_start', 'event_flush')) #logging RX telemetry
+        stages['telemtxlog'] = ('log', 'csvlog_mod', 'write_telemtxlog', ('csvlog_dir', 'act2csv_out', 'event_start', 'event_flush')) #logging TX telemetry
+        return stages
+
+    def _channels(self):
+        channels = {}
+        #Stages data
+        channels['act2csv'] = ('act', 'telemtxlog', 'array', {'frames_len':ACT_LEN + 1, 'batch_len':1}) #actuation to CSV
+        channels['cm2act']  = ('cm', 'act', 'object', {}) #control model (state space model and operating point) to actuation
+        channels['cm2csv']  = ('cm', 'cmlog', 'array', {'frames_len':CM_STATE_LEN + 1, 'batch_len':1}) #control model to CSV
+        channels['dyn2csv'] = ('dyn', 'dynlog', 'array', {'frames_len':DYN_LEN + 1, 'batch_len':MODEL_HZ}) #dynamics to CSV
+        channels['eq2cm']   = ('eq', 'cm', 'array', {'frames_len':CM_STATE_LEN + CM_INPUT_LEN, 'batch_len':1}) #equilibrium point to control model
+        channels['eq2csv']  = ('eq', 'eqlog', 'array', {'frames_len':CM_STATE_LEN + CM_INPUT_LEN + 1, 'batch_len':1}) #equilibrium point to CSV
+        channels['sp2cm']   = ('sp', 'cm', 'array', {'frames_len':CM_STATE_LEN + CM_INPUT_LEN, 'batch_len':1}) #setpoint to control model
+        channels['sp2csv']  = ('sp', 'splog', 'array', {'frames_len':CM_STATE_LEN + CM_INPUT_LEN + 1, 'batch_len':1}) #setpoint to CSV
+        #FlightGear links
+        channels['act2tx'] = ('act', 'link', 'bytes', {}) #actuation to TX telemetry
+        channels['sup2cfg'] = ('sup', 'link', 'object', {}) #simulation rate to config link
+        #RX telemetry (single producer, one ring of projected frames per consumer, decimated to the consumer rate)
+        channels['rx2act'] = ('link', 'act', 'frames', {'columns':ACT_RX_STR, 'rate':ACT_HZ, 'batch_len':1}) #RX telemetry to actuation (decimated)
+        channels['rx2cm']  = ('link', 'cm', 'frames', {'columns':CM_RX_STR, 'rate':CM_HZ, 'batch_len':1}) #RX telemetry to control model (decimated)
+        channels['rx2csv'] = ('link', 'telemrxlog', 'frames', {'columns':None, 'rate':None, 'batch_len':MODEL_HZ}) #RX telemetry to CSV (full frames)
+        channels['rx2dyn'] = ('link', 'dyn', 'frames', {'columns':DYN_RX_STR, 'rate':None, 'batch_len':MODEL_HZ}) #RX telemetry to dynamics
+        channels['rx2eq']  = ('link', 'eq', 'frames', {'columns':EQ_RX_STR, 'rate':CM_HZ, 'batch_len':1}) #RX telemetry to equilibrium (decimated)
+        channels['rx2sp']  = ('link', 'sp', 'frames', {'columns':SP_RX_STR, 'rate':CM_HZ, 'batch_len':1}) #RX telemetry to setpoint (decimated)
+        channels['rx2sup'] = ('link', 'sup', 'frames', {'columns':SUP_RX_STR, 'rate':SUP_HZ, 'batch_len':1}) #RX telemetry to supervisor (decimated)
+        return channels
@@ -8,6 +8,8 @@ class Scenario():
         self.model_hz              = MODEL_HZ
         self.cfg_ip_address        = CFG_IP_ADDRESS
         self.cfg_port              = CFG_PORT
+        self.cfg_props_port        = CFG_PROPS_PORT
+        self.warm_reset            = (SIM_RESET == 1) or (SIM_RESET == 'warm')
         self.telem_rx_ip_address   = TELEM_RX_IP_ADDRESS
         self.telem_rx_port         = TELEM_RX_PORT
         self.telem_rx_hz           = MODEL_HZ
@@ -15,8 +17,9 @@ class Scenario():
         self.telem_tx_port         = TELEM_TX_PORT
         self.telem_tx_hz           = ACT_HZ
         self.cfg_protocol_filename = CFG_PROTOCOL_FILENAME
-        self.rx_protocol_filename  = RX_PROTOCOL_FILENAME
-        self.tx_protocol_filename  = TX_PROTOCOL_FILENAME
+        self.rx_protocol_filename  = RX_PROTOCOL_FILENAME if (TELEM_RX_PROTOCOL == 0) or (TELEM_RX_PROTOCOL == 'text') else RX_BIN_PROTOCOL_FILENAME
+        self.tx_protocol_filename  = TX_PROTOCOL_FILENAME if (TELEM_TX_PROTOCOL == 0) or (TELEM_TX_PROTOCOL == 'text') else TX_BIN_PROTOCOL_FILENAME
+        self.telem_transport       = 'tcp' if (TELEM_TRANSPORT == 0) or (TELEM_TRANSPORT == 'tcp') else 'udp'
         self.time_of_day           = TIME_OF_DAY
         self.season                = SEASON
         self.visibility            = VISIBILITY
@@ -36,8 +39,8 @@ class Scenario():
     def run(self):
         model_hz_str              = '--model-hz=' + str(self.model_hz)
         cfg_str                   = '--generic=socket,in,1,' + self.cfg_ip_address + ',' + str(self.cfg_port) + ',tcp,' + self.cfg_protocol_filename
-        telem_rx_str              = '--generic=socket,out,' + str(self.telem_rx_hz) + ',' + self.telem_rx_ip_address + ',' + str(self.telem_rx_port) + ',tcp,' + self.rx_protocol_filename
-        telem_tx_str              = '--generic=socket,in,' + str(self.telem_tx_hz) + ',' + self.telem_tx_ip_address + ',' + str(self.telem_tx_port) + ',tcp,' + self.tx_protocol_filename
+        telem_rx_str              = '--generic=socket,out,' + str(self.telem_rx_hz) + ',' + self.telem_rx_ip_address + ',' + str(self.telem_rx_port) + ',' + self.telem_transport + ',' + self.rx_protocol_filename
+        telem_tx_str              = '--generic=socket,in,' + str(self.telem_tx_hz) + ',' + self.telem_tx_ip_address + ',' + str(self.telem_tx_port) + ',' + self.telem_transport + ',' + self.tx_protocol_filename
         timeofday_str             = '--timeofday=' + self.time_of_day
         season_str                = '--season=' + self.season
         visibility_str            = '--visibility=' + str(self.visibility)
@@ -52,6 +55,11 @@ class Scenario():
         u_str                     = '--uBody=' + str(self.u_start)
         v_str                     = '--vBody=' + str(self.v_start)
         w_str                     = '--wBody=' + str(self.w_start)
-        self._var_options         = (model_hz_str, timeofday_str, season_str, visibility_str, wind_str, turbulence_str, longitude_str, latitude_str, altitude_str, phi_str, theta_str, psi_str, u_str, v_str, w_str, cfg_str, telem_rx_str, telem_tx_str)
+        props_str                 = ('--telnet=' + str(self.cfg_props_port),) if self.warm_reset else () #property tree server (warm reset)
+        self._var_options         = (model_hz_str, timeofday_str, season_str, visibility_str, wind_str, turbulence_str, longitude_str, latitude_str, altitude_str, phi_str, theta_str, psi_str, u_str, v_str, w_str, cfg_str, telem_rx_str, telem_tx_str) + props_str
         shell_command             = self._fixed_options + self._var_options + FG_AIRCRAFT_OPTIONS + FG_ENVIRONMENT_OPTIONS
         return shell_command
+
+    def presets(self):
+        #Initial conditions as FlightGear property tree presets (warm reset)
+        return (('/sim/presets/longitude-deg', self.longitude_start), ('/sim/presets/latitude-deg', self.latitude_start), ('/sim/presets/altitude-ft', self.altitude_start), ('/sim/presets/roll-deg', self.phi_start), ('/sim/presets/pitch-deg', self.theta_start), ('/sim/presets/heading-deg', self.psi_start), ('/sim/presets/speed-set', 'UVW'), ('/sim/presets/uBody-fps', self.u_start), ('/sim/presets/vBody-fps', self.v_start), ('/sim/presets/wBody-fps', self.w_start))
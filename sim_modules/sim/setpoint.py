@@ -1,6 +1,8 @@
 from constants import *
 from settings import *
 from modules.func.utils import *
+from modules.sim.channels import *
+from modules.sim.tracing import *
 
 import numpy as np
 from pyquaternion import Quaternion
@@ -10,7 +12,7 @@ import sys
 class BaseSetpoint():
 
     def __init__(self):
-        self.t       = TELEM_WAIT
+        self.tick    = -1 #last tick ID processed
         self.dt      = 1 / CM_HZ
         self.csvdata = np.zeros(CM_STATE_LEN + CM_INPUT_LEN + 1) #array for storing csv setpoint 
 
@@ -29,25 +31,33 @@ class Constant(BaseSetpoint):
                     sp2csv_in.close()
                     break
                 else:
-                    rxdata = rx2sp_out.recv() #receive RX telemetry
-                    if (np.any(rxdata[:,0] >= self.t)):
-                        self._preprocess(rxdata)
-                        spdata = self._find_sp()
-                        self._build_pipe_data(spdata)
-                        self._pipe(sp2cm_in, sp2csv_in, spdata)
-                        self.t = self.t + self.dt
-                    else:
-                        pass
+                    self.step(rx2sp_out, sp2cm_in, sp2csv_in)
+            except EOFError: #RX telemetry ring buffer closed by the RX link at the end of the simulation run
+                if not event_end.is_set():
+                    raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
             except:
                 raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
 
+    def step(self, rx2sp_out, sp2cm_in, sp2csv_in):
+        #Loop iteration (also called by the fused control chain)
+        rxdata = rx2sp_out.recv() #receive RX telemetry
+        if rx2sp_out.tick > self.tick: #new tick issued by the scheduler
+            self.tick = rx2sp_out.tick
+            t0 = TRACER.clock() #tick span start
+            h0 = HEARTBEATS.clock() #loop iteration start
+            self._preprocess(rxdata)
+            spdata = self._find_sp()
+            self._build_pipe_data(spdata)
+            self._pipe(sp2cm_in, sp2csv_in, spdata)
+            TRACER.span('setpoint', t0, rxdata[0,0], self.tick)
+            HEARTBEATS.beat('sp', h0, self.tick)
+
     def _init(self):
         self.phys_dict = {}
 
     def _preprocess(self, rxdata):
-        i      = np.where(rxdata[:,0] >= self.t)[0][0] #find first frame index
-        rxdata = rxdata[i,:] #get first frame
-        rxtime = rxdata[0]
+        rxdata = rxdata[0,:] #frame firing the tick
+        rxtime = rxdata[SP_RX_IND['t_sim']]
         self.phys_dict.update(rxtime = rxtime)
 
     def _find_sp(self):
@@ -78,18 +88,27 @@ class StraightLine(BaseSetpoint):
                     sp2csv_in.close()
                     break
                 else:
-                    rxdata = rx2sp_out.recv() #receive RX telemetry
-                    if (np.any(rxdata[:,0] >= self.t)):
-                        self._preprocess(rxdata)
-                        spdata = self._find_sp()
-                        self._build_pipe_data(spdata)
-                        self._pipe(sp2cm_in, sp2csv_in, spdata)
-                        self.t = self.t + self.dt
-                    else:
-                        pass
+                    self.step(rx2sp_out, sp2cm_in, sp2csv_in)
+            except EOFError: #RX telemetry ring buffer closed by the RX link at the end of the simulation run
+                if not event_end.is_set():
+                    raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
             except:
                 raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
 
+    def step(self, rx2sp_out, sp2cm_in, sp2csv_in):
+        #Loop iteration (also called by the fused control chain)
+        rxdata = rx2sp_out.recv() #receive RX telemetry
+        if rx2sp_out.tick > self.tick: #new tick issued by the scheduler
+            self.tick = rx2sp_out.tick
+            t0 = TRACER.clock() #tick span start
+            h0 = HEARTBEATS.clock() #loop iteration start
+            self._preprocess(rxdata)
+            spdata = self._find_sp()
+            self._build_pipe_data(spdata)
+            self._pipe(sp2cm_in, sp2csv_in, spdata)
+            TRACER.span('setpoint', t0, rxdata[0,0], self.tick)
+            HEARTBEATS.beat('sp', h0, self.tick)
+
     def _init(self):
         self.sp_dict   = {}
         self.phys_dict = {}
@@ -106,18 +125,17 @@ class StraightLine(BaseSetpoint):
         self.phys_dict.update(Q_NP = Q_NP)
 
     def _preprocess(self, rxdata):
-        i      = np.where(rxdata[:,0] >= self.t)[0][0] #find first frame index
-        rxdata = rxdata[i,:] #get first frame
-        rxtime = rxdata[0]
+        rxdata = rxdata[0,:] #frame firing the tick
+        rxtime = rxdata[SP_RX_IND['t_sim']]
         #RX telemetry
-        longd     = rxdata[2]
-        latd      = rxdata[3]
-        hqfe_km   = rxdata[15]
-        phi_rad   = rxdata[20]
-        theta_rad = rxdata[22]
-        psi_rad   = rxdata[24]
-        p_rel     = np.array([latd, longd, - km_to_m(hqfe_km)], dtype=float)
-        euler     = np.array([phi_rad, theta_rad, psi_rad], dtype=float)
+        long_delta = rxdata[SP_RX_IND['long_delta']]
+        lat_delta  = rxdata[SP_RX_IND['lat_delta']]
+        h_qfe      = rxdata[SP_RX_IND['h_qfe']]
+        phi        = rxdata[SP_RX_IND['phi']]
+        theta      = rxdata[SP_RX_IND['theta']]
+        psi        = rxdata[SP_RX_IND['psi']]
+        p_rel      = np.array([lat_delta, long_delta, - h_qfe], dtype=float)
+        euler      = np.array([phi, theta, psi], dtype=float)
         q_nb      = euler_to_attquat(euler)
         #Update physical variables dictionary
         self.phys_dict.update(rxtime = rxtime)
@@ -0,0 +1,401 @@
+from constants import *
+from settings import *
+from modules.func.utils import *
+from modules.sim.control_models import *
+from modules.sim.csv_logging import *
+from modules.sim.telemetry import *
+
+import numpy as np
+import select
+import socket
+import sys
+import time
+
+''' FLIGHTGEAR STAND-IN MODULE '''
+class FGStandIn():
+    #Local FlightGear stand-in server for offline closed-loop runs (same config, RX and TX links as fgfs)
+
+    def __init__(self):
+        self.CFG_IP_ADDRESS = CFG_IP_ADDRESS
+        self.CFG_PORT       = CFG_PORT
+        self.PROPS_PORT     = CFG_PROPS_PORT
+        self.RX_IP_ADDRESS  = TELEM_RX_IP_ADDRESS
+        self.RX_PORT        = TELEM_RX_PORT
+        self.TX_IP_ADDRESS  = TELEM_TX_IP_ADDRESS
+        self.TX_PORT        = TELEM_TX_PORT
+        self.dt             = 1 / MODEL_HZ
+        self.rx_scale       = 1 / TELEM_RX_SI_SCALE #SI units to received units scale vector
+        #Select RX telemetry encoder
+        if (TELEM_RX_PROTOCOL == 0) or (TELEM_RX_PROTOCOL == 'text'): #tab-separated text frames (fg2py.xml)
+            self.rx_format = '\t'.join(('%f',) * TELEM_RX_LEN) + '\n'
+            self._encode   = self._encode_text
+        elif (TELEM_RX_PROTOCOL == 1) or (TELEM_RX_PROTOCOL == 'binary'): #binary frames (fg2py_bin.xml)
+            self._encode   = self._encode_bin
+        #Select TX telemetry decoding
+        self.tx_binary = (TELEM_TX_PROTOCOL == 1) or (TELEM_TX_PROTOCOL == 'binary') #binary frames (py2fg_act_bin.xml) or text lines (py2fg_act.xml)
+        self.warm_reset = (SIM_RESET == 1) or (SIM_RESET == 'warm') #property tree link repositioning the aircraft between simulation runs
+        #Lockstep (held after each actuation tick until its actuation is received)
+        self.lockstep = SIM_LOCKSTEP
+        if self.lockstep and not ((SIM_BACKEND == 1) or (SIM_BACKEND == 'anl') or (SIM_BACKEND == 2) or (SIM_BACKEND == 'log')):
+            raise ValueError(' '.join(('Lockstep simulation requires a stand-in backend driven by simulation time (anl or log):', str(SIM_BACKEND))))
+
+    def run(self):
+        #Select aircraft motion source
+        if (SIM_BACKEND == 1) or (SIM_BACKEND == 'anl'): #analytic non-linear control model integration
+            self._init = self._init_anl
+            self._step = self._step_anl
+        elif (SIM_BACKEND == 2) or (SIM_BACKEND == 'log'): #RX telemetry CSV log replay
+            self._init = self._init_log
+            self._step = self._step_log
+        elif (SIM_BACKEND == 3) or (SIM_BACKEND == 'capture'): #raw RX telemetry capture replay
+            self._init = self._init_capture
+            self._step = self._step_capture
+        self._init()
+        self._init_lockstep()
+        #Property tree link (warm reset)
+        if self.warm_reset:
+            props_sock = self._listen(self.CFG_IP_ADDRESS, self.PROPS_PORT)
+            props_sock.setblocking(False)
+        self.props_conn  = None
+        self.propsbuffer = bytes()
+        #Listen to config and TX links before connecting the RX link (Python side connects to them once the RX link is established)
+        cfg_sock = self._listen(self.CFG_IP_ADDRESS, self.CFG_PORT)
+        if (TELEM_TRANSPORT == 1) or (TELEM_TRANSPORT == 'udp'): #UDP datagrams
+            tx_sock = None
+            tx_conn = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP) #UDP TX socket
+            tx_conn.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            tx_conn.bind((self.TX_IP_ADDRESS, self.TX_PORT))
+            rx_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP) #UDP RX socket
+            rx_sock.connect((self.RX_IP_ADDRESS, self.RX_PORT)) #default destination of RX datagrams
+            step = self._step()
+            if step is None: #aircraft motion source exhausted before the first frame
+                raise ValueError(' '.join(('Stand-in aircraft motion source has no frames:', str(SIM_BACKEND))))
+            rx_sock.send(step[1]) #first datagram establishes the RX link
+        else: #TCP streams
+            tx_sock = self._listen(self.TX_IP_ADDRESS, self.TX_PORT)
+            rx_sock = self._connect(self.RX_IP_ADDRESS, self.RX_PORT) #outgoing RX TCP connection
+        print('Stand-in RX link established!')
+        #Config link
+        cfg_conn, _ = cfg_sock.accept()
+        cfgdata     = self._readline(cfg_conn)
+        cfg_sock.close()
+        cfg_conn.setblocking(False) #config link stays open for runtime simulation rate changes
+        self.cfg_rate  = float(cfgdata.split(b'\t')[0]) #initial simulation rate
+        self.cfgbuffer = bytes()
+        print(' '.join(('Stand-in configured:', cfgdata.decode().strip())))
+        #TX link
+        if tx_sock is not None:
+            tx_conn, _ = tx_sock.accept()
+            tx_sock.close()
+        tx_conn.setblocking(False)
+        print('Stand-in TX link established!')
+        self.txbuffer = bytes()
+        self.rate     = STANDIN_RATE #pacing rate (scaled by runtime simulation rate changes)
+        self.t_start  = time.monotonic()
+        timestamp     = 0
+        #Streaming loop
+        while True:
+            try:
+                if not self._receive_act(tx_conn): #TX link closed
+                    break
+                self._receive_cfg(cfg_conn, timestamp)
+                if self.warm_reset and self._receive_props(props_sock): #aircraft repositioned
+                    self._init() #restart aircraft motion source (simulation time restarts)
+                    self._init_lockstep()
+                    self.t_start = time.monotonic()
+                    print('Stand-in repositioned!')
+                if self.lockstep and (self.act_count < self.ticks): #hold until the actuation of every tick sent is received
+                    waitables = [tx_conn, cfg_conn] + ([(props_sock if self.props_conn is None else self.props_conn)] if self.warm_reset else [])
+                    select.select(waitables, [], [])
+                    if self.rate > 0: #pacing restarts after holding
+                        self.t_start = time.monotonic() - timestamp / self.rate
+                    continue
+                step = self._step()
+                if step is None: #aircraft motion source exhausted
+                    break
+                timestamp, rxdata = step
+                rx_sock.sendall(rxdata) #one datagram per frame over UDP
+                tick = SCHEDULER.tick(self._rx_time(timestamp), ACT_HZ) #same tick IDs as the actuation RX telemetry
+                if tick > self.tick: #frame firing a new actuation tick (one actuation expected)
+                    self.ticks += 1
+                    self.tick   = tick
+                if self.rate > 0: #pace RX data with respect to real time
+                    delay = self.t_start + timestamp / self.rate - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+            except (BrokenPipeError, ConnectionRefusedError, ConnectionResetError): #RX link closed
+                break
+            except:
+                raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
+        #Close sockets
+        if self.warm_reset:
+            if self.props_conn is not None:
+                self.props_conn.close()
+            props_sock.close()
+        cfg_conn.close()
+        tx_conn.close()
+        rx_sock.close()
+
+    def _connect(self, ip_address, port):
+        #Outgoing TCP connection retried until the Python side listens or the link timeout expires
+        deadline = time.monotonic() + TELEM_LINK_TIMEOUT
+        while True:
+            try:
+                return socket.create_connection((ip_address, port))
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(TELEM_LINK_RETRY)
+
+    def _listen(self, ip_address, port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP) #TCP socket
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) #set socket reusability
+        sock.bind((ip_address, port))
+        sock.listen(1)
+        return sock
+
+    def _readline(self, conn):
+        data = bytes()
+        while not data.endswith(b'\n'):
+            chunk = conn.recv(1024)
+            if len(chunk) == 0:
+                break
+            data += chunk
+        return data
+
+    def _receive_cfg(self, conn, timestamp):
+        #Apply runtime simulation rate changes to the pacing (re-based at the current timestamp so that pacing stays continuous)
+        try:
+            chunk = conn.recv(1024)
+        except BlockingIOError: #no configuration data pending
+            return
+        self.cfgbuffer += chunk
+        lines = self.cfgbuffer.split(b'\n')
+        self.cfgbuffer = lines[-1] #incomplete line
+        if (len(lines) > 1) and (STANDIN_RATE > 0):
+            rate         = STANDIN_RATE * float(lines[-2].split(b'\t')[0]) / self.cfg_rate
+            self.t_start = time.monotonic() - timestamp / rate
+            self.rate    = rate
+            print(' '.join(('Stand-in simulation rate:', lines[-2].decode().split('\t')[0])))
+
+    def _receive_props(self, sock):
+        #Property tree commands, returns True once a reposition is requested (presets are ignored, the scenario initial conditions are always used)
+        if self.props_conn is None:
+            try:
+                self.props_conn, _ = sock.accept()
+            except BlockingIOError: #no property tree connection pending
+                return False
+            self.props_conn.setblocking(False)
+        try:
+            chunk = self.props_conn.recv(1024)
+        except BlockingIOError: #no property tree commands pending
+            return False
+        if len(chunk) == 0: #property tree link closed
+            self.props_conn.close()
+            self.props_conn = None
+            return False
+        self.propsbuffer += chunk
+        lines = self.propsbuffer.split(b'\n')
+        self.propsbuffer = lines[-1] #incomplete line
+        return any(line.strip() == b'run reposition' for line in lines[:-1])
+
+    def _receive_act(self, conn):
+        #Keep the latest complete actuation line or frame, returns False once the TX link is closed
+        try:
+            chunk = conn.recv(TELEM_RX_BUFFER_SIZE)
+        except BlockingIOError: #no actuation data pending
+            return True
+        if len(chunk) == 0:
+            return False
+        self.txbuffer += chunk
+        if self.tx_binary:
+            complete = len(self.txbuffer) - (len(self.txbuffer) % TELEM_TX_BIN_FRAME_LEN)
+            if complete > 0:
+                self.actdata = np.frombuffer(self.txbuffer, dtype=TX_BIN_DTYPE, count=TELEM_TX_LEN, offset=complete-TELEM_TX_BIN_FRAME_LEN).astype(float)
+            self.act_count += complete // TELEM_TX_BIN_FRAME_LEN
+            self.txbuffer   = self.txbuffer[complete:] #incomplete frame
+            return True
+        lines = self.txbuffer.split(b'\n')
+        self.txbuffer   = lines[-1] #incomplete line
+        self.act_count += sum(len(line.split(b'\t')) == TELEM_TX_LEN for line in lines[:-1])
+        for line in reversed(lines[:-1]):
+            actdata = line.split(b'\t')
+            if len(actdata) == TELEM_TX_LEN:
+                self.actdata = np.array(actdata, dtype=float)
+                break
+        return True
+
+    def _rx_time(self, timestamp):
+        #Simulation time as decoded by the RX link (text frames are rounded to microseconds)
+        return timestamp if self._encode == self._encode_bin else float('%f' % timestamp)
+
+    def _encode_bin(self, frame):
+        return frame.astype(RX_BIN_DTYPE).tobytes()
+
+    def _encode_text(self, frame):
+        return (self.rx_format % tuple(frame)).encode()
+
+    def _init_anl(self):
+        Ixx, Ixy, Ixz, Iyy, Iyz, Izz, mass = STANDIN_MASS_PROPS
+        Gamma = mominert_gamma(Ixx, Ixz, Izz)
+        #Analytic non-linear control model
+        self.anlcm = ANLCM()
+        #Constant parameters
+        self.params_cm = {}
+        self.params_cm.update(hmacb = 2)
+        self.params_cm.update(stall = 0)
+        self.params_cm.update(Iyy = Iyy)
+        self.params_cm.update(mass = mass)
+        self.params_cm.update(grav = G0_SI)
+        self.params_cm.update(Gamma = Gamma)
+        self.params_cm.update(Gamma1 = mominert_gamma1(Ixx, Ixz, Iyy, Izz, Gamma))
+        self.params_cm.update(Gamma2 = mominert_gamma2(Ixz, Iyy, Izz, Gamma))
+        self.params_cm.update(Gamma3 = mominert_gamma3(Izz, Gamma))
+        self.params_cm.update(Gamma4 = mominert_gamma4(Ixz, Gamma))
+        self.params_cm.update(Gamma5 = mominert_gamma5(Ixx, Iyy, Izz))
+        self.params_cm.update(Gamma6 = mominert_gamma6(Ixz, Iyy))
+        self.params_cm.update(Gamma7 = mominert_gamma7(Ixx, Iyy, Ixz, Gamma))
+        self.params_cm.update(Gamma8 = mominert_gamma8(Ixx, Gamma))
+        #Initial state from scenario settings (pn, pe, pd, phi, theta, psi, u, v, w, p, q, r)
+        self.x_cm    = np.array([0, 0, - ft_to_m(ALTITUDE_START), deg_to_rad(PHI_START), deg_to_rad(THETA_START), deg_to_rad(PSI_START), ft_to_m(U_START), ft_to_m(V_START), ft_to_m(W_START), 0, 0, 0], dtype=float)
+        self.xdot_cm = np.zeros(CM_STATE_LEN)
+        self.actdata = np.array([0, 0, 0, 0, 1, 1, 0, 0, 0], dtype=float) #(deltaa, deltae, deltaf, deltar, deltat, deltam, deltaa_trim, deltae_trim, deltar_trim)
+        self.t_sim   = 0
+        #Frame in SI units
+        self.frame = np.zeros(TELEM_RX_LEN)
+        self.frame[TELEM_RX_IND['dt_sim']] = self.dt
+        self.frame[TELEM_RX_IND['long_gnss']] = deg_to_rad(LONGITUDE_START)
+        self.frame[TELEM_RX_IND['lat_gnss']] = deg_to_rad(LATITUDE_START)
+        self.frame[TELEM_RX_IND['grav']] = G0_SI
+        self.frame[TELEM_RX_IND['Ixx']:TELEM_RX_IND['mass']+1] = STANDIN_MASS_PROPS
+
+    def _init_capture(self):
+        binary, self.timestamps, self.chunks = read_rxcapture(STANDIN_CAPTURE_PATH) #raw chunks as received with their receive timestamps
+        if binary != ((TELEM_RX_PROTOCOL == 1) or (TELEM_RX_PROTOCOL == 'binary')):
+            raise ValueError(' '.join(('RX telemetry protocol mismatch with capture:', STANDIN_CAPTURE_PATH)))
+        self.actdata = np.zeros(TELEM_TX_LEN)
+        self.i       = 0
+
+    def _init_lockstep(self):
+        #Frames reaching an actuation tick sent and actuations received (simulation time restarts)
+        self.tick      = -1 #last actuation tick ID
+        self.ticks     = 0
+        self.act_count = 0
+
+    def _init_log(self):
+        self.logdata = CSVLogging().read_telemrxlog(STANDIN_LOG_DIR) * self.rx_scale #recorded frames in received units
+        self.actdata = np.zeros(TELEM_TX_LEN)
+        self.i       = 0
+
+    def _step_anl(self):
+        #Integrate the analytic non-linear control model over one model step (fourth-order Runge-Kutta)
+        u_cm = self.actdata[:CM_INPUT_LEN]
+        self._update_params(self.x_cm, u_cm)
+        k1 = self.anlcm._update_anl(self.t_sim, self.x_cm, u_cm, self.params_cm)
+        k2 = self.anlcm._update_anl(self.t_sim + 0.5 * self.dt, self.x_cm + 0.5 * self.dt * k1, u_cm, self.params_cm)
+        k3 = self.anlcm._update_anl(self.t_sim + 0.5 * self.dt, self.x_cm + 0.5 * self.dt * k2, u_cm, self.params_cm)
+        k4 = self.anlcm._update_anl(self.t_sim + self.dt, self.x_cm + self.dt * k3, u_cm, self.params_cm)
+        self.xdot_cm = (k1 + 2 * k2 + 2 * k3 + k4) / 6
+        self.x_cm    = self.x_cm + self.dt * self.xdot_cm
+        self.t_sim   = self.t_sim + self.dt
+        return self.t_sim, self._encode(self._build_frame(u_cm) * self.rx_scale)
+
+    def _step_capture(self):
+        #Next captured chunk as originally split by TCP (actuation is consumed but ignored)
+        if self.i >= len(self.chunks):
+            return None
+        timestamp = self.timestamps[self.i]
+        chunk     = self.chunks[self.i]
+        self.i   += 1
+        return timestamp, chunk
+
+    def _step_log(self):
+        #Next recorded frame (actuation is consumed but ignored)
+        if self.i >= self.logdata.shape[0]:
+            return None
+        frame   = self.logdata[self.i]
+        self.i += 1
+        return frame[0], self._encode(frame)
+
+    def _update_params(self, x_cm, u_cm):
+        #Parameters held constant along one model step (as in the analytic non-linear control model)
+        deltaa, deltae, deltaf, deltar, deltat, deltam = u_cm
+        self.params_cm.update(phi = x_cm[3])
+        self.params_cm.update(theta = x_cm[4])
+        self.params_cm.update(psi = x_cm[5])
+        self.params_cm.update(alphadot = self._alphadot(x_cm, self.xdot_cm))
+        self.params_cm.update(sigmara = deltaa_to_sigmara(deltaa))
+        self.params_cm.update(sigmala = deltaa_to_sigmala(deltaa))
+        self.params_cm.update(sigmae = deltae_to_sigmae(deltae))
+        self.params_cm.update(sigmaf = deltaf_to_sigmaf(deltaf))
+        self.params_cm.update(sigmar = deltar_to_sigmar(deltar))
+        self.params_cm.update(rho = barometric_density(x_cm[2]))
+        self.params_cm.update(revprop = revprop_acm(deltat))
+
+    def _alphadot(self, x_cm, xdot_cm):
+        #Rate of change of angle of attack
+        u, w       = x_cm[6], x_cm[8]
+        udot, wdot = xdot_cm[6], xdot_cm[8]
+        return (u * wdot - w * udot) / (u ** 2 + w ** 2 + 1e-6)
+
+    def _build_frame(self, u_cm):
+        #RX telemetry frame in SI units (forces, moments and aerodynamic contributions are not modelled)
+        pn, pe, pd, phi, theta, psi, u, v, w, p, q, r = self.x_cm
+        deltaa, deltae, deltaf, deltar, deltat, deltam = u_cm
+        rho     = self.params_cm['rho']
+        revprop = self.params_cm['revprop']
+        euler   = np.array([phi, theta, psi], dtype=float)
+        Va      = Va_acm(u, v, w)
+        Vauw    = Vauw_acm(u, w)
+        alpha   = alpha_acm(u, w)
+        T       = thrust_eng(TT_interp(J_acm(u, revprop)), rho, revprop)
+        Vprop   = Vprop_acm(u, Vprop2_acm(u, rho, T))
+        Vind    = Vind_acm(u, Vprop)
+        f       = self.frame
+        ind     = TELEM_RX_IND
+        f[ind['t_sim']]      = self.t_sim
+        f[ind['long_delta']] = pe
+        f[ind['lat_delta']]  = pn
+        f[ind['dist_delta']] = np.hypot(pn, pe)
+        f[ind['h_gnss']]     = - pd
+        f[ind['h_qfe']]      = - pd
+        f[ind['h_qnh']]      = - pd
+        f[ind['phi']:ind['psi']+1]       = euler
+        f[ind['alpha']]                  = alpha
+        f[ind['beta']]                   = beta_acm(v, Vauw)
+        f[ind['gamma']]                  = theta - alpha
+        f[ind['vn']:ind['vd']+1]         = self.xdot_cm[0:3]
+        f[ind['u']:ind['w']+1]           = (u, v, w)
+        f[ind['u_aero']:ind['w_aero']+1] = (u, v, w)
+        f[ind['phidot']:ind['psidot']+1] = self.xdot_cm[3:6]
+        f[ind['p']:ind['r']+1]           = (p, q, r)
+        f[ind['p_aero']:ind['r_aero']+1] = (p, q, r)
+        f[ind['alphadot']]               = self._alphadot(self.x_cm, self.xdot_cm)
+        f[ind['udot']:ind['rdot']+1]     = self.xdot_cm[6:12]
+        f[ind['sigmara']]    = deltaa_to_sigmara(deltaa)
+        f[ind['deltara']]    = deltaa
+        f[ind['sigmala']]    = deltaa_to_sigmala(deltaa)
+        f[ind['deltala']]    = deltaa
+        f[ind['sigmae']]     = deltae_to_sigmae(deltae)
+        f[ind['deltae']]     = deltae
+        f[ind['sigmaf']]     = deltaf_to_sigmaf(deltaf)
+        f[ind['deltaf']]     = deltaf
+        f[ind['sigmar']]     = deltar_to_sigmar(deltar)
+        f[ind['deltar']]     = deltar
+        f[ind['deltat']]     = deltat
+        f[ind['deltam']]     = deltam
+        f[ind['Bw2Va']]      = BW / (2 * (Va + 1e-6))
+        f[ind['Cw2Va']]      = CW / (2 * (Va + 1e-6))
+        f[ind['hmacb']]      = self.params_cm['hmacb']
+        f[ind['qbar']]       = qbar_acm(rho, Va)
+        f[ind['qbaruw']]     = qbaruw_acm(rho, Vauw)
+        f[ind['qbarprop']]   = qbarprop_acm(rho, Vprop)
+        f[ind['qbarind']]    = qbarind_acm(rho, Vind)
+        f[ind['rho']]        = rho
+        f[ind['J']]          = J_acm(u, revprop)
+        f[ind['revprop']]    = revprop
+        f[ind['up_down']]    = 1 if (np.cos(phi) * np.cos(theta)) < 0 else 0
+        f[ind['wow1']:ind['wc3']+1] = 1 if pd >= 0 else 0 #ground contact
+        f[ind['Vprop']]      = Vprop
+        f[ind['Vind']]       = Vind
+        return f
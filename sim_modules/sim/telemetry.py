@@ -1,10 +1,222 @@
 import numpy as np
+import os
 import socket
+import struct
 import sys
+import time
 
 from constants import *
 from settings import *
 from modules.func.utils import *
+from modules.sim.channels import *
+from modules.sim.tracing import *
+
+''' RX TELEMETRY CAPTURE '''
+RX_CAPTURE_MAGIC  = b'FGRXCAP' #capture file signature (followed by one RX telemetry protocol byte)
+RX_CAPTURE_RECORD = struct.Struct('<dI') #capture record header (receive timestamp since capture start [s], chunk length [bytes]) followed by the raw chunk
+
+class RXCapture():
+    #Raw RX telemetry byte stream writer (TCP chunks as received, with their receive timestamps)
+
+    def __init__(self, path, binary):
+        self.file    = open(path, 'wb')
+        self.file.write(RX_CAPTURE_MAGIC + bytes((int(binary),)))
+        self.t_start = time.monotonic()
+
+    def write(self, chunk):
+        self.file.write(RX_CAPTURE_RECORD.pack(time.monotonic() - self.t_start, len(chunk)))
+        self.file.write(chunk)
+        self.file.flush() #whole records on disk even if the link process is terminated
+
+    def close(self):
+        self.file.close()
+
+def read_rxcapture(path):
+    #Raw RX telemetry capture as (protocol binary flag, receive timestamps array, raw chunks list)
+    with open(path, 'rb') as capfile:
+        data = capfile.read()
+    if data[:len(RX_CAPTURE_MAGIC)] != RX_CAPTURE_MAGIC:
+        raise ValueError(' '.join(('Not a RX telemetry capture:', path)))
+    binary     = bool(data[len(RX_CAPTURE_MAGIC)])
+    timestamps = []
+    chunks     = []
+    k = len(RX_CAPTURE_MAGIC) + 1
+    while k + RX_CAPTURE_RECORD.size <= len(data):
+        timestamp, nbytes = RX_CAPTURE_RECORD.unpack_from(data, k)
+        k += RX_CAPTURE_RECORD.size
+        if k + nbytes > len(data): #truncated last record (capture interrupted while writing)
+            break
+        timestamps.append(timestamp)
+        chunks.append(data[k:k+nbytes])
+        k += nbytes
+    return binary, np.array(timestamps), chunks
+
+''' RX TELEMETRY GATE '''
+class RXGate():
+    #Publishes RX telemetry into the ring buffers from the first frame of tick 0 on (setting the simulation start event)
+    #Re-armed once the supervisor clears the simulation start event (warm reset): frames are held back until the simulation time restarts and reaches tick 0 again
+
+    def __init__(self, rx_rings, event_start):
+        self.rx_rings    = rx_rings
+        self.event_start = event_start
+        self.started     = False #publishing frames
+        self.rewound     = True #simulation time restarted since the gate was re-armed
+        self.t_last      = - np.inf #simulation time of the last frame
+        self.tick        = -1 #last actuation tick ID fired by the published frames
+        self.ticks       = () #actuation tick IDs fired by the frames published by the last send (tracing)
+
+    def send(self, framesarray):
+        #Publish frames (SI units) if the simulation run started, returns True if any frame was published
+        self.ticks = ()
+        if framesarray.shape[0] == 0:
+            return False
+        if self.started and (not self.event_start.is_set()): #re-armed by the supervisor
+            self.started = False
+            self.rewound = False
+        if (not self.rewound) and (framesarray[:,0].min() < self.t_last): #simulation time restarted
+            framesarray  = framesarray[np.argmin(framesarray[:,0]):,:] #remove frames of the previous run
+            self.rewound = True
+        self.t_last = framesarray[-1,0]
+        if not self.started:
+            started = SCHEDULER.tick(framesarray[:,0], MODEL_HZ) >= 0 #frames of the simulation run (same start rule as the stage ticks)
+            if (not self.rewound) or (not np.any(started)): #simulation run not started yet
+                return False
+            i = np.flatnonzero(started)[0] #find first frame index
+            framesarray = framesarray[i:,:] #remove earlier frames
+            for rx_ring in self.rx_rings:
+                rx_ring.rearm() #restart decimation ticks
+                rx_ring.send(framesarray) #publish RX telemetry projected for each consumer
+            self.tick    = -1
+            self._fired(framesarray)
+            self.started = True
+            self.event_start.set() #set simulation start event
+            return True
+        for rx_ring in self.rx_rings:
+            rx_ring.send(framesarray) #publish RX telemetry projected for each consumer
+        self._fired(framesarray)
+        return True
+
+    def _fired(self, framesarray):
+        #Actuation tick IDs fired by the published frames (joins the RX parse span to the TX send spans of the same ticks)
+        _, self.ticks = SCHEDULER.fired(framesarray[:,0], ACT_HZ, self.tick)
+        if len(self.ticks) > 0:
+            self.tick = int(self.ticks[-1])
+
+''' RX FRAMES REASSEMBLER '''
+class RXReassembler():
+    #Reassembles RX telemetry frames split across TCP reads (partial frames are carried over to the next read)
+
+    def __init__(self, decode, binary, capture=None):
+        self._decode       = decode #RX telemetry decoder
+        self._binary       = binary #binary (fixed frame length) or text (newline-terminated frames) protocol
+        self.capture       = capture #optional raw RX telemetry capture writer
+        self.buffer        = bytearray(2 * TELEM_RX_BUFFER_SIZE) #preallocated buffer (carried over partial frame + TCP data)
+        self.view          = memoryview(self.buffer) #buffer view for receiving TCP data without copies
+        self.pending       = 0 #carried over partial frame length in bytes
+        self.closed        = False #RX TCP connection closed by FlightGear
+        self.bytes_count   = 0 #received bytes counter
+        self.frames_count  = 0 #decoded frames counter
+        self.dropped_count = 0 #dropped partial frames counter
+
+    def recv_view(self):
+        #Buffer view where the next TCP data has to be received
+        if self.pending >= TELEM_RX_BUFFER_SIZE: #carried over data cannot be a partial frame
+            self.pending        = 0
+            self.dropped_count += 1
+        return self.view[self.pending:self.pending+TELEM_RX_BUFFER_SIZE]
+
+    def feed(self, nbytes):
+        #Decode complete frames after nbytes of TCP data were received into the receiving view
+        if nbytes == 0: #connection closed
+            self.closed         = True
+            self.dropped_count += 1 if self.pending > 0 else 0
+            self.pending        = 0
+            return np.empty((0, TELEM_RX_LEN))
+        end = self.pending + nbytes
+        self.bytes_count += nbytes
+        if self.capture is not None:
+            self.capture.write(self.view[self.pending:end]) #capture raw TCP data before decoding
+        #Find end of last complete frame
+        if self._binary:
+            complete = end - (end % TELEM_RX_BIN_FRAME_LEN)
+            framesarray = self._decode(self.view[:complete])
+        else:
+            complete = self.buffer.rfind(b'\n', 0, end) + 1
+            framesarray = self._decode(self.buffer[:complete])
+            self.dropped_count += self.buffer.count(b'\n', 0, complete) - framesarray.shape[0] #malformed frames discarded by decoder
+        self.frames_count += framesarray.shape[0]
+        #Carry over partial frame
+        self.pending = end - complete
+        self.buffer[:self.pending] = self.buffer[complete:end]
+        return framesarray
+
+    def counters(self):
+        return {'bytes':self.bytes_count, 'frames':self.frames_count, 'dropped':self.dropped_count}
+
+''' RX DATAGRAMS DECODER '''
+class RXDatagrams():
+    #Decodes RX telemetry UDP datagrams (one complete frame per datagram) checking the simulation time sequence for lost and reordered frames
+    #Frames spacing in simulation time is learnt again during MODEL_HZ frames from the start and after every simulation rate change (two consecutive equal gaps differing from the expected spacing)
+
+    def __init__(self, decode, binary, capture=None):
+        self._decode         = decode #RX telemetry decoder
+        self._binary         = binary #binary or text protocol
+        self.capture         = capture #optional raw RX telemetry capture writer
+        self.buffer          = bytearray(TELEM_RX_BUFFER_SIZE) #preallocated datagram buffer
+        self.view            = memoryview(self.buffer) #buffer view for receiving UDP data without copies
+        self.rate            = SIM_RATE_SENT.value #simulation rate last sent to FlightGear
+        self.period          = SIM_RATE / MODEL_HZ #expected simulation time between consecutive frames
+        self.relearn         = MODEL_HZ #frames left for learning a new frames spacing
+        self.gap             = None #simulation time gap between the last two frames
+        self.lost_last       = 0 #frames counted as lost in the last gap
+        self.t_last          = - np.inf #simulation time of the last accepted frame
+        self.closed          = False #connectionless link (never closed by FlightGear)
+        self.bytes_count     = 0 #received bytes counter
+        self.frames_count    = 0 #accepted frames counter
+        self.dropped_count   = 0 #dropped malformed or truncated datagrams counter
+        self.lost_count      = 0 #frames missing from the simulation time sequence counter
+        self.reordered_count = 0 #dropped late or duplicated frames counter
+
+    def recv_view(self):
+        #Buffer view where the next datagram has to be received
+        return self.view
+
+    def feed(self, nbytes):
+        #Decode the frame of the datagram of nbytes received into the receiving view
+        self.bytes_count += nbytes
+        if self.capture is not None:
+            self.capture.write(self.view[:nbytes]) #capture raw UDP data before decoding
+        framesarray = self._decode(self.view[:nbytes] if self._binary else self.buffer[:nbytes])
+        if framesarray.shape[0] != 1: #malformed or truncated datagram
+            self.dropped_count += 1
+            return framesarray[:0]
+        #Check simulation time sequence
+        t_sim = framesarray[0,0]
+        if t_sim < self.t_last - 1: #simulation restarted (more than one simulation second back)
+            self.t_last = - np.inf
+        if t_sim <= self.t_last: #late or duplicated frame
+            self.reordered_count += 1
+            return framesarray[:0]
+        if self.rate != SIM_RATE_SENT.value: #simulation rate changed at runtime
+            self.rate    = SIM_RATE_SENT.value
+            self.relearn = MODEL_HZ
+        if self.t_last > - np.inf:
+            gap  = t_sim - self.t_last
+            lost = max(int(round(gap / self.period)) - 1, 0)
+            if (self.relearn > 0) and (self.gap is not None) and (abs(gap - self.gap) <= 0.1 * self.gap) and (abs(gap - self.period) > 0.1 * self.period): #new frames spacing
+                self.period      = gap
+                self.lost_count -= self.lost_last #last gap already had the new spacing
+                lost             = 0
+            self.relearn     = max(self.relearn - 1, 0)
+            self.gap         = gap
+            self.lost_last   = lost
+            self.lost_count += lost
+        self.t_last        = t_sim
+        self.frames_count += 1
+        return framesarray
+
+    def counters(self):
+        return {'bytes':self.bytes_count, 'frames':self.frames_count, 'dropped':self.dropped_count, 'lost':self.lost_count, 'reordered':self.reordered_count}
 
 ''' TELEMETRY MODULE '''
 class Telemetry():
@@ -14,100 +226,93 @@ class Telemetry():
         self.RX_PORT       = TELEM_RX_PORT
         self.TX_IP_ADDRESS = TELEM_TX_IP_ADDRESS
         self.TX_PORT       = TELEM_TX_PORT
+        #Select RX telemetry decoder
+        if (TELEM_RX_PROTOCOL == 0) or (TELEM_RX_PROTOCOL == 'text'): #tab-separated text frames
+            self._decode = rxtelem_decode_text
+            self._binary = False
+        elif (TELEM_RX_PROTOCOL == 1) or (TELEM_RX_PROTOCOL == 'binary'): #binary frames
+            self._decode = rxtelem_decode_bin
+            self._binary = True
+        #Select RX and TX links transport
+        if (TELEM_TRANSPORT == 0) or (TELEM_TRANSPORT == 'tcp'): #TCP streams
+            self._rxbuffer = RXReassembler
+            self._udp      = False
+        elif (TELEM_TRANSPORT == 1) or (TELEM_TRANSPORT == 'udp'): #UDP datagrams
+            self._rxbuffer = RXDatagrams
+            self._udp      = True
 
-    def receive(self, rx2act_in, rx2cm_in, rx2csv_in, rx2dyn_in, rx2eq_in, rx2sp_in, rx2sup_in, event_rxtcp, event_start, event_end):
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP) #TCP RX socket
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) #set RX socket reusability
-        sock.bind((self.RX_IP_ADDRESS, self.RX_PORT)) #bind TCP RX socket to ip and port
-        sock.listen(1) #listen to flighgear TCP request
-        print('Waiting for RX link with FlightGear...')
-        conn, _ = sock.accept() #incoming TCP connection
+    def receive(self, log_dir, rx_rings, event_rxtcp, event_start, event_end):
+        if self._udp:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP) #UDP RX socket
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) #set RX socket reusability
+            sock.bind((self.RX_IP_ADDRESS, self.RX_PORT)) #bind UDP RX socket to ip and port
+            print('Waiting for RX link with FlightGear...')
+            sock.recv(1, socket.MSG_PEEK) #wait for the first datagram without consuming it
+            conn = sock
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP) #TCP RX socket
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) #set RX socket reusability
+            sock.bind((self.RX_IP_ADDRESS, self.RX_PORT)) #bind TCP RX socket to ip and port
+            sock.listen(1) #listen to flighgear TCP request
+            print('Waiting for RX link with FlightGear...')
+            conn, _ = sock.accept() #incoming TCP connection
         print('RX link established!')
         event_rxtcp.set() #set RX TCP connection event
-        dataframe = np.zeros(TELEM_RX_LEN) #array for storing one data frame
-        framesarray = np.zeros((MODEL_HZ, TELEM_RX_LEN)) #array for storing data frames
-        #Connecting loop
-        while True:
-            try:
-                tcpdata = conn.recv(TELEM_RX_BUFFER_SIZE) #TCP data buffer
-                tcpdata = tcpdata.decode() #decode TCP data
-                tcpframes = tcpdata.split('\n') #split TCP data into frames 
-                tcpframes = tcpframes[:-1] #remove empty last string
-                framescount = len(tcpframes) #count received frames
-                for i in range(framescount):
-                    dataframe[:] = tcpframes[i].split('\t') #split frames data 
-                    framesarray[i,:] = tuple(map(float,dataframe)) #store data tuple in array
-                framesarray = framesarray[:framescount,:]
-                framesarray = rxtelem_to_SI(framesarray)
-                if (framescount > 0) and (np.any(framesarray[:,0] >= TELEM_WAIT)): #if at least one frame was received and simulation time greater than TELEM_WAIT
-                    i = np.where(framesarray[:,0] >= TELEM_WAIT)[0][0] #find first frame index
-                    framesarray = framesarray[i:,:] #remove earlier frames
-                    rx2act_in.send(framesarray) #send RX telemetry to actuation 
-                    rx2cm_in.send(framesarray) #send RX telemetry to control model 
-                    rx2csv_in.send(framesarray) #send RX telemetry to CSV
-                    rx2dyn_in.send(framesarray) #send RX telemetry to dynamics
-                    rx2eq_in.send(framesarray) #send RX telemetry to equilibrium point
-                    rx2sp_in.send(framesarray) #send RX telemetry to setpoint 
-                    rx2sup_in.send(framesarray) #send RX telemetry to supervisor 
-                    event_start.set() #set simulation start event
-                    framesarray = np.empty((MODEL_HZ, TELEM_RX_LEN)) #empty data frames array
-                    break
-                else:
-                    framesarray = np.empty((MODEL_HZ, TELEM_RX_LEN)) #empty data frames array
-            except:
-                raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
+        if TELEM_RX_CAPTURE: #raw RX telemetry capture into the log directory
+            capture = RXCapture(os.path.join(log_dir, TELEM_RX_CAPTURE_FILENAME + '.bin'), self._binary)
+        else:
+            capture = None
+        rxbuffer = self._rxbuffer(self._decode, self._binary, capture) #RX telemetry frames reassembler or datagrams decoder
+        rxgate   = RXGate(rx_rings, event_start) #RX telemetry publishing from TELEM_WAIT on (re-armed on warm resets)
         #Connected loop
         while True:
             try:
                 if event_end.is_set():
-                    #Close pipes
-                    rx2act_in.close()
-                    rx2csv_in.close()
-                    rx2dyn_in.close()
-                    rx2eq_in.close()
-                    rx2sp_in.close()
-                    rx2cm_in.close()
-                    rx2sup_in.close()
+                    #Close ring buffers
+                    for rx_ring in rx_rings:
+                        rx_ring.close()
+                    print(' '.join(('RX link counters:', str(rxbuffer.counters()))))
+                    #Close capture
+                    if capture is not None:
+                        capture.close()
                     #Close socket
-                    sock.shutdown(socket.SHUT_RDWR)
+                    if not self._udp:
+                        sock.shutdown(socket.SHUT_RDWR)
                     sock.close()
                     break
                 else:
-                    tcpdata = conn.recv(TELEM_RX_BUFFER_SIZE) #TCP data buffer
-                    tcpdata = tcpdata.decode() #decode TCP data
-                    tcpframes = tcpdata.split('\n') #split TCP data into frames 
-                    tcpframes = tcpframes[:-1] #remove empty last string
-                    framescount = len(tcpframes) #count received frames
-                    for i in range(framescount):
-                        dataframe = tcpframes[i].split('\t') #split frames data 
-                        if len(dataframe) == TELEM_RX_LEN: #if dataframe is complete
-                            framesarray[i,:] = tuple(map(float,dataframe)) #store data tuple in array
-                        else:
-                            framescount -= 1
-                    framesarray = framesarray[:framescount,:]
+                    nbytes = conn.recv_into(rxbuffer.recv_view()) #receive TCP data (or one UDP datagram)
+                    t0 = TRACER.clock() #RX span start
+                    h0 = HEARTBEATS.clock() #loop iteration start
+                    framesarray = rxbuffer.feed(nbytes) #decode complete frames
+                    if rxbuffer.closed: #RX link closed by FlightGear (the supervisor ends the run once FlightGear exits)
+                        print('RX link lost!')
+                        event_rxtcp.clear() #RX link drained
+                        event_end.wait() #wait for links close event instead of receiving nothing forever
+                        continue
                     framesarray = rxtelem_to_SI(framesarray)
-                    if (framescount > 0): #if at least one frame was received
-                        rx2act_in.send(framesarray) #send RX telemetry to actuation 
-                        rx2cm_in.send(framesarray) #send RX telemetry to control model 
-                        rx2csv_in.send(framesarray) #send RX telemetry to CSV
-                        rx2dyn_in.send(framesarray) #send RX telemetry to dynamics
-                        rx2eq_in.send(framesarray) #send RX telemetry to equilibrium point
-                        rx2sp_in.send(framesarray) #send RX telemetry to setpoint 
-                        rx2sup_in.send(framesarray) #send RX telemetry to supervisor 
-                        framesarray = np.empty((MODEL_HZ, TELEM_RX_LEN)) #empty data frames array
-                    else:
-                        framesarray = np.empty((MODEL_HZ, TELEM_RX_LEN)) #empty data frames array
+                    if rxgate.send(framesarray): #if at least one frame was published
+                        TRACER.span('rx_parse', t0, framesarray[-1,0], rxgate.ticks)
+                        HEARTBEATS.beat('rx', h0)
             except:
                 raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
 
     def transmit(self, act2tx_out, event_rxtcp, event_txtcp, event_start, event_end):
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP) #TCP TX socket
+        if self._udp:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP) #UDP TX socket
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP) #TCP TX socket
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) #set TX socket reusability
         event_rxtcp.wait() #wait for RX TCP connection event
         print('Waiting for TX link with FlightGear...')
-        sock.connect((self.TX_IP_ADDRESS, self.TX_PORT)) #outgoing TCP connection
+        sock.connect((self.TX_IP_ADDRESS, self.TX_PORT)) #outgoing TCP connection (default destination of UDP datagrams)
+        if not self._udp:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) #send short actuation lines without Nagle delay
         print('TX link established!')
         event_txtcp.set() #wait for TX TCP connection event
+        txbuffer = bytearray(8 * TELEM_TX_BIN_FRAME_LEN) #preallocated actuation buffer (longer than a text actuation line)
+        txview   = memoryview(txbuffer)
+        tx_lost  = False #TX link closed by FlightGear
         event_start.wait() #wait for simulation start event
         while True:
             try:
@@ -115,11 +320,26 @@ class Telemetry():
                     #Close pipe
                     act2tx_out.close()
                     #Close socket
-                    sock.shutdown(socket.SHUT_RDWR)
+                    if not self._udp:
+                        try:
+                            sock.shutdown(socket.SHUT_RDWR)
+                        except OSError: #TX link already closed by FlightGear
+                            pass
                     sock.close()
                     break
                 else:
-                    txdata = act2tx_out.recv()
-                    sock.sendall(txdata.encode()) #sending TX telemetry data
+                    nbytes = act2tx_out.recv_bytes_into(txbuffer) #receive tick ID and encoded actuation
+                    if tx_lost: #actuation discarded (the supervisor ends the run once FlightGear exits)
+                        continue
+                    tick   = int.from_bytes(txview[:TELEM_TX_TICK_LEN], sys.byteorder, signed=True)
+                    t0 = TRACER.clock() #TX span start
+                    sock.sendall(txview[TELEM_TX_TICK_LEN:nbytes]) #sending TX telemetry data (one datagram per actuation line over UDP)
+                    TRACER.span('tx_send', t0, tick=tick)
+            except ConnectionRefusedError: #UDP datagram not delivered (FlightGear not listening yet)
+                continue
+            except (BrokenPipeError, ConnectionResetError): #TX link closed by FlightGear
+                print('TX link lost!')
+                tx_lost = True
+                continue
             except:
                 raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
@@ -0,0 +1,60 @@
+from settings import *
+
+import glob
+import json
+import numpy as np
+import os
+import time
+
+''' LOOP LATENCY TRACER '''
+class Tracer():
+    #Opt-in per-stage spans of each simulation tick written as Chrome trace (Perfetto) events
+    #Every process appends its own part file (fork start method), the supervisor merges them into a single trace file
+
+    def __init__(self):
+        self.enabled = False
+        self.log_dir = None
+        self.file    = None #part file of the current process
+        self.pid     = None #process owning the part file
+
+    def start(self, log_dir):
+        #Enable tracing into the log directory (before forking the simulation processes)
+        self.enabled = SIM_TRACE
+        self.log_dir = log_dir
+
+    def clock(self):
+        #Span start timestamp (monotonic clock shared by all processes)
+        return time.monotonic_ns() if self.enabled else 0
+
+    def span(self, name, t0, t_sim=None, tick=None):
+        #Complete event from t0 to now (for the tick at simulation time t_sim and its tick ID if known, or the tick IDs of a link span)
+        if not self.enabled:
+            return
+        t1 = time.monotonic_ns()
+        if self.pid != os.getpid(): #first span of this process
+            self._open(name)
+        args  = {} if t_sim is None else {'t_sim':float(t_sim)}
+        if tick is not None:
+            args.update(tick = int(tick) if isinstance(tick, (int, np.integer)) else [int(k) for k in tick])
+        event = {'name':name, 'cat':'tick', 'ph':'X', 'ts':t0/1000, 'dur':(t1-t0)/1000, 'pid':self.pid, 'tid':self.pid, 'args':args}
+        self.file.write(json.dumps(event) + '\n')
+
+    def merge(self):
+        #Merge every part file into the Chrome trace file
+        if not self.enabled:
+            return
+        events = []
+        for part_path in sorted(glob.glob(os.path.join(self.log_dir, TRACE_FILENAME + '_*.part'))):
+            with open(part_path) as part_file:
+                events.extend(json.loads(line) for line in part_file if line.endswith('\n')) #skip line truncated by process termination
+            os.remove(part_path)
+        with open(os.path.join(self.log_dir, TRACE_FILENAME + '.json'), 'w') as trace_file:
+            json.dump({'traceEvents':events, 'displayTimeUnit':'ms'}, trace_file)
+
+    def _open(self, name):
+        self.pid  = os.getpid()
+        self.file = open(os.path.join(self.log_dir, '{}_{}.part'.format(TRACE_FILENAME, self.pid)), 'a', buffering=1) #line buffered (processes are terminated without notice)
+        process_name = {'name':'process_name', 'ph':'M', 'pid':self.pid, 'tid':self.pid, 'args':{'name':name}} #label process track after its first span
+        self.file.write(json.dumps(process_name) + '\n')
+
+TRACER = Tracer() #process-wide tracer (configured by the supervisor, inherited by forked processes)
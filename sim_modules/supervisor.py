@@ -1,12 +1,21 @@
 from settings import *
 from modules.func.utils import *
+from modules.sim.channels import *
+from modules.sim.graph import *
+from modules.sim.tracing import *
 from plot_results import *
 
+from multiprocessing import connection
+import functools
+import json
 import multiprocessing as mp
+import numpy as np
 import os
 import socket
 import subprocess
 import sys
+import settings
+import signal
 import time
 
 class Supervisor():
@@ -17,344 +26,131 @@ class Supervisor():
         event_txtcp = mp.Event() #TX TCP connection event
         event_start = mp.Event() #simulation run start event
         event_end   = mp.Event() #simulation run end event
+        event_close = mp.Event() #FlightGear links close event
+        event_flush = mp.Event() #CSV logging flush event (producers stopped)
         #Define events dictionary
-        events_dict = {'event_rxtcp':event_rxtcp, 'event_txtcp':event_txtcp, 'event_start':event_start, 'event_end':event_end}
-        #Instantiate pipes
-        act2csv_out, act2csv_in = mp.Pipe() #actuation data pipe to CSV
-        act2tx_out, act2tx_in   = mp.Pipe() #actuation data pipe to TX telemetry
-        cm2act_out, cm2act_in   = mp.Pipe() #control model data pipe to actuation
-        cm2csv_out, cm2csv_in   = mp.Pipe() #control model data pipe to CSV
-        eq2cm_out, eq2cm_in     = mp.Pipe() #equilibrium point data pipe to control model
-        eq2csv_out, eq2csv_in   = mp.Pipe() #equilibrium point data pipe to CSV
-        dyn2csv_out, dyn2csv_in = mp.Pipe() #dynamics data pipe to CSV
-        rx2act_out, rx2act_in   = mp.Pipe() #RX telemetry data pipe to actuation
-        rx2cm_out, rx2cm_in     = mp.Pipe() #RX telemetry data pipe to control model
-        rx2csv_out, rx2csv_in   = mp.Pipe() #RX telemetry data pipe to CSV
-        rx2dyn_out, rx2dyn_in   = mp.Pipe() #RX telemetry data pipe to dynamics 
-        rx2eq_out, rx2eq_in     = mp.Pipe() #RX telemetry data pipe to equilibrium
-        rx2sp_out, rx2sp_in     = mp.Pipe() #RX telemetry data pipe to setpoint
-        rx2sup_out, rx2sup_in   = mp.Pipe() #RX telemetry data pipe to supervisor
-        sp2act_out, sp2act_in   = mp.Pipe() #setpoint data pipe to actuation
-        sp2cm_out, sp2cm_in     = mp.Pipe() #setpoint data pipe to control model
-        sp2csv_out, sp2csv_in   = mp.Pipe() #setpoint data pipe to CSV
-        #Define pipes dictionary
-        pipes_dict = {'act2csv_out':act2csv_out, 'act2csv_in':act2csv_in, 'act2tx_out':act2tx_out, 'act2tx_in':act2tx_in, 'cm2act_out':cm2act_out, 'cm2act_in':cm2act_in, 'cm2csv_out':cm2csv_out, 'cm2csv_in':cm2csv_in, 'eq2cm_out':eq2cm_out, 'eq2cm_in':eq2cm_in, 'eq2csv_out':eq2csv_out, 'eq2csv_in':eq2csv_in, 'dyn2csv_out':dyn2csv_out, 'dyn2csv_in':dyn2csv_in, 'rx2act_out':rx2act_out, 'rx2act_in':rx2act_in, 'rx2cm_out':rx2cm_out, 'rx2cm_in':rx2cm_in, 'rx2csv_out':rx2csv_out, 'rx2csv_in':rx2csv_in, 'rx2dyn_out':rx2dyn_out, 'rx2dyn_in':rx2dyn_in, 'rx2eq_out':rx2eq_out, 'rx2eq_in':rx2eq_in, 'rx2sp_out':rx2sp_out, 'rx2sp_in':rx2sp_in, 'rx2sup_out':rx2sup_out, 'rx2sup_in':rx2sup_in, 'sp2act_out':sp2act_out, 'sp2act_in':sp2act_in, 'sp2cm_out':sp2cm_out, 'sp2cm_in':sp2cm_in, 'sp2csv_out':sp2csv_out, 'sp2csv_in':sp2csv_in}
+        events_dict = {'event_rxtcp':event_rxtcp, 'event_txtcp':event_txtcp, 'event_start':event_start, 'event_end':event_end, 'event_close':event_close, 'event_flush':event_flush}
         #Define global dictionary
-        self.global_dict = {**events_dict, **pipes_dict, **mods_dict}
+        self.global_dict = {**events_dict, **mods_dict}
+        #Build simulation pipeline (stages processes and channels ends from the stage graph, campaign runner only launches workers)
+        self.graph = StageGraph()
+        if (CAMPAIGN_INSTANCE > 0) or not ((SIM_TYPE == 2) or (SIM_TYPE == 'campaign')):
+            self.global_dict.update(self.graph.build())
+        self.check_scheduling() #processes CPU affinity, nice level and real-time priority settings
         #Select type of simulation
-        if (SIM_TYPE == 0) or (SIM_TYPE == 'single'):
+        if CAMPAIGN_INSTANCE > 0: #campaign worker
+            self.campaign_run()
+        elif (SIM_TYPE == 0) or (SIM_TYPE == 'single'):
             self.single_sim()
         elif (SIM_TYPE == 1) or (SIM_TYPE == 'multiple'):
             self.multiple_sim()
+        elif (SIM_TYPE == 2) or (SIM_TYPE == 'campaign'):
+            self.campaign_sim()
 
     def start_processes(self):
-        #Instantiate processes
-        act_proc = self.actuation_process()
-        cm_proc  = self.control_model_process()
-        cfg_proc = self.configuration_process()
-        dyn_proc = self.dynamics_process()
-        eq_proc  = self.equilibrium_process()
-        sp_proc  = self.setpoint_process()
-        telemrx_proc, telemtx_proc = self.telemetry_processes()
-        cmlog_proc, dynlog_proc, eqlog_proc, splog_proc, telemrxlog_proc, telemtxlog_proc = self.csvlogging_processes()
+        #Instantiate processes (FlightGear links, stages and CSV logging)
+        procs = {name:self.graph.process(name, self.global_dict) for name in (*self.graph.names('link'), *self.graph.names('stage'), *self.graph.names('log'))}
+        HEARTBEATS.reset() #clear stages heartbeats of the previous simulation run
         #Start processes (order is important)
-        telemrx_proc.start()
-        telemtx_proc.start()
-        cfg_proc.start()
-        act_proc.start()
-        cm_proc.start()
-        dyn_proc.start()
-        eq_proc.start()
-        sp_proc.start()
-        cmlog_proc.start()
-        dynlog_proc.start()
-        eqlog_proc.start()
-        splog_proc.start()
-        telemrxlog_proc.start()
-        telemtxlog_proc.start()
+        for name, proc in procs.items():
+            proc.start()
+            self.schedule_process(name, proc.pid)
         time.sleep(1)
         scen_proc = self.scenario_process() #scenario subprocess automatically starts when called
         #Update global dictionary with new processes
-        self.global_dict.update(act_proc = act_proc)
-        self.global_dict.update(cfg_proc = cfg_proc)
-        self.global_dict.update(cm_proc = cm_proc)
-        self.global_dict.update(cmlog_proc = cmlog_proc)
-        self.global_dict.update(dyn_proc = dyn_proc)
-        self.global_dict.update(dynlog_proc = dynlog_proc)
-        self.global_dict.update(eq_proc = eq_proc)
-        self.global_dict.update(eqlog_proc = eqlog_proc)
+        self.global_dict.update({name + '_proc':proc for name, proc in procs.items()})
+        self.global_dict.update(link_procs = tuple(procs[name] for name in self.graph.names('link')))
         self.global_dict.update(scen_proc = scen_proc)
-        self.global_dict.update(sp_proc = sp_proc)
-        self.global_dict.update(splog_proc = splog_proc)
-        self.global_dict.update(telemrx_proc = telemrx_proc)
-        self.global_dict.update(telemrxlog_proc = telemrxlog_proc)
-        self.global_dict.update(telemtx_proc = telemtx_proc)
-        self.global_dict.update(telemtxlog_proc = telemtxlog_proc)
-
-    def terminate_processes(self):
-        #Get processes
-        act_proc        = self.global_dict['act_proc']
-        cfg_proc        = self.global_dict['cfg_proc']
-        cm_proc         = self.global_dict['cm_proc']
-        cmlog_proc      = self.global_dict['cmlog_proc']
-        dyn_proc        = self.global_dict['dyn_proc']
-        dynlog_proc     = self.global_dict['dynlog_proc']
-        eq_proc         = self.global_dict['eq_proc']
-        eqlog_proc      = self.global_dict['eqlog_proc']
-        scen_proc       = self.global_dict['scen_proc']
-        sp_proc         = self.global_dict['sp_proc']
-        splog_proc      = self.global_dict['splog_proc']
-        telemrx_proc    = self.global_dict['telemrx_proc']
-        telemrxlog_proc = self.global_dict['telemrxlog_proc']
-        telemtx_proc    = self.global_dict['telemtx_proc']
-        telemtxlog_proc = self.global_dict['telemtxlog_proc']
-        #Terminate processes (order is important)
-        scen_proc.terminate()
-        time.sleep(1)
-        act_proc.terminate()
-        cm_proc.terminate()
-        dyn_proc.terminate()
-        eq_proc.terminate()
-        sp_proc.terminate()
-        cfg_proc.terminate()
-        telemtx_proc.terminate()
-        telemrx_proc.terminate()
-        cmlog_proc.terminate()
-        dynlog_proc.terminate()
-        eqlog_proc.terminate()
-        splog_proc.terminate()
-        telemrxlog_proc.terminate()
-        telemtxlog_proc.terminate()
+        self.reset_rate_governor() #initialize simulation rate governor
+
+    def rearm_processes(self):
+        #Warm reset: reposition the aircraft and restart simulation processes (FlightGear and links processes are kept alive)
+        props_mod = self.global_dict['props_mod']
+        scen_mod  = self.global_dict['scen_mod']
+        props_mod.reset(scen_mod.presets()) #scenario initial conditions (simulation time restarts)
+        if self.global_dict['sim_rate'] != SIM_RATE:
+            self.set_sim_rate(SIM_RATE) #restore initial simulation rate
+        #Instantiate processes (stages and CSV logging)
+        procs = {name:self.graph.process(name, self.global_dict) for name in (*self.graph.names('stage'), *self.graph.names('log'))}
+        HEARTBEATS.reset() #clear stages heartbeats of the previous simulation run
+        #Start processes
+        for name, proc in procs.items():
+            proc.start()
+            self.schedule_process(name, proc.pid)
         #Update global dictionary with new processes
-        self.global_dict.update(act_proc = act_proc)
-        self.global_dict.update(cfg_proc = cfg_proc)
-        self.global_dict.update(cm_proc = cm_proc)
-        self.global_dict.update(cmlog_proc = cmlog_proc)
-        self.global_dict.update(dyn_proc = dyn_proc)
-        self.global_dict.update(eq_proc = eq_proc)
-        self.global_dict.update(dynlog_proc = dynlog_proc)
-        self.global_dict.update(eqlog_proc = eqlog_proc)
-        self.global_dict.update(scen_proc = scen_proc)
-        self.global_dict.update(sp_proc = sp_proc)
-        self.global_dict.update(splog_proc = splog_proc)
-        self.global_dict.update(telemrx_proc = telemrx_proc)
-        self.global_dict.update(telemrxlog_proc = telemrxlog_proc)
-        self.global_dict.update(telemtx_proc = telemtx_proc)
-        self.global_dict.update(telemtxlog_proc = telemtxlog_proc)
-
-    def clear_events(self):
+        self.global_dict.update({name + '_proc':proc for name, proc in procs.items()})
+        self.reset_rate_governor() #initialize simulation rate governor
+
+    def end_run(self, keep_links=False):
+        #Set simulation end event and links close event (the RX telemetry gate is closed instead if the links are kept alive)
+        event_start = self.global_dict['event_start']
+        event_end   = self.global_dict['event_end']
+        event_end.set() #set simulation end event
+        self.global_dict.update(event_end = event_end)
+        if keep_links:
+            event_start.clear() #close RX telemetry gate before readers skip the previous simulation run
+            self.global_dict.update(event_start = event_start)
+        else:
+            event_close = self.global_dict['event_close']
+            event_close.set() #set links close event
+            self.global_dict.update(event_close = event_close)
+        time.sleep(1)
+
+    def terminate_processes(self, keep_links=False):
+        #Get processes
+        stage_procs = [self.global_dict[name + '_proc'] for name in self.graph.names('stage')]
+        log_procs   = [self.global_dict[name + '_proc'] for name in self.graph.names('log')]
+        link_procs  = self.global_dict['link_procs']
+        scen_proc   = self.global_dict['scen_proc']
+        event_flush = self.global_dict['event_flush']
+        #Terminate producers processes (order is important, FlightGear and links processes are kept alive on warm resets)
+        if not keep_links:
+            scen_proc.terminate()
+            time.sleep(1)
+        for proc in stage_procs:
+            proc.terminate()
+        if not keep_links:
+            for link_proc in reversed(link_procs):
+                link_proc.join(1) #links exit by themselves once the links close event is set
+                link_proc.terminate()
+        for proc in (*stage_procs, *(() if keep_links else link_procs)):
+            proc.join(1)
+        #Drain pipes and flush CSV logging partial buffers (within the flush timeout, then terminate)
+        event_flush.set()
+        t_flush = time.monotonic() + CSV_FLUSH_TIMEOUT
+        for log_proc in log_procs:
+            log_proc.join(max(t_flush - time.monotonic(), 0))
+            if log_proc.is_alive():
+                print('CSV logging flush timed out!')
+                log_proc.terminate()
+
+    def clear_events(self, keep_links=False):
         #Get events
         event_rxtcp = self.global_dict['event_rxtcp']
         event_txtcp = self.global_dict['event_txtcp']
         event_start = self.global_dict['event_start']
         event_end   = self.global_dict['event_end']
-        #Clear events
-        event_rxtcp.clear()
-        event_txtcp.clear()
+        event_close = self.global_dict['event_close']
+        event_flush = self.global_dict['event_flush']
+        #Clear events (links events are kept on warm resets, clearing the simulation start event re-arms the RX telemetry gate)
+        if not keep_links:
+            event_rxtcp.clear()
+            event_txtcp.clear()
+            event_close.clear()
         event_start.clear()
         event_end.clear()
+        event_flush.clear()
         #Update global dictionary with cleared events
         self.global_dict.update(event_rxtcp = event_rxtcp)
         self.global_dict.update(event_txtcp = event_txtcp)
         self.global_dict.update(event_start = event_start)
         self.global_dict.update(event_end = event_end)
+        self.global_dict.update(event_close = event_close)
+        self.global_dict.update(event_flush = event_flush)
 
-    def restore_pipes(self):
-        #Get pipes
-        act2csv_out = self.global_dict['act2csv_out']
-        act2csv_in  = self.global_dict['act2csv_in']
-        act2tx_out  = self.global_dict['act2tx_out']
-        act2tx_in   = self.global_dict['act2tx_in']
-        cm2act_out  = self.global_dict['cm2act_out']
-        cm2act_in   = self.global_dict['cm2act_in']
-        cm2csv_out  = self.global_dict['cm2csv_out']
-        cm2csv_in   = self.global_dict['cm2csv_in']
-        dyn2csv_out = self.global_dict['dyn2csv_out']
-        dyn2csv_in  = self.global_dict['dyn2csv_in']
-        eq2cm_out   = self.global_dict['eq2cm_out']
-        eq2cm_in    = self.global_dict['eq2cm_in']
-        eq2csv_out  = self.global_dict['eq2csv_out']
-        eq2csv_in   = self.global_dict['eq2csv_in']
-        rx2act_out  = self.global_dict['rx2act_out']
-        rx2act_in   = self.global_dict['rx2act_in']
-        rx2cm_out   = self.global_dict['rx2cm_out']
-        rx2cm_in    = self.global_dict['rx2cm_in']
-        rx2csv_out  = self.global_dict['rx2csv_out']
-        rx2csv_in   = self.global_dict['rx2csv_in']
-        rx2dyn_out  = self.global_dict['rx2dyn_out']
-        rx2dyn_in   = self.global_dict['rx2dyn_in']
-        rx2eq_out   = self.global_dict['rx2eq_out']
-        rx2eq_in    = self.global_dict['rx2eq_in']
-        rx2sp_out   = self.global_dict['rx2sp_out']
-        rx2sp_in    = self.global_dict['rx2sp_in']
-        rx2sup_out  = self.global_dict['rx2sup_out']
-        rx2sup_in   = self.global_dict['rx2sup_in']
-        sp2act_out  = self.global_dict['sp2act_out']
-        sp2act_in   = self.global_dict['sp2act_in']
-        sp2cm_out   = self.global_dict['sp2cm_out']
-        sp2cm_in    = self.global_dict['sp2cm_in']
-        sp2csv_out  = self.global_dict['sp2csv_out']
-        sp2csv_in   = self.global_dict['sp2csv_in']
-        #Create new pipes
-        act2csv_out, act2csv_in = mp.Pipe() #actuation data pipe to CSV
-        act2tx_out, act2tx_in   = mp.Pipe() #actuation data pipe to TX telemetry
-        cm2act_out, cm2act_in   = mp.Pipe() #control model data pipe to actuation
-        cm2csv_out, cm2csv_in   = mp.Pipe() #control model data pipe to CSV
-        dyn2csv_out, dyn2csv_in = mp.Pipe() #dynamics data pipe to CSV
-        eq2cm_out, eq2cm_in     = mp.Pipe() #equilibrium point data pipe to control model
-        eq2csv_out, eq2csv_in   = mp.Pipe() #equilibrium point data pipe to CSV
-        rx2act_out, rx2act_in   = mp.Pipe() #RX telemetry data pipe to actuation
-        rx2cm_out, rx2cm_in     = mp.Pipe() #RX telemetry data pipe to control model
-        rx2csv_out, rx2csv_in   = mp.Pipe() #RX telemetry data pipe to CSV
-        rx2dyn_out, rx2dyn_in   = mp.Pipe() #RX telemetry data pipe to dynamics 
-        rx2eq_out, rx2eq_in     = mp.Pipe() #RX telemetry data pipe to equilibrium point
-        rx2sp_out, rx2sp_in     = mp.Pipe() #RX telemetry data pipe to setpoint
-        rx2sup_out, rx2sup_in   = mp.Pipe() #RX telemetry data pipe to supervisor
-        sp2act_out, sp2act_in   = mp.Pipe() #setpoint data pipe to actuation
-        sp2cm_out, sp2cm_in     = mp.Pipe() #setpoint data pipe to control model
-        sp2csv_out, sp2csv_in   = mp.Pipe() #setpoint data pipe to CSV
-        #Update global dictionary with new pipes
-        self.global_dict.update(act2csv_out = act2csv_out)
-        self.global_dict.update(act2csv_in = act2csv_in)
-        self.global_dict.update(act2tx_out = act2tx_out)
-        self.global_dict.update(act2tx_in = act2tx_in)
-        self.global_dict.update(cm2act_out = cm2act_out)
-        self.global_dict.update(cm2act_in = cm2act_in)
-        self.global_dict.update(cm2csv_out = cm2csv_out)
-        self.global_dict.update(cm2csv_in = cm2csv_in)
-        self.global_dict.update(dyn2csv_out = dyn2csv_out)
-        self.global_dict.update(dyn2csv_in = dyn2csv_in)
-        self.global_dict.update(eq2cm_out = eq2cm_out)
-        self.global_dict.update(eq2cm_in = eq2cm_in)
-        self.global_dict.update(eq2csv_out = eq2csv_out)
-        self.global_dict.update(eq2csv_in = eq2csv_in)
-        self.global_dict.update(rx2act_out = rx2act_out)
-        self.global_dict.update(rx2act_in = rx2act_in)
-        self.global_dict.update(rx2cm_out = rx2cm_out)
-        self.global_dict.update(rx2cm_in = rx2cm_in)
-        self.global_dict.update(rx2csv_out = rx2csv_out)
-        self.global_dict.update(rx2csv_in = rx2csv_in)
-        self.global_dict.update(rx2dyn_out = rx2dyn_out)
-        self.global_dict.update(rx2dyn_in = rx2dyn_in)
-        self.global_dict.update(rx2eq_out = rx2eq_out)
-        self.global_dict.update(rx2eq_in = rx2eq_in)
-        self.global_dict.update(rx2sp_out = rx2sp_out)
-        self.global_dict.update(rx2sp_in = rx2sp_in)
-        self.global_dict.update(rx2sup_out = rx2sup_out)
-        self.global_dict.update(rx2sup_in = rx2sup_in)
-        self.global_dict.update(sp2act_out = sp2act_out)
-        self.global_dict.update(sp2act_in = sp2act_in)
-        self.global_dict.update(sp2cm_out = sp2cm_out)
-        self.global_dict.update(sp2cm_in = sp2cm_in)
-        self.global_dict.update(sp2csv_out = sp2csv_out)
-        self.global_dict.update(sp2csv_in = sp2csv_in)
-
-    def actuation_process(self):
-        #Get process arguments
-        act_mod     = self.global_dict['act_mod']
-        act2csv_in  = self.global_dict['act2csv_in']
-        act2tx_in   = self.global_dict['act2tx_in']
-        cm2act_out  = self.global_dict['cm2act_out']
-        rx2act_out  = self.global_dict['rx2act_out']
-        event_start = self.global_dict['event_start']
-        event_end   = self.global_dict['event_end']
-        #Instantiate actuation process
-        if (ACT_TYPE == 0) or (ACT_TYPE == 'random'): #random control
-            act_proc = mp.Process(target=act_mod.Random.run, args=(act2csv_in, act2tx_in, rx2act_out, event_start, event_end), daemon=True)
-        elif (ACT_TYPE == 1) or (ACT_TYPE == 'fsfb'): #full-state feedback control
-            act_proc = mp.Process(target=act_mod.FSFB.run, args=(act2csv_in, act2tx_in, cm2act_out, rx2act_out, event_start, event_end), daemon=True)
-        elif (ACT_TYPE == 2) or (ACT_TYPE == 'lqr'): #linear-quadratic regulator
-            act_proc = mp.Process(target=act_mod.LQR.run, args=(act2csv_in, act2tx_in, cm2act_out, rx2act_out, event_start, event_end), daemon=True)
-        elif (ACT_TYPE == 3) or (ACT_TYPE == 'mpc'): #model predictive control
-            act_proc = mp.Process(target=act_mod.MPC.run, args=(act2csv_in, act2tx_in, cm2act_out, rx2act_out, event_start, event_end), daemon=True)
-        return act_proc
-
-    def control_model_process(self):
-        #Get process arguments
-        cm_mod      = self.global_dict['cm_mod']
-        cm2act_in   = self.global_dict['cm2act_in']
-        cm2csv_in   = self.global_dict['cm2csv_in']
-        eq2cm_out   = self.global_dict['eq2cm_out']
-        eq2csv_in   = self.global_dict['eq2csv_in']
-        rx2cm_out   = self.global_dict['rx2cm_out']
-        sp2cm_out   = self.global_dict['sp2cm_out']
-        event_start = self.global_dict['event_start']
-        event_end   = self.global_dict['event_end']
-        #Instantiate control model process
-        if (CM_TYPE == 0) or (CM_TYPE == 'AL'): #analytic linear control model
-            cm_proc = mp.Process(target=cm_mod.ALCM.run, args=(cm2act_in, cm2csv_in, eq2cm_out, rx2cm_out, sp2cm_out, event_start, event_end), daemon=True)
-        elif (CM_TYPE == 1) or (CM_TYPE == 'ANL'): #analytic non-linear control model
-            cm_proc = mp.Process(target=cm_mod.ANLCM.run, args=(cm2act_in, cm2csv_in, eq2cm_out, rx2cm_out, sp2cm_out, event_start, event_end), daemon=True)
-        elif (CM_TYPE == 2) or (CM_TYPE == 'LANL'): #linearized analytic non-linear control model
-            cm_proc = mp.Process(target=cm_mod.LANLCM.run, args=(cm2act_in, cm2csv_in, eq2cm_out, rx2cm_out, sp2cm_out, event_start, event_end), daemon=True)
-        return cm_proc
-
-    def configuration_process(self):
-        #Get process arguments
-        cfg_mod     = self.global_dict['cfg_mod']
-        event_rxtcp = self.global_dict['event_rxtcp']
-        #Instantiate configuration process
-        cfg_proc    = mp.Process(target=cfg_mod.transmit, args=(event_rxtcp,), daemon=True)
-        return cfg_proc
-
-    def equilibrium_process(self):
-        #Get process arguments
-        eq_mod      = self.global_dict['eq_mod']
-        eq2cm_in    = self.global_dict['eq2cm_in']
-        eq2csv_in   = self.global_dict['eq2csv_in']
-        rx2eq_out   = self.global_dict['rx2eq_out']
-        event_start = self.global_dict['event_start']
-        event_end   = self.global_dict['event_end']
-        #Instantiate equilibrium process
-        eq_proc = mp.Process(target=eq_mod.run, args=(eq2cm_in, eq2csv_in, rx2eq_out, event_start, event_end), daemon=True)
-        return eq_proc
-
-    def setpoint_process(self):
-        #Get process arguments
-        sp_mod      = self.global_dict['sp_mod']
-        rx2sp_out   = self.global_dict['rx2sp_out']
-        sp2cm_in    = self.global_dict['sp2cm_in']
-        sp2csv_in   = self.global_dict['sp2csv_in']
-        event_start = self.global_dict['event_start']
-        event_end   = self.global_dict['event_end']
-        #Instantiate setpoint process
-        if (SP_TYPE == 0) or (SP_TYPE == 'constant'): #constant setpoint
-            sp_proc = mp.Process(target=sp_mod.Constant.run, args=(rx2sp_out, sp2cm_in, sp2csv_in, event_start, event_end), daemon=True)
-        elif (SP_TYPE == 1) or (SP_TYPE == 'straight_line'): #straight line setpoint
-            sp_proc = mp.Process(target=sp_mod.StraightLine.run, args=(rx2sp_out, sp2cm_in, sp2csv_in, event_start, event_end), daemon=True)
-        return sp_proc
-
-    def dynamics_process(self):
-        #Get process arguments
-        dyn_mod     = self.global_dict['dyn_mod']
-        dyn2csv_in  = self.global_dict['dyn2csv_in']
-        rx2dyn_out  = self.global_dict['rx2dyn_out']
-        event_start = self.global_dict['event_start']
-        event_end   = self.global_dict['event_end']
-        #Instantiate dynamics process
-        dyn_proc    = mp.Process(target=dyn_mod.run, args=(dyn2csv_in, rx2dyn_out, event_start, event_end), daemon=True)
-        return dyn_proc
-
-    def csvlogging_processes(self):
-        #Get process arguments
-        csvlog_mod      = self.global_dict['csvlog_mod']
-        csvlog_dir      = self.global_dict['csvlog_dir']
-        act2csv_out     = self.global_dict['act2csv_out']
-        cm2csv_out      = self.global_dict['cm2csv_out']
-        dyn2csv_out     = self.global_dict['dyn2csv_out']
-        eq2csv_out      = self.global_dict['eq2csv_out']
-        rx2csv_out      = self.global_dict['rx2csv_out']
-        sp2csv_out      = self.global_dict['sp2csv_out']
-        event_start     = self.global_dict['event_start']
-        event_end       = self.global_dict['event_end']
-        #Instantiate CSV logging processes
-        cmlog_proc      = mp.Process(target=csvlog_mod.write_cmlog, args=(csvlog_dir, cm2csv_out, event_start, event_end), daemon=True) #logging control model
-        dynlog_proc     = mp.Process(target=csvlog_mod.write_dynlog, args=(csvlog_dir, dyn2csv_out, event_start, event_end), daemon=True) #logging dynamics
-        eqlog_proc      = mp.Process(target=csvlog_mod.write_eqlog, args=(csvlog_dir, eq2csv_out, event_start, event_end), daemon=True) #logging equilibrium point
-        splog_proc      = mp.Process(target=csvlog_mod.write_splog, args=(csvlog_dir, sp2csv_out, event_start, event_end), daemon=True) #logging setpoint
-        telemrxlog_proc = mp.Process(target=csvlog_mod.write_telemrxlog, args=(csvlog_dir, rx2csv_out, event_start, event_end), daemon=True) #logging RX telemetry
-        telemtxlog_proc = mp.Process(target=csvlog_mod.write_telemtxlog, args=(csvlog_dir, act2csv_out, event_start, event_end), daemon=True) #logging TX telemetry
-        return cmlog_proc, dynlog_proc, eqlog_proc, splog_proc, telemrxlog_proc, telemtxlog_proc
+    def restore_pipes(self, keep_links=False):
+        #New channels ends for the next simulation run (links processes keep their ends on warm resets, their RX telemetry readers skip the previous simulation run)
+        self.global_dict.update(self.graph.build(self.global_dict if keep_links else None))
 
     def plot_sim_results(self):
         #Get arguments
@@ -366,99 +162,345 @@ class Supervisor():
         dyndata = csvlog_mod.read_dynlog(csvlog_dir)
         eqdata  = csvlog_mod.read_eqlog(csvlog_dir)
         spdata  = csvlog_mod.read_splog(csvlog_dir)
+        self.schedule_process('plot') #demote plotting (last step of the supervisor)
         plot(rxdata, txdata, dyndata, eqdata, spdata)
 
     def scenario_process(self):
         #Get process arguments
-        scen_mod = self.global_dict['scen_mod']
+        scen_mod    = self.global_dict['scen_mod']
+        standin_mod = self.global_dict['standin_mod']
         #Instantiate scenario process
-        shell_command = scen_mod.run()
-        scen_proc     = subprocess.Popen(args=shell_command)
+        if (SIM_BACKEND == 0) or (SIM_BACKEND == 'flightgear'): #FlightGear
+            shell_command = scen_mod.run()
+            scen_proc     = subprocess.Popen(args=shell_command, preexec_fn=functools.partial(self.schedule_process, 'scen')) #scheduled before exec (inherited by every FlightGear thread)
+        else: #FlightGear stand-in
+            scen_proc = mp.Process(target=standin_mod.run, daemon=True)
+            scen_proc.start()
+            self.schedule_process('scen', scen_proc.pid)
         return scen_proc
 
-    def telemetry_processes(self):
-        #Get process arguments
-        telem_mod   = self.global_dict['telem_mod']
-        act2tx_out  = self.global_dict['act2tx_out']
-        rx2act_in   = self.global_dict['rx2act_in']
-        rx2cm_in    = self.global_dict['rx2cm_in']
-        rx2csv_in   = self.global_dict['rx2csv_in']
-        rx2dyn_in   = self.global_dict['rx2dyn_in']
-        rx2eq_in    = self.global_dict['rx2eq_in']
-        rx2sp_in    = self.global_dict['rx2sp_in']
-        rx2sup_in   = self.global_dict['rx2sup_in']
-        event_rxtcp = self.global_dict['event_rxtcp']
-        event_txtcp = self.global_dict['event_txtcp']
-        event_start = self.global_dict['event_start']
-        event_end   = self.global_dict['event_end']
-        #Instantiate telemetry processes
-        telemrx_proc = mp.Process(target=telem_mod.receive, args=(rx2act_in, rx2cm_in, rx2csv_in, rx2dyn_in, rx2eq_in, rx2sp_in, rx2sup_in, event_rxtcp, event_start, event_end), daemon=True) #RX telemetry
-        telemtx_proc = mp.Process(target=telem_mod.transmit, args=(act2tx_out, event_rxtcp, event_txtcp, event_start, event_end), daemon=True) #TX telemetry
-        return telemrx_proc, telemtx_proc
+    def check_scheduling(self):
+        #Processes scheduling settings only for processes of the simulation pipeline
+        procs_names = (*self.graph.names('link'), *self.graph.names('stage'), *self.graph.names('log'), 'scen', 'plot')
+        for setting, sched_dict in (('SCHED_AFFINITY', SCHED_AFFINITY), ('SCHED_FIFO', SCHED_FIFO), ('SCHED_NICE', SCHED_NICE)):
+            for name in sched_dict:
+                if name not in procs_names:
+                    raise ValueError(' '.join(('Unknown process in', setting + ':', name, '(processes:', ', '.join(procs_names) + ')')))
+        for name, cores in SCHED_AFFINITY.items():
+            if (len(cores) == 0) or (not set(cores) <= os.sched_getaffinity(0)):
+                raise ValueError(' '.join(('CPU cores of', name, 'in SCHED_AFFINITY not available:', str(tuple(cores)), '(available:', str(tuple(sorted(os.sched_getaffinity(0)))) + ')')))
+        fifo_min = os.sched_get_priority_min(os.SCHED_FIFO)
+        fifo_max = os.sched_get_priority_max(os.SCHED_FIFO)
+        for name, priority in SCHED_FIFO.items():
+            if (not isinstance(priority, int)) or (not fifo_min <= priority <= fifo_max):
+                raise ValueError(' '.join(('Priority of', name, 'in SCHED_FIFO out of range:', str(priority), '(range:', str(fifo_min) + '-' + str(fifo_max) + ')')))
+        for name, nice in SCHED_NICE.items():
+            if (not isinstance(nice, int)) or (not -20 <= nice <= 19):
+                raise ValueError(' '.join(('Nice level of', name, 'in SCHED_NICE out of range:', str(nice), '(range: -20-19)')))
+
+    def schedule_process(self, name, pid=0):
+        #Apply CPU affinity, nice level and SCHED_FIFO priority settings of a process (calling process if pid is 0)
+        try:
+            if name in SCHED_AFFINITY:
+                os.sched_setaffinity(pid, SCHED_AFFINITY[name])
+            if name in SCHED_NICE:
+                os.setpriority(os.PRIO_PROCESS, pid, SCHED_NICE[name])
+            if name in SCHED_FIFO:
+                os.sched_setscheduler(pid, os.SCHED_FIFO, os.sched_param(SCHED_FIFO[name]))
+        except PermissionError: #raising priority requires CAP_SYS_NICE (or RLIMIT_NICE / RLIMIT_RTPRIO)
+            print(' '.join(('Scheduling of', name, 'not permitted!')))
 
     def single_sim(self):
         self.make_log_dir() #create CSV log directory
-        self.csvlog_headers() #write CSV log headers
-        self.start_processes() #start simulation processes
-        rx2sup_out  = self.global_dict['rx2sup_out']
-        event_start = self.global_dict['event_start']
-        event_end   = self.global_dict['event_end']
-        event_start.wait() #wait for simulation start event
-        #Single simulation run loop
-        while True:
-            try:
-                rxdata    = rx2sup_out.recv() #receive RX telemetry
-                lastframe = rxdata[-1] #get last RX telemetry frame
-                terminate_run = self.simulation_watchdog(lastframe) #check if simulation run is over
-                if terminate_run:
-                    self.terminate_processes() #terminate simulation processes
-                    terminate_run = False
-                    break
-            except:
-                raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
+        self.single_run() #simulation run
         self.plot_sim_results()
         quit() #quit program
 
+    def single_run(self):
+        self.csvlog_headers() #write CSV log headers
+        TRACER.start(self.global_dict['csvlog_dir']) #enable loop latency tracing if configured
+        self.start_processes() #start simulation processes
+        run_over = self.watch_run() #wait for the end of the simulation run
+        self.end_run() #let the links close their sockets, ring buffers and capture
+        self.terminate_processes() #terminate simulation processes
+        self.conflation_report() #print stale batches dropped by conflating stage inputs
+        self.health_report() #print stages loop iteration timing
+        TRACER.merge() #write Chrome trace file
+        self.graph.unlink() #release shared memory ring buffers
+        return run_over
+
     def multiple_sim(self):
         self.make_log_dir() #create CSV log directory
         self.csvlog_headers() #write CSV log headers
+        TRACER.start(self.global_dict['csvlog_dir']) #enable loop latency tracing if configured
+        warm_reset = (SIM_RESET == 1) or (SIM_RESET == 'warm')
         #Multiple simulations runs loop
-        for _ in range(SIM_ITER_NUM):
-            self.start_processes() #start simulation processes
-            rx2sup_out  = self.global_dict['rx2sup_out']
-            event_start = self.global_dict['event_start']
-            event_end   = self.global_dict['event_end']
-            event_start.wait() #wait for simulation start event
-            #Single simulation run loop
+        for k in range(SIM_ITER_NUM):
+            if warm_reset and (k > 0):
+                self.rearm_processes() #reposition aircraft and restart simulation processes
+            else:
+                self.start_processes() #start simulation processes
+            run_over   = self.watch_run() #wait for the end of the simulation run
+            keep_links = warm_reset and run_over and (k < SIM_ITER_NUM - 1) #keep FlightGear and links alive for the next simulation run
+            self.end_run(keep_links) #let the links close their sockets, ring buffers and capture (unless kept alive)
+            self.terminate_processes(keep_links) #terminate simulation processes
+            self.conflation_report() #print stale batches dropped by conflating stage inputs
+            self.health_report() #print stages loop iteration timing
+            self.clear_events(keep_links) #clear events flags
+            self.restore_pipes(keep_links) #restore broken pipes
+            if not run_over: #interrupted or failed simulation run
+                break
+        self.global_dict['props_mod'].close() #close property tree link
+        TRACER.merge() #write Chrome trace file
+        self.graph.unlink() #release shared memory ring buffers
+        quit() #quit program
+
+    def campaign_sim(self):
+        #Queue of simulation runs spread across simultaneous simulation stacks (worker processes with their own ports block, log directory and swept settings)
+        csvlog_mod = self.global_dict['csvlog_mod']
+        self.check_campaign() #swept and sampled settings names
+        self.make_log_dir() #create campaign CSV log directory
+        campaign_dir = self.global_dict['csvlog_dir']
+        runs         = sweep_runs(CAMPAIGN_GRID, CAMPAIGN_MONTE_CARLO, CAMPAIGN_RUNS, CAMPAIGN_SEED) #swept and sampled settings of every run
+        fieldnames   = (*CAMPAIGN_STR, *CAMPAIGN_GRID.keys(), *CAMPAIGN_MONTE_CARLO.keys())
+        csvlog_mod.header_camplog(campaign_dir, fieldnames)
+        workers_num  = CAMPAIGN_WORKERS if CAMPAIGN_WORKERS > 0 else max(len(os.sched_getaffinity(0)) // CAMPAIGN_CORES_PER_RUN, 1)
+        runs_queue   = list(range(1, len(runs) + 1)) #pending runs
+        instances    = list(range(1, workers_num + 1)) #free simulation stacks (ports blocks)
+        workers      = {} #running worker processes by pid: (process, run, simulation stack, start time)
+        print(' '.join(('Campaign:', str(len(runs)), 'runs across', str(workers_num), 'simulation stacks')))
+        #Campaign loop
+        while (len(runs_queue) > 0) or (len(workers) > 0):
+            try:
+                #Launch pending runs on free simulation stacks
+                while (len(runs_queue) > 0) and (len(instances) > 0):
+                    run      = runs_queue.pop(0)
+                    instance = instances.pop(0)
+                    run_dir  = os.path.join(campaign_dir, str(run))
+                    os.makedirs(run_dir, exist_ok=True)
+                    env      = dict(os.environ, CAMPAIGN_INSTANCE=str(instance), CAMPAIGN_LOG_DIR=run_dir, CAMPAIGN_SETTINGS=json.dumps(runs[run-1]))
+                    worker   = subprocess.Popen(args=(sys.executable, sys.argv[0]), env=env)
+                    workers[worker.pid] = (worker, run, instance, time.monotonic())
+                #Collect the next finished run
+                pid, status = os.wait()
+                if pid not in workers: #not a worker process
+                    continue
+                worker, run, instance, t_start = workers.pop(pid)
+                worker.returncode = os.waitstatus_to_exitcode(status)
+                instances.append(instance)
+                metrics = self.campaign_metrics(os.path.join(campaign_dir, str(run)))
+                csvlog_mod.write_camplog(campaign_dir, fieldnames, (run, instance, worker.returncode, time.monotonic() - t_start, *metrics, *runs[run-1].values()))
+                print(' '.join(('Campaign run', str(run), 'finished with exit code', str(worker.returncode), '(' + str(len(runs) - len(runs_queue) - len(workers)) + '/' + str(len(runs)) + ')')))
+            except:
+                self.terminate_workers(workers) #no orphan simulation stacks left behind
+                raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
+        quit() #quit program
+
+    def check_campaign(self):
+        #Swept and sampled settings must be existing settings (campaign workers would silently add a new one)
+        for setting, settings_dict in (('CAMPAIGN_GRID', CAMPAIGN_GRID), ('CAMPAIGN_MONTE_CARLO', CAMPAIGN_MONTE_CARLO)):
+            for name in settings_dict:
+                if (not name.isupper()) or (name not in vars(settings)):
+                    raise ValueError(' '.join(('Unknown setting in', setting + ':', name)))
+
+    def terminate_workers(self, workers):
+        #Terminate running campaign workers (each worker ends its simulation run and terminates its own simulation stack), killed if still alive after the health timeout
+        for worker, _, _, _ in workers.values():
+            worker.terminate()
+        for worker, run, _, _ in workers.values():
+            try:
+                worker.wait(HEALTH_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+                worker.wait()
+            print(' '.join(('Campaign run', str(run), 'terminated with exit code', str(worker.returncode))))
+
+    def campaign_metrics(self, run_dir):
+        #Summary metrics of a finished campaign run from its CSV logs (last simulation time, RMS tracking errors)
+        csvlog_mod = self.global_dict['csvlog_mod']
+        try:
+            t_sim = csvlog_mod.read_telemrxlog(run_dir)[-1,0] #last logged simulation time
+        except (IndexError, OSError, ValueError): #run failed before logging RX telemetry
+            t_sim = np.nan
+        try:
+            rms = tracking_rms(csvlog_mod.read_cmlog(run_dir), csvlog_mod.read_splog(run_dir), CAMPAIGN_RMS_IND)
+        except (OSError, ValueError): #run failed before logging control model or setpoint
+            rms = np.full(len(CAMPAIGN_RMS_IND), np.nan)
+        return (t_sim, *rms)
+
+    def campaign_run(self):
+        #Campaign worker: single simulation run into the log directory given by the campaign runner
+        self.global_dict.update(csvlog_dir = os.environ['CAMPAIGN_LOG_DIR'])
+        run_over = self.single_run() #simulation run
+        quit(0 if run_over else 1) #quit program (failed exit code in the campaign log if the run was aborted)
+
+    def watch_run(self):
+        #Wait for the end of the simulation run without busy waiting (decimated RX telemetry for the watchdog, processes sentinels, stages heartbeats and termination signals)
+        #Returns True once the watchdog triggers or the scenario exits (and the RX link drained its frames), False if the run is interrupted or aborted by a dead or stalled stage
+        rx2sup_out  = self.global_dict['rx2sup_out']
+        scen_proc   = self.global_dict['scen_proc']
+        event_rxtcp = self.global_dict['event_rxtcp']
+        event_start = self.global_dict['event_start']
+        if isinstance(scen_proc, subprocess.Popen): #FlightGear
+            scen_sentinel = os.pidfd_open(scen_proc.pid) if hasattr(os, 'pidfd_open') else None
+        else: #FlightGear stand-in
+            scen_sentinel = scen_proc.sentinel
+        restarts    = {name:0 for name in self.graph.names('stage')} #stages processes restarts in this simulation run
+        t_check     = None #stall detection reference time (simulation start or last stage restart)
+        scen_exited = False #scenario exited, waiting for the RX link to drain its frames
+        sigterm_handler = signal.signal(signal.SIGTERM, signal.default_int_handler) #terminate cleanly on SIGTERM as on SIGINT
+        try:
             while True:
-                try:
+                sentinels = self.process_sentinels() #processes sentinels (ready once the process exits)
+                waitables = [rx2sup_out, *sentinels] + ([scen_sentinel] if (scen_sentinel is not None) and (not scen_exited) else [])
+                ready = connection.wait(waitables, HEALTH_TIMEOUT / 4)
+                if (scen_sentinel in ready) and (not scen_exited):
+                    print('Scenario exited!')
+                    scen_exited = True
+                if scen_exited and ((not event_rxtcp.is_set()) or (TELEM_TRANSPORT == 1) or (TELEM_TRANSPORT == 'udp')): #RX link drained the frames sent before the scenario exited (no end of stream over UDP)
+                    return True
+                #Dead processes
+                for sentinel in ready:
+                    if sentinel in sentinels:
+                        name, proc = sentinels[sentinel]
+                        proc.join(1) #reap exited process
+                        if proc.exitcode == 0: #stage not needed by the selected control model
+                            continue
+                        if not self.stage_failure(name, ' '.join(('exited with code', str(proc.exitcode))), restarts):
+                            return False
+                        t_check = HEARTBEATS.clock()
+                #Stalled stages (upstream first, stages downstream a restarted stage are given a new timeout)
+                if (t_check is None) and event_start.is_set():
+                    t_check = HEARTBEATS.clock()
+                if t_check is not None:
+                    for name in HEARTBEATS.stalled(t_check, HEALTH_TIMEOUT):
+                        if self.stage_process(name).exitcode is None:
+                            if not self.stage_failure(name, ' '.join(('stalled for', str(HEALTH_TIMEOUT), 's')), restarts):
+                                return False
+                            t_check = HEARTBEATS.clock()
+                            break
+                #RX telemetry
+                while rx2sup_out.poll():
                     rxdata    = rx2sup_out.recv() #receive RX telemetry
                     lastframe = rxdata[-1] #get last RX telemetry frame
-                    terminate_run = self.simulation_watchdog(lastframe) #check if simulation run is over
-                    if terminate_run:
-                        event_end.set() #set simulation end event
-                        self.global_dict.update(event_end = event_end)
-                        time.sleep(1)
-                        self.terminate_processes() #terminate simulation processes
-                        self.clear_events() #clear events flags
-                        self.restore_pipes() #restore broken pipes
-                        terminate_run = False
-                        break
-                except:
-                    raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
-        quit() #quit program
+                    if self.simulation_watchdog(lastframe): #check if simulation run is over
+                        return True
+                    self.rate_governor(lastframe) #adjust simulation rate at runtime
+        except KeyboardInterrupt:
+            print('Simulation run interrupted!')
+            return False
+        except EOFError: #RX telemetry closed
+            return True
+        except:
+            raise RuntimeError('.'.join((__name__, sys._getframe().f_code.co_name)))
+        finally:
+            signal.signal(signal.SIGTERM, sigterm_handler)
+            if isinstance(scen_sentinel, int) and isinstance(scen_proc, subprocess.Popen):
+                os.close(scen_sentinel)
+
+    def process_sentinels(self):
+        #Sentinels of the running simulation processes: (name, process)
+        sentinels = {}
+        for name in (*self.graph.names('stage'), *self.graph.names('log')):
+            proc = self.global_dict[name + '_proc']
+            if proc.exitcode != 0: #running or failed
+                sentinels[proc.sentinel] = (name, proc)
+        for link_proc in self.global_dict['link_procs']:
+            sentinels[link_proc.sentinel] = ('link', link_proc)
+        return sentinels
+
+    def stage_process(self, name):
+        #Process publishing the stage heartbeats
+        return self.global_dict['link_procs'][0] if name == 'rx' else self.global_dict[self.graph.process_name(name) + '_proc']
+
+    def stage_failure(self, name, reason, restarts):
+        #Diagnostic of a dead or stalled stage, then restart the stage if allowed, returns False if the simulation run has to be aborted
+        print(' '.join(('Stage', name, reason + '!')))
+        for stage_name in HEALTH_STAGES_STR:
+            print('  ' + HEARTBEATS.report(stage_name))
+        restart   = (HEALTH_ACTION == 1) or (HEALTH_ACTION == 'restart')
+        proc_name = self.graph.process_name(name) #fused stages are restarted with their control chain
+        if restart and (proc_name in self.graph.names('stage')) and (restarts[proc_name] < HEALTH_RESTARTS):
+            self.restart_stage(proc_name)
+            restarts[proc_name] += 1
+            return True
+        print('Simulation run aborted!')
+        return False
+
+    def restart_stage(self, name):
+        #Replace a dead or stalled stage process with a new one on the same pipes (RX telemetry published meanwhile is skipped)
+        proc = self.global_dict[name + '_proc']
+        proc.terminate()
+        proc.join(1)
+        for input_name in self.graph.inputs(name):
+            if hasattr(self.global_dict[input_name], 'skip'): #shared memory input
+                self.global_dict[input_name].skip()
+        for stage_name in HEALTH_STAGES_STR:
+            if self.graph.process_name(stage_name) == name:
+                HEARTBEATS.reset(stage_name)
+        proc = self.graph.process(name, self.global_dict)
+        sigterm_handler = signal.signal(signal.SIGTERM, signal.SIG_DFL) #restarted stage terminated without cleanup as the other stages
+        proc.start()
+        signal.signal(signal.SIGTERM, sigterm_handler)
+        self.schedule_process(name, proc.pid)
+        self.global_dict.update({name + '_proc':proc})
+        print(' '.join(('Stage', name, 'restarted!')))
+
+    def health_report(self):
+        #Loop iteration timing of every stage
+        print('Stages health:')
+        for name in HEALTH_STAGES_STR:
+            print('  ' + HEARTBEATS.report(name))
 
     def simulation_watchdog(self, lastframe):
         #Watchdog that activates when the aircraft is upside down or its wheels touch down
-        up_down = lastframe[110]
-        wow1    = lastframe[111]
-        wow2    = lastframe[112]
-        wow3    = lastframe[113]
-        wc1     = lastframe[114]
-        wc2     = lastframe[115]
-        wc3     = lastframe[116]
+        up_down = lastframe[SUP_RX_IND['up_down']]
+        wow1    = lastframe[SUP_RX_IND['wow1']]
+        wow2    = lastframe[SUP_RX_IND['wow2']]
+        wow3    = lastframe[SUP_RX_IND['wow3']]
+        wc1     = lastframe[SUP_RX_IND['wc1']]
+        wc2     = lastframe[SUP_RX_IND['wc2']]
+        wc3     = lastframe[SUP_RX_IND['wc3']]
         return True if (up_down == 1) or (wow1 == 1) or (wow2 == 1) or (wow3 == 1) or (wc1 == 1) or (wc2 == 1) or (wc3 == 1) else False
 
+    def conflation_report(self):
+        #Stale batches dropped by each conflating stage input
+        #Batches overwritten before being read by each shared memory ring buffer reader
+        drops_dict    = {name:self.global_dict[name + '_out'].dropped_count for name in CONFLATED_INPUTS}
+        overruns_dict = {name:self.global_dict[name + '_out'].overrun_count for name in self.graph.channels if self.graph.transport(name) == 'shm'}
+        print(' '.join(('Conflated inputs drops:', str(drops_dict))))
+        print(' '.join(('Ring buffers overruns:', str(overruns_dict))))
+
+    def set_sim_rate(self, sim_rate):
+        #Change FlightGear simulation rate at runtime over the persistent config link
+        sup2cfg_in = self.global_dict['sup2cfg_in']
+        sup2cfg_in.send(sim_rate)
+        SIM_RATE_SENT.value = sim_rate #RX link learns the new frames spacing
+        self.global_dict.update(sim_rate = sim_rate)
+        print(' '.join(('Simulation rate:', str(sim_rate))))
+
+    def reset_rate_governor(self):
+        self.global_dict.update(sim_rate = SIM_RATE)
+        self.global_dict.update(rate_schedule = list(SIM_RATE_SCHEDULE))
+        self.global_dict.update(rate_misses = 0)
+        self.global_dict.update(rate_check = TELEM_WAIT)
+
+    def rate_governor(self, lastframe):
+        #Apply the simulation rate schedule and throttle down once per simulation second if the control loop missed ticks
+        t_sim         = lastframe[SUP_RX_IND['t_sim']]
+        rate_schedule = self.global_dict['rate_schedule']
+        while (len(rate_schedule) > 0) and (t_sim >= rate_schedule[0][0]):
+            self.set_sim_rate(rate_schedule.pop(0)[1])
+        if SIM_RATE_AUTO and (t_sim >= self.global_dict['rate_check']):
+            rx_rings = self.global_dict['rx_rings']
+            misses   = sum(max(rx_ring.lag(0) - 1, 0) for rx_ring in rx_rings if rx_ring.rate is not None) #decimated ticks pending to be read
+            misses  += sum(self.global_dict[name + '_out'].dropped_count for name in CONFLATED_INPUTS) #stale ticks skipped
+            sim_rate = self.global_dict['sim_rate']
+            if (misses > self.global_dict['rate_misses']) and (sim_rate > SIM_RATE_MIN):
+                self.set_sim_rate(max(sim_rate / 2, SIM_RATE_MIN))
+            self.global_dict.update(rate_misses = misses)
+            self.global_dict.update(rate_check = t_sim + 1)
+
     def make_log_dir(self):
         #Make directories for saving logs
 